@@ -1,7 +1,8 @@
 from datetime import datetime
+from time import perf_counter
 
 from flask import (
-    Flask, request,
+    Flask, request, g,
     make_response,
     redirect,
     render_template,
@@ -16,6 +17,8 @@ from werkzeug.exceptions import (
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 import h_cleaner
+import h_metrics
+import h_page_cache
 import logs_calendar
 import logs_main
 from constants import FLAG_ORDER
@@ -42,41 +45,57 @@ SERVER.jinja_env.lstrip_blocks = True
 
 USE_FILTER = True
 MAX_SURVIVE_LOGS = T_DELTA["30MIN"]
-IGNORED_PATHS = {"/upload", "/upload_progress"}
+IGNORED_PATHS = {"/upload", "/upload_progress", "/metrics"}
+MAX_CASTS_NAMES = 25
 LOGS_LIST_MONTHS = list(enumerate(MONTHS))
 SERVER_STARTED = datetime.now()
 SERVER_STARTED_STR = SERVER_STARTED.strftime("%y-%m-%d")
 YEARS = list(range(2018, SERVER_STARTED.year+2))
 
-CACHED_PAGES = {}
-OPENED_LOGS: dict[str, logs_main.THE_LOGS] = {}
+CACHED_PAGES = h_page_cache.PageCache()
+OPENED_LOGS: h_cleaner.ReportsCache = h_cleaner.ReportsCache()
 
 CLEANER = h_cleaner.MemoryCleaner(OPENED_LOGS)
 
+h_metrics.register_stats("uwu_page_cache", CACHED_PAGES.stats, {"hits", "misses", "evicted"})
+h_metrics.register_stats("uwu_reports_cache", OPENED_LOGS.stats, {
+    "hits", "misses", "evicted_cache", "evicted_logs", "evicted_reports",
+})
+
 LOGGER_CONNECTIONS = Loggers.server_main
 LOGGER_CONNECTIONS.debug("Starting server...")
 
 def add_log_entry(ip, method, msg):
     LOGGER_CONNECTIONS.info(f"{ip:>15} | {method:<7} | {msg}")
 
+def is_private_report():
+    return g.get("private_report", False)
+
+def cached_page(view):
+    return h_page_cache.cached_page(CACHED_PAGES, is_private_report)(view)
+
 def load_report(report_id: str):
     now = datetime.now()
     ip = request.remote_addr
-    if report_id in OPENED_LOGS:
-        report = OPENED_LOGS[report_id]
+    report = OPENED_LOGS.get(report_id)
+    if report is not None:
         report.last_access = now
         return report
     
-    if _validate is not None:
-        _limit = _validate.rate_limited_reports(ip, "report", report_id)
-        if _limit:
-            add_log_entry(ip, "SPAM", report_id)
-            raise TooManyRequests(retry_after=_limit)
-    
-    CLEANER.start()
-    report = logs_main.THE_LOGS(report_id)
-    OPENED_LOGS[report_id] = report
-    add_log_entry(ip, "OPENNED", report_id)
+    # only 1 request opens the report, others wait for it
+    with OPENED_LOGS.loading(report_id):
+        report = OPENED_LOGS.peek(report_id)
+        if report is None:
+            if _validate is not None:
+                _limit = _validate.rate_limited_reports(ip, "report", report_id)
+                if _limit:
+                    add_log_entry(ip, "SPAM", report_id)
+                    raise TooManyRequests(retry_after=_limit)
+            
+            CLEANER.start()
+            report = logs_main.THE_LOGS(report_id)
+            OPENED_LOGS[report_id] = report
+            add_log_entry(ip, "OPENNED", report_id)
 
     report.last_access = now
     return report
@@ -158,6 +177,7 @@ def format_report_server(report_id: str):
 
 @SERVER.before_request
 def before_request():
+    g.request_start = perf_counter()
     log_incoming_connection()
 
     url_comp = request.path.split('/')
@@ -182,12 +202,29 @@ def before_request():
             raise NotFound
         return "", 403
         
-    if report_id in Files.reports_private.text_lines():
+    g.private_report = report_id in Files.reports_private.text_lines()
+    if g.private_report:
         if not _validate.cookie(request):
             if request.method == "GET":
                 return render_template('protected.html'), 401
             return "", 403
 
+@SERVER.after_request
+def after_request(response):
+    request_start = g.get("request_start")
+    if request_start is not None:
+        # rule, not path, so every report shares the same label
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        seconds = perf_counter() - request_start
+        h_metrics.observe_request("server_main", request.method, route, response.status_code, seconds)
+    return response
+
+@SERVER.route("/metrics")
+def metrics():
+    if not h_metrics.scrape_allowed(request.remote_addr, request.headers):
+        raise NotFound()
+    return h_metrics.render(), 200, {"Content-Type": h_metrics.CONTENT_TYPE}
+
 
 @SERVER.route("/")
 def home():
@@ -261,6 +298,7 @@ def show_logs_list():
     )
 
 @SERVER.route("/reports/<report_id>/")
+@cached_page
 def report_page(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -296,6 +334,7 @@ def download_logs(report_id):
     return "", 404
 
 @SERVER.route("/reports/<report_id>/player/<source>/")
+@cached_page
 def player(report_id, source: str):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -309,6 +348,7 @@ def player(report_id, source: str):
     )
 
 @SERVER.route("/reports/<report_id>/heal/<source_name>/")
+@cached_page
 def heal(report_id, source_name):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -322,6 +362,7 @@ def heal(report_id, source_name):
     )
 
 @SERVER.route("/reports/<report_id>/taken/<target_name>/")
+@cached_page
 def taken(report_id, target_name):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -335,6 +376,7 @@ def taken(report_id, target_name):
     )
 
 @SERVER.route("/reports/<report_id>/healed/<target_name>/")
+@cached_page
 def healed(report_id, target_name):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -351,6 +393,7 @@ def healed(report_id, target_name):
     )
 
 @SERVER.route("/reports/<report_id>/casts/<source_name>/")
+@cached_page
 def casts(report_id, source_name):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -386,6 +429,35 @@ def casts_post(report_id):
     s, f = report.ENCOUNTER_DATA[boss_name][attempt]
     return report.get_spell_history_wrap_json(s, f, player_name)
 
+@SERVER.route("/reports/<report_id>/casts_many/", methods=['POST'])
+def casts_many_post(report_id):
+    if not request.is_json:
+        return "", 400
+    
+    _data: dict = request.json
+    try:
+        boss_name = BOSSES_FROM_HTML[_data.get("boss")]
+    except KeyError:
+        raise BadRequest("[boss_name] is not a valid boss name")
+    
+    try:
+        attempt = int(_data.get("attempt"))
+    except (ValueError, TypeError):
+        raise BadRequest("[attempt] must be a number")
+    
+    player_names = _data.get("names")
+    if not isinstance(player_names, list) or not all(isinstance(name, str) for name in player_names):
+        raise BadRequest("[names] must be a list of names")
+    if len(player_names) > MAX_CASTS_NAMES:
+        raise BadRequest(f"[names] must have at most {MAX_CASTS_NAMES} names")
+    
+    report = load_report(report_id)
+    attempts = report.ENCOUNTER_DATA.get(boss_name, [])
+    if not 0 <= attempt < len(attempts):
+        raise BadRequest("[attempt] is not an attempt of the boss in the report")
+    s, f = attempts[attempt]
+    return report.get_spell_history_many_wrap_json(s, f, player_names)
+
 @SERVER.route("/reports/<report_id>/report_slices/", methods=['POST'])
 def report_slices(report_id):
     report = load_report(report_id)
@@ -415,6 +487,7 @@ def get_dps(report_id):
     return report.get_dps_wrap(data)
 
 @SERVER.route("/reports/<report_id>/spell/<spell_id>/")
+@cached_page
 def spells(report_id, spell_id: str):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -427,6 +500,7 @@ def spells(report_id, spell_id: str):
     )
 
 @SERVER.route("/reports/<report_id>/consumables/")
+@cached_page
 def consumables(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -439,6 +513,7 @@ def consumables(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/entities/")
+@cached_page
 def entities(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -451,6 +526,7 @@ def entities(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/all_auras/")
+@cached_page
 def all_auras(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -463,6 +539,7 @@ def all_auras(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/damage/")
+@cached_page
 def damage_targets(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -501,6 +578,7 @@ def compare(report_id):
         return report.get_comparison_data(segments, class_name, tGUID=target)
 
 @SERVER.route("/reports/<report_id>/valks/")
+@cached_page
 def valks(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -513,6 +591,7 @@ def valks(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/lady_spirits/")
+@cached_page
 def lady_spirits(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -525,6 +604,7 @@ def lady_spirits(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/ucm/")
+@cached_page
 def ucm(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -537,6 +617,7 @@ def ucm(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/toc_valks/")
+@cached_page
 def toc_valks(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -549,6 +630,7 @@ def toc_valks(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/deaths/")
+@cached_page
 def deaths(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
@@ -561,6 +643,7 @@ def deaths(report_id):
     )
 
 @SERVER.route("/reports/<report_id>/powers/")
+@cached_page
 def powers(report_id):
     report = load_report(report_id)
     default_params = report.get_default_params(request)
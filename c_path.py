@@ -5,6 +5,17 @@ from pathlib import Path
 
 import zstd
 
+ZSTD_FRAME_LINES = 50_000
+
+
+def zstd_frame_text(data: bytes):
+    '''Decompressed frame without its trailing newline.
+    Frames of older files have none.'''
+    text = zstd.decompress(data).decode()
+    if text.endswith("\n"):
+        return text[:-1]
+    return text
+
 class StrEnum(str, Enum):
     def __str__(self) -> str:
         return self.value
@@ -32,6 +43,7 @@ class FileNames(StrEnum):
     reports_allowed = "__allowed.txt"
     reports_private = "__private.txt"
     spell_icons_db = "spells_icons.json"
+    spells_catalog_db = "spells_catalog.json"
 
     cert_domain = "domain.cert.pem"
     cert_private = "private.key.pem"
@@ -48,13 +60,25 @@ class FileNames(StrEnum):
 
     logs_cut = "LOGS_CUT.zstd"
     logs_cut_old = "LOGS_CUT.zlib"
+    logs_cut_lines = "LOGS_CUT.txt"
+    logs_cut_offsets = "LOGS_CUT.offsets"
     logs_top = "top.json"
     logs_guids_data = "GUIDS_DATA.json"
     logs_players_data = "PLAYERS_DATA.json"
     logs_classes_data = "CLASSES_DATA.json"
     logs_encounter_data = "ENCOUNTER_DATA.json"
-    logs_timestamp_data = "TIMESTAMP_DATA.json"
+    logs_timestamp_data = "TIMESTAMP_DATA.u32"
+    logs_timestamp_data_old = "TIMESTAMP_DATA.json"
     logs_spells_data = "SPELLS_DATA.json"
+    logs_spells_ids = "SPELLS_IDS.json"
+    logs_events_data = "EVENTS_DATA.npz"
+    logs_lines_index = "LINES_INDEX.npz"
+    logs_deaths_index = "DEATHS_INDEX.npz"
+    logs_aura_intervals = "AURA_INTERVALS.npz"
+    logs_clock = "CLOCK.ms"
+    logs_units_table = "UNITS_TABLE.json"
+    logs_slice_cache = "SLICE_CACHE.db"
+    logs_segments_summary = "SEGMENTS_SUMMARY.json"
 
 
 class CachePath:
@@ -156,11 +180,50 @@ class _PathExtFiles(_PathExt):
     def zstd_write(self, data: bytes, compress_level=3):
         data = zstd.compress(data, compress_level)
         self.write_bytes(data)
+        # single frame now, old index would point to garbage
+        self.zstd_frames_path.unlink(missing_ok=True)
 
     def zstd_read(self):
+        frames_index = self.zstd_frames_index()
+        if frames_index is None:
+            data = self.read_bytes()
+            data = zstd.decompress(data)
+            return data.decode()
+        
+        offsets = frames_index["offsets"]
         data = self.read_bytes()
-        data = zstd.decompress(data)
-        return data.decode()
+        frames = (
+            zstd_frame_text(data[start:end])
+            for start, end in zip(offsets, offsets[1:])
+        )
+        return "\n".join(frames)
+
+    @property
+    def zstd_frames_path(self):
+        return self.with_name(f"{self.stem}.frames.json")
+
+    def zstd_frames_index(self) -> dict:
+        try:
+            return self.zstd_frames_path.json()
+        except FileNotFoundError:
+            return None
+
+    def zstd_write_frames(self, lines: list[str], lines_per_frame=ZSTD_FRAME_LINES, compress_level=3):
+        '''Writes lines as independent frames, so any line range can be read without decompressing the whole file.
+        Every frame ends with a newline, so plain decompress of the whole file gives the same lines.'''
+        self.zstd_frames_path.unlink(missing_ok=True)
+
+        offsets = [0]
+        with open(self, "wb") as f:
+            for i in range(0, len(lines), lines_per_frame):
+                frame = "".join(f"{line}\n" for line in lines[i:i+lines_per_frame]).encode()
+                offsets.append(offsets[-1] + f.write(zstd.compress(frame, compress_level)))
+
+        self.zstd_frames_path.json_write({
+            "lines": len(lines),
+            "lines_per_frame": lines_per_frame,
+            "offsets": offsets,
+        })
 
 
 class _PathExtDirs(_PathExt):
@@ -252,6 +315,7 @@ class Files(dict[str, PathExt]):
     reports_allowed = Directories.main / FileNames.reports_allowed
     reports_private = Directories.main / FileNames.reports_private
     spell_icons_db = Directories.static / FileNames.spell_icons_db
+    spells_catalog_db = Directories.db / FileNames.spells_catalog_db
 
     cert_domain = Directories.certificates / FileNames.cert_domain
     cert_private = Directories.certificates / FileNames.cert_private
@@ -1,14 +1,20 @@
 import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from time import perf_counter, sleep
 
 import psutil
 
 from h_debug import Loggers
+from h_locks import KeyLocks
+from h_size import deep_size
 
 LOGGER_MEMORY = Loggers.memory
 
 MAX_SURVIVE_LOGS = timedelta(minutes=30)
+# estimated bytes of all opened reports
+MAX_CACHE_BYTES = 4 * 1024 * 1024 * 1024
+MAX_RAM_PERCENT = 80
 
 def add_log_entry_memory(msg):
     _m = psutil.virtual_memory()
@@ -17,8 +23,166 @@ def add_log_entry_memory(msg):
     LOGGER_MEMORY.info(f"{available:>5.2f}GB | {percent:>4.1f}% | {msg}")
 
 
+def report_data_size(report):
+    '''estimated bytes of everything except computed CACHE, without loading anything new'''
+    data = {
+        name: value
+        for name, value in vars(report).items()
+        if name != "CACHE"
+    }
+    return deep_size(data)
+
+
+class ReportsCache(OrderedDict):
+    '''
+    Opened reports, least recently used first.
+    Reports over MAX_CACHE_BYTES are evicted in layers:
+    computed CACHE of the oldest reports, then their raw LOGS, then the reports.
+
+    CACHE bytes are counted by the report as results are stored (report.cache_bytes).
+    Everything else is measured again only when the report loaded or released an attribute.
+    '''
+    def __init__(self, max_bytes: int=MAX_CACHE_BYTES) -> None:
+        super().__init__()
+        self.max_bytes = max_bytes
+        # report_id: (loaded attributes, bytes)
+        self.sizes: dict[str, tuple[frozenset[str], int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted_cache = 0
+        self.evicted_logs = 0
+        self.evicted_reports = 0
+        self.lock = threading.RLock()
+        self.loading = KeyLocks()
+
+    def get(self, report_id: str, default=None):
+        with self.lock:
+            if report_id not in self:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.move_to_end(report_id)
+            return self[report_id]
+
+    def peek(self, report_id: str):
+        '''same as get, but doesn't count as access'''
+        return super().get(report_id)
+
+    def __setitem__(self, report_id: str, report) -> None:
+        with self.lock:
+            super().__setitem__(report_id, report)
+            self.move_to_end(report_id)
+
+    def __delitem__(self, report_id: str) -> None:
+        with self.lock:
+            super().__delitem__(report_id)
+            self.sizes.pop(report_id, None)
+
+    # OrderedDict.pop / popitem / clear don't go through __delitem__
+    def pop(self, report_id: str, *default):
+        with self.lock:
+            self.sizes.pop(report_id, None)
+            return super().pop(report_id, *default)
+
+    def popitem(self, last: bool=True):
+        with self.lock:
+            report_id, report = super().popitem(last)
+            self.sizes.pop(report_id, None)
+            return report_id, report
+
+    def clear(self) -> None:
+        with self.lock:
+            super().clear()
+            self.sizes.clear()
+
+    def total_bytes(self):
+        with self.lock:
+            return sum(
+                report.cache_bytes + self.sizes.get(report_id, (None, 0))[1]
+                for report_id, report in self.items()
+            )
+
+    def update_sizes(self):
+        with self.lock:
+            reports = list(self.items())
+            for report_id in self.sizes.keys() - self.keys():
+                del self.sizes[report_id]
+        for report_id, report in reports:
+            self._update_size(report_id, report)
+
+    def _update_size(self, report_id: str, report):
+        loaded = frozenset(vars(report))
+        with self.lock:
+            size = self.sizes.get(report_id)
+        if size is not None and size[0] == loaded:
+            return
+        try:
+            data = report_data_size(report)
+        except Exception:
+            LOGGER_MEMORY.exception(f"size {report_id}")
+            return
+        with self.lock:
+            if report_id in self:
+                self.sizes[report_id] = (loaded, data)
+
+    def _evict_layer(self, layer: str):
+        with self.lock:
+            # most recent report is being used right now, it's evicted last
+            reports = list(self.items())[:-1] or list(self.items())
+        for report_id, report in reports:
+            if self.total_bytes() <= self.max_bytes:
+                return True
+            if layer == "cache" and report.cache_bytes:
+                try:
+                    report.release_cache()
+                except Exception:
+                    LOGGER_MEMORY.exception(f"release_cache {report_id}")
+                self.evicted_cache += 1
+            elif layer == "logs":
+                try:
+                    report.release_logs()
+                except Exception:
+                    LOGGER_MEMORY.exception(f"release_logs {report_id}")
+                self.evicted_logs += 1
+            elif layer == "report":
+                self.pop(report_id, None)
+                self.evicted_reports += 1
+                add_log_entry_memory(f"NUKED BIG | {report_id}")
+                continue
+            else:
+                continue
+            self._update_size(report_id, report)
+        return self.total_bytes() <= self.max_bytes
+
+    def evict(self):
+        self.update_sizes()
+        for layer in ("cache", "logs", "report"):
+            if self._evict_layer(layer):
+                break
+
+    def evict_oldest(self):
+        with self.lock:
+            if not self:
+                return
+            report_id = next(iter(self))
+            self.pop(report_id, None)
+            self.evicted_reports += 1
+
+    def stats(self):
+        return {
+            "reports": len(self),
+            "bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted_cache": self.evicted_cache,
+            "evicted_logs": self.evicted_logs,
+            "evicted_reports": self.evicted_reports,
+        }
+
+
 class MemoryCleaner(threading.Thread):
-    def __init__(self, OPENED_LOGS):
+    def __init__(self, OPENED_LOGS: ReportsCache):
         super().__init__(daemon=True)
         self.OPENED_LOGS = OPENED_LOGS
         
@@ -28,23 +192,23 @@ class MemoryCleaner(threading.Thread):
         now = datetime.now()
         reports = list(self.OPENED_LOGS)
         for report_id in reports:
-            report = self.OPENED_LOGS[report_id]
+            report = self.OPENED_LOGS.peek(report_id)
+            if report is None:
+                continue
             if now - report.last_access > MAX_SURVIVE_LOGS:
-                del self.OPENED_LOGS[report_id]
+                self.OPENED_LOGS.pop(report_id, None)
                 add_log_entry_memory(f"NUKED OLD | {report_id}")
 
-        try:
-            reports = sorted(self.OPENED_LOGS, key=lambda x: self.OPENED_LOGS[x].last_access)
-        except Exception:
-            reports = list(self.OPENED_LOGS)
-            LOGGER_MEMORY.exception("sorted")
+        self.OPENED_LOGS.evict()
 
-        for report_id in reports:
-            if psutil.virtual_memory().percent < 80:
-                break
-            del self.OPENED_LOGS[report_id]
+        # estimates are off or something else eats memory
+        while self.OPENED_LOGS and psutil.virtual_memory().percent > MAX_RAM_PERCENT:
+            self.OPENED_LOGS.evict_oldest()
         
-        add_log_entry_memory(f'{(perf_counter() - pc1)*1000:>10,.3f}ms | Openned reports: {len(self.OPENED_LOGS):>3} | MemoryCleaner done')
+        stats = self.OPENED_LOGS.stats()
+        cache_mb = stats["bytes"] / 1024 / 1024
+        counters = " | ".join(f"{k} {stats[k]}" for k in ("hits", "misses", "evicted_cache", "evicted_logs", "evicted_reports"))
+        add_log_entry_memory(f'{(perf_counter() - pc1)*1000:>10,.3f}ms | Openned reports: {len(self.OPENED_LOGS):>3} | {cache_mb:>8,.1f}MB | {counters} | MemoryCleaner done')
 
     def start(self):
         if self.is_alive():
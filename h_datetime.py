@@ -111,6 +111,24 @@ def to_dt_bytes_year_fix(s, year: int=None):
         dt = dt.replace(year=year-1)
     return dt
 
+DAY_MS = 24 * 60 * 60 * 1000
+
+def timestamp_ms(line: str):
+    '''ms since midnight, line is "6/25 21:46:32.302" or a whole line'''
+    time_str = line.split(",", 1)[0].rsplit(" ", 1)[-1]
+    hms, ms = time_str.split(".")
+    h, m, s = hms.split(":")
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms)
+
+def timestamps_delta_ms(last: str, now: str):
+    '''ms from last to now, for timestamps less than 12 hours apart, crossing midnight is fine'''
+    delta = timestamp_ms(now) - timestamp_ms(last)
+    if delta < -DAY_MS // 2:
+        delta += DAY_MS
+    elif delta > DAY_MS // 2:
+        delta -= DAY_MS
+    return delta
+
 def duration_to_string(t: float):
     milliseconds = t % 1 * 1000
     if milliseconds < 1:
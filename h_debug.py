@@ -1,9 +1,13 @@
 import logging
+from functools import wraps
 from time import perf_counter
 
+import h_metrics
 from c_path import Directories
 
 LOGGING_FORMAT_DEFAULT = '''%(asctime)s | %(levelname)-8s | %(filename)22s:%(lineno)-4s | %(message)s'''
+# only slower calls are written to reports log, all calls go to h_metrics
+RUNNING_TIME_LOG_MS = 100
 LOGGING_FORMAT = {
     "connections" : '''%(asctime)s | %(message)s''',
 }
@@ -52,11 +56,15 @@ def get_ms_str(timestamp):
 
 def running_time(f):
     _logger = Loggers.reports
+    name = f"{f.__module__}.{f.__name__}"
+    @wraps(f)
     def running_time_inner(*args, **kwargs):
         timestamp = perf_counter()
         q = f(*args, **kwargs)
-        msg = f"{get_ms_str(timestamp)} | {f.__module__}.{f.__name__}"
-        _logger.debug(msg)
+        seconds = perf_counter() - timestamp
+        h_metrics.observe_function(name, seconds)
+        if seconds * 1000 >= RUNNING_TIME_LOG_MS:
+            _logger.debug(f"{int(seconds*1000):>7,} ms | {name}")
         return q
     
     return running_time_inner
@@ -0,0 +1,37 @@
+'''
+Single flight locks.
+
+with KEY_LOCKS(key): - only 1 thread at a time runs the block for the key,
+other threads wait and then find the result of the first one in cache.
+Locks are removed when no thread uses them.
+'''
+
+import threading
+from contextlib import contextmanager
+
+
+class KeyLocks:
+    def __init__(self) -> None:
+        self._guard = threading.Lock()
+        # key: [lock, threads using it]
+        self._locks: dict[object, list] = {}
+
+    @contextmanager
+    def __call__(self, key):
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.RLock(), 0]
+            entry[1] += 1
+
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    self._locks.pop(key, None)
+
+    def __len__(self):
+        return len(self._locks)
@@ -0,0 +1,160 @@
+'''
+In-process metrics in Prometheus text format.
+
+Histograms of function and route latency, lines per slice,
+counters of cached slice lookups, gauges from registered collectors.
+Kept per process, /metrics of each server shows its own process.
+'''
+
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# scrapes are allowed only from here, nginx and prometheus run on the same box
+ALLOWED_IPS = {"127.0.0.1", "::1"}
+# nginx is local too, requests it proxied have these, prometheus scrapes directly
+PROXY_HEADERS = ("x-forwarded-for", "x-real-ip", "forwarded")
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LINES_BUCKETS = (100, 1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+
+def scrape_allowed(client_ip: str, headers) -> bool:
+    '''direct local request, not a request proxied from outside'''
+    if client_ip not in ALLOWED_IPS:
+        return False
+    return not any(header in headers for header in PROXY_HEADERS)
+
+
+class Histogram:
+    __slots__ = "buckets", "counts", "sum", "count"
+
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        # last one is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.histograms: dict[str, dict[tuple, Histogram]] = defaultdict(dict)
+        self.histograms_buckets: dict[str, tuple] = {}
+        self.counters: dict[str, defaultdict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self.help: dict[str, str] = {}
+        self.collectors = []
+
+    def describe(self, name: str, help_text: str, buckets: tuple=None):
+        self.help[name] = help_text
+        if buckets is not None:
+            self.histograms_buckets[name] = buckets
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            histograms = self.histograms[name]
+            try:
+                histogram = histograms[key]
+            except KeyError:
+                buckets = self.histograms_buckets.get(name, SECONDS_BUCKETS)
+                histogram = histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.counters[name][key] += value
+
+    def register_collector(self, collector):
+        '''collector() -> {name: value} or {name: [(labels dict, value)]}, called on every scrape'''
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            for name, histograms in sorted(self.histograms.items()):
+                self._head(lines, name, "histogram")
+                for key, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for le, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(key, le=le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+
+            for name, counters in sorted(self.counters.items()):
+                self._head(lines, name, "counter")
+                for key, value in sorted(counters.items()):
+                    lines.append(f"{name}{_labels(key)} {value}")
+
+        for collector in self.collectors:
+            for name, values in collector().items():
+                metric_type = "counter" if name.endswith("_total") else "gauge"
+                self._head(lines, name, metric_type)
+                if not isinstance(values, list):
+                    values = [({}, values)]
+                for labels, value in values:
+                    lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+
+        lines.append("")
+        return "\n".join(lines)
+
+    def _head(self, lines: list[str], name: str, metric_type: str):
+        if name in self.help:
+            lines.append(f"# HELP {name} {self.help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(key: tuple, **extra):
+    pairs = [*key, *extra.items()]
+    if not pairs:
+        return ""
+    labels = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return f"{{{labels}}}"
+
+
+METRICS = Metrics()
+METRICS.describe("uwu_function_seconds", "Running time of functions wrapped with running_time")
+METRICS.describe("uwu_request_seconds", "Request time by route")
+METRICS.describe("uwu_slice_seconds", "Running time of cached functions on cache miss")
+METRICS.describe("uwu_slice_lines", "Lines in slices computed by cached functions", LINES_BUCKETS)
+METRICS.describe("uwu_slice_cache_total", "Cached slice lookups by result: memory, disk, miss")
+
+def observe_function(function: str, seconds: float):
+    METRICS.observe("uwu_function_seconds", seconds, function=function)
+
+def observe_request(app: str, method: str, route: str, status: int, seconds: float):
+    METRICS.observe("uwu_request_seconds", seconds, app=app, method=method, route=route, status=status)
+
+def observe_slice_hit(function: str, result: str):
+    '''result is memory or disk'''
+    METRICS.inc("uwu_slice_cache_total", function=function, result=result)
+
+def observe_slice_miss(function: str, s, f, seconds: float):
+    METRICS.inc("uwu_slice_cache_total", function=function, result="miss")
+    METRICS.observe("uwu_slice_seconds", seconds, function=function)
+    if isinstance(s, int) and isinstance(f, int):
+        METRICS.observe("uwu_slice_lines", f - s, function=function)
+
+def register_stats(prefix: str, stats, counters: set[str]=frozenset()):
+    '''exports stats() dict of a cache, keys from counters only grow'''
+    def collector():
+        return {
+            f"{prefix}_{key}_total" if key in counters else f"{prefix}_{key}": value
+            for key, value in stats().items()
+        }
+    METRICS.register_collector(collector)
+
+def render():
+    return METRICS.render()
@@ -0,0 +1,131 @@
+'''
+Rendered pages cache.
+
+Uploaded reports never change, so a rendered page is the same for the same path + query.
+Pages are kept gzipped, least recently used are dropped over MAX_CACHE_BYTES.
+Responses get a strong ETag, so browsers and nginx revalidate with If-None-Match and get 304.
+'''
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+# pages bigger than this aren't worth the memory
+MAX_PAGE_BYTES = 8 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+
+class CachedPage:
+    __slots__ = "body_gzip", "etag", "content_type"
+
+    def __init__(self, body: bytes, content_type: str) -> None:
+        self.body_gzip = gzip.compress(body, COMPRESS_LEVEL)
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.content_type = content_type
+
+    def __len__(self):
+        return len(self.body_gzip)
+
+
+class PageCache:
+    def __init__(self, max_bytes: int=MAX_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.pages: OrderedDict[str, CachedPage] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            page = self.pages.get(key)
+            if page is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.pages.move_to_end(key)
+            return page
+
+    def set(self, key: str, body: bytes, content_type: str):
+        page = CachedPage(body, content_type)
+        if len(page) > MAX_PAGE_BYTES:
+            return page
+
+        with self.lock:
+            old_page = self.pages.pop(key, None)
+            if old_page is not None:
+                self.bytes -= len(old_page)
+            self.pages[key] = page
+            self.bytes += len(page)
+            while self.bytes > self.max_bytes and self.pages:
+                _, oldest = self.pages.popitem(last=False)
+                self.bytes -= len(oldest)
+                self.evicted += 1
+        return page
+
+    def clear(self, prefix: str=""):
+        with self.lock:
+            for key in [key for key in self.pages if key.startswith(prefix)]:
+                self.bytes -= len(self.pages.pop(key))
+
+    def stats(self):
+        return {
+            "pages": len(self.pages),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+
+def page_response(page: CachedPage, private: bool=False):
+    # strong etag is per representation, gzipped body gets its own
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = Response(page.body_gzip, content_type=page.content_type)
+        response.headers["Content-Encoding"] = "gzip"
+        etag = f"{page.etag}-gz"
+    else:
+        response = Response(gzip.decompress(page.body_gzip), content_type=page.content_type)
+        etag = page.etag
+
+    response.headers["Vary"] = "Accept-Encoding, Cookie"
+    # revalidate every time, 304 is cheap
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+def cached_page(cache: PageCache, is_private=lambda: False):
+    '''
+    Caches GET responses of the view by path + query.
+    Access checks must be done in before_request, they run before cached pages are returned.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def inner(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+
+            key = request.full_path
+            page = cache.get(key)
+            if page is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                page = cache.set(key, response.get_data(), response.content_type)
+
+            return page_response(page, is_private())
+
+        return inner
+
+    return decorator
@@ -0,0 +1,63 @@
+'''
+Estimated memory of python objects.
+
+Containers longer than SIZE_SAMPLE are estimated from evenly spaced items,
+numpy arrays are counted by nbytes.
+'''
+
+import logging
+import sys
+import threading
+
+SIZE_SAMPLE = 1000
+
+
+def _sample(items: list):
+    if len(items) <= SIZE_SAMPLE:
+        return items, 1
+    step = len(items) / SIZE_SAMPLE
+    return [items[int(i * step)] for i in range(SIZE_SAMPLE)], step
+
+def deep_size(obj, seen: set[int]=None):
+    '''estimated bytes of obj and everything it references'''
+    if seen is None:
+        seen = set()
+
+    total = 0
+    stack = [(obj, 1.0)]
+    while stack:
+        obj, weight = stack.pop()
+        obj_id = id(obj)
+        if obj_id in seen:
+            continue
+        seen.add(obj_id)
+
+        nbytes = getattr(obj, "nbytes", None)
+        if isinstance(nbytes, int):
+            # numpy arrays, memory-mapped ones are counted too, pages are in RAM once touched
+            total += nbytes * weight
+            continue
+
+        total += sys.getsizeof(obj) * weight
+        if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+            continue
+
+        if isinstance(obj, dict):
+            keys, step = _sample(list(obj))
+            for key in keys:
+                stack.append((key, weight * step))
+                stack.append((obj[key], weight * step))
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            items, step = _sample(obj if isinstance(obj, (list, tuple)) else list(obj))
+            for item in items:
+                stack.append((item, weight * step))
+        elif isinstance(obj, (type, logging.Logger, threading.Thread)) or callable(obj):
+            continue
+        elif hasattr(obj, "__dict__"):
+            stack.append((vars(obj), weight))
+        elif hasattr(obj, "__slots__"):
+            for slot in obj.__slots__:
+                if hasattr(obj, slot):
+                    stack.append((getattr(obj, slot), weight))
+
+    return int(total)
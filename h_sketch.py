@@ -0,0 +1,138 @@
+'''
+Mergeable hits distribution instead of a list of every hit.
+
+Keeps count, sum, min, max.
+First EXACT_LIMIT values are kept as is, so small spells don't pay for a dict.
+After that values go into counts by value, hits of a spell repeat the same few thousand values,
+so memory grows with distinct values instead of hits and table numbers stay exact.
+'''
+
+EXACT_LIMIT = 64
+
+
+class HitsSketch:
+    __slots__ = "count", "sum", "min", "max", "values", "counts"
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sum = 0
+        self.min = 0
+        self.max = 0
+        self.values: list[int] = []
+        # value: count, None until there are more than EXACT_LIMIT values
+        self.counts: dict[int, int] = None
+
+    @classmethod
+    def from_values(cls, values: list[int]):
+        sketch = cls()
+        sketch.count = len(values)
+        if not values:
+            return sketch
+        sketch.sum = sum(values)
+        sketch.min = min(values)
+        sketch.max = max(values)
+        if len(values) <= EXACT_LIMIT:
+            sketch.values = list(values)
+        else:
+            sketch.counts = {}
+            sketch._add_values(values)
+        return sketch
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(count={self.count}, sum={self.sum}, min={self.min}, max={self.max})"
+
+    def add(self, value: int):
+        if self.count:
+            if value < self.min:
+                self.min = value
+            elif value > self.max:
+                self.max = value
+        else:
+            self.min = self.max = value
+        self.count += 1
+        self.sum += value
+
+        if self.counts is None:
+            self.values.append(value)
+            if len(self.values) > EXACT_LIMIT:
+                self._to_counts()
+            return
+
+        self.counts[value] = self.counts.get(value, 0) + 1
+
+    def __iadd__(self, other: "HitsSketch"):
+        if not other.count:
+            return self
+        if self.count:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        else:
+            self.min = other.min
+            self.max = other.max
+        self.count += other.count
+        self.sum += other.sum
+
+        if self.counts is None and other.counts is None and len(self.values) + len(other.values) <= EXACT_LIMIT:
+            self.values.extend(other.values)
+            return self
+
+        if self.counts is None:
+            self._to_counts()
+        if other.counts is None:
+            self._add_values(other.values)
+        else:
+            counts = self.counts
+            for value, count in other.counts.items():
+                counts[value] = counts.get(value, 0) + count
+        return self
+
+    def _to_counts(self):
+        self.counts = {}
+        self._add_values(self.values)
+        self.values = []
+
+    def _add_values(self, values: list[int]):
+        counts = self.counts
+        for value in values:
+            counts[value] = counts.get(value, 0) + 1
+
+    def _sorted_values(self):
+        '''[(value, count)] from the smallest value'''
+        if self.counts is None:
+            return [(value, 1) for value in sorted(self.values)]
+        return sorted(self.counts.items())
+
+    @staticmethod
+    def _tail_sum(values: list[tuple[int, int]], n: int):
+        '''sum of the first n values'''
+        total = 0
+        left = n
+        for value, count in values:
+            if count >= left:
+                return total + value * left
+            total += value * count
+            left -= count
+        return total
+
+    def averages(self):
+        '''avg, max, top 10% avg, top 50% avg, bottom 50% avg, bottom 10% avg, min'''
+        _len = self.count
+        len10 = _len//10 or 1
+        len50 = _len//2 or 1
+        values = self._sorted_values()
+        values_reversed = values[::-1]
+        return [
+            self.sum // _len,
+            self.max,
+            self._tail_sum(values_reversed, len10) // len10,
+            self._tail_sum(values_reversed, len50) // len50,
+            self._tail_sum(values, len50) // len50,
+            self._tail_sum(values, len10) // len10,
+            self.min,
+        ]
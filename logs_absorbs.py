@@ -1,12 +1,20 @@
 from collections import defaultdict
 
+import numpy
+
 import logs_base
+import logs_events
+import logs_lines_index
+import logs_player_spec
 from h_debug import running_time
+from logs_events import EventsData
+from logs_slice_pass import SliceVisitor
 
 # THIS IS A FUCKING DISASTER
 
 DAEGIS = "47753"
 VALANYR = "64413"
+VALANYR_AURA = "64411"
 HEAL_FLAGS = {
     "SPELL_HEAL", "SPELL_PERIODIC_HEAL",
 }
@@ -318,15 +326,20 @@ SHILD_IDS = set(ABSORB_SPELLS) | set(PRIEST_DIVINE_AEGIS)
 SHILD_IDS |= set(MAGE_FROST_WARD) | set(MAGE_FIRE_WARD) | set(MAGE_ICE_BARRIER)
 SHILD_IDS |= set(WARLOCK_SHADOW_WARD) | set(WARLOCK_SACRIFICE)
 
-@running_time
-def parse_absorb_related(logs: list[str], discos: set[str]=None):
-    if discos is None:
-        discos = set()
-    valanyrs = set()
-    events = defaultdict(list)
-    for line in logs:
+class AbsorbEventsVisitor(SliceVisitor):
+    def __init__(self, discos: set[str]=None) -> None:
+        if discos is None:
+            discos = set()
+        self.discos = discos
+        self.valanyrs = set()
+        self.events = defaultdict(list)
+
+    def visit(self, line: str, _line: list[str]):
+        discos = self.discos
+        valanyrs = self.valanyrs
+        events = self.events
         try:
-            timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, *etc = line.split(',')
+            timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, *etc = _line
             if flag == "DAMAGE_SPLIT":
                 if spell_id == "25228":
                     events[source_guid].append((timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, etc[1], 0, 0, etc[0]))
@@ -338,13 +351,13 @@ def parse_absorb_related(logs: list[str], discos: set[str]=None):
                         events[target_guid].append((timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, etc[1], 0, 0, 0))
                 elif source_guid in discos and etc[-1] == "1":
                     events[target_guid].append((timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, etc[1], 0, 0, 0))
-            elif spell_id == "64411":
+            elif spell_id == VALANYR_AURA:
                 valanyrs.add(target_guid)
                 if flag == "SPELL_AURA_REMOVED":
                     valanyrs.remove(target_guid)
             elif spell_id in SHILD_IDS:
                 if flag == "SPELL_CAST_SUCCESS":
-                    continue
+                    return
                 events[target_guid].append((timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, 0, 0, 0, 0))
             else:
                 try:
@@ -354,11 +367,42 @@ def parse_absorb_related(logs: list[str], discos: set[str]=None):
                     elif etc[6] != "0":
                         events[target_guid].append((timestamp, flag, source_guid, source_name, target_guid, target_name, spell_id, spell_name, etc[6], etc[1], etc[4], etc[0]))
                 except IndexError:
-                    continue
+                    return
         except ValueError:
-            continue
+            return
+
+    def result(self):
+        return self.events
+
+SHILD_IDS_INT = [int(spell_id) for spell_id in SHILD_IDS]
+
+def absorb_events_mask(events: EventsData, discos: set[str]):
+    '''
+    Lines AbsorbEventsVisitor doesn't skip:
+    shield auras, damage split, any damage or miss with absorbed part,
+    Val'anyr aura and heals of its holders and discos.
+    '''
+    flag = events.flag
+    valanyr = events.spell == int(VALANYR_AURA)
+    healers = events.guids_mask(discos)
+    healers[events.target[valanyr]] = True
+
+    mask = events.absorbed != 0
+    mask |= valanyr
+    mask |= numpy.isin(events.spell, SHILD_IDS_INT)
+    mask |= numpy.isin(flag, events.flag_ids("DAMAGE_SPLIT"))
+    mask |= numpy.isin(flag, events.flag_ids(*HEAL_FLAGS)) & healers[events.source]
+    return mask
 
-    return events
+@running_time
+def parse_absorb_related(logs: list[str], discos: set[str]=None):
+    visitor = AbsorbEventsVisitor(discos)
+    for line in logs:
+        visitor.visit(line, line.split(','))
+    return visitor.result()
+
+def get_discos(specs: dict[str, int]):
+    return {guid for guid, spec in specs.items() if spec == 21}
 
 def getabsorderindex(spid, offset=0):
     try:
@@ -393,15 +437,26 @@ SPELLS_NAMES = {
 
 
 class Absorbs(logs_base.THE_LOGS):
-    @logs_base.cache_wrap
+    @logs_base.cache_wrap_persistent(depends=(logs_events, logs_lines_index, logs_player_spec))
     def _get_absorbs(self, s, f):
+        '''(absorbs, details) ledger of the segment, every absorbs getter reads it'''
         if not s or not f:
             return {}, {}
 
-        logs_slice = self.LOGS[s:f]
         specs = self.get_players_specs_in_segments(s, f)
-        discos = {guid for guid, spec in specs.items() if spec == 21}
+        discos = get_discos(specs)
+        logs_slice = self.get_absorb_lines(s, f, discos)
         events = parse_absorb_related(logs_slice, discos=discos)
+        return self.absorbs_from_events(events, specs)
+
+    def get_absorb_lines(self, s, f, discos: set[str]):
+        '''only lines of self.LOGS[s:f] that matter for absorbs, found with EVENTS'''
+        mask = absorb_events_mask(self.get_events_slice(s, f), discos)
+        lines = numpy.flatnonzero(mask) + s
+        return self.get_lines_by_index(lines)
+
+    def absorbs_from_events(self, events: dict[str, list[tuple]], specs: dict[str, int]):
+        discos = get_discos(specs)
         ABSORBS: dict[str, dict[str, dict[str, int]]] = {}
         DETAILS = {}
         
@@ -429,7 +484,7 @@ class Absorbs(logs_base.THE_LOGS):
         for s, f in segments:
             _a = self.get_absorbs_details(s, f)
             if target in _a:
-                DETAILS.extend(self.get_absorbs_details(s, f)[target])
+                DETAILS.extend(_a[target])
         return DETAILS
 
     def get_absorbs_by_source(self, s, f):
@@ -0,0 +1,241 @@
+'''
+Aura intervals of players.
+
+Built from EVENTS_DATA once per report and saved as AURA_INTERVALS.npz.
+Every aura event on a player, except removal, starts an interval that lasts until
+the next event of the same aura on the same target, or until the end of the report.
+Aura without SPELL_AURA_APPLIED as the first event was on the target from the start of the report.
+Uptime of any window is intervals clipped to the window, no lines are parsed.
+Same as parsing the window, interval that started before the window counts only
+if it ends inside the window with an event other than SPELL_AURA_APPLIED,
+logs lose SPELL_AURA_REMOVED of players out of range.
+
+Columns, sorted by start:
+target - index in guids
+spell  - spell id as is, callers combine ranks and versions themselves
+start  - ms since the first line of the report
+end    - ms since the first line of the report
+edges  - START_EVENT | END_EVENT if start / end is an aura event and not the report edge,
+         END_APPLIED if end is SPELL_AURA_APPLIED
+'''
+
+import numpy
+
+import logs_events
+from c_path import FileNames, PathExt
+from h_debug import running_time
+
+COLUMNS = {
+    "target": numpy.uint32,
+    "spell": numpy.uint32,
+    "start": numpy.uint32,
+    "end": numpy.uint32,
+    "edges": numpy.uint8,
+}
+START_EVENT = 1
+END_EVENT = 2
+END_APPLIED = 4
+FORMAT_VERSION = 2
+FORMAT_VERSIONS = (FORMAT_VERSION, logs_events.FORMAT_VERSION)
+
+
+def _spells_array(spell_ids):
+    return numpy.fromiter((int(spell_id) for spell_id in spell_ids), dtype=numpy.int64)
+
+
+class AuraIntervalsData:
+    __slots__ = (*COLUMNS, "guids")
+
+    def __init__(self, columns: dict[str, numpy.ndarray], guids: list[str]) -> None:
+        for column_name in COLUMNS:
+            setattr(self, column_name, columns[column_name])
+        self.guids = guids
+
+    def __len__(self):
+        return len(self.start)
+
+    def window(self, first_ms: int, last_ms: int, spell_ids=None):
+        '''indexes of intervals that overlap [first_ms, last_ms] and are carried into it'''
+        started = numpy.searchsorted(self.start, last_ms)
+        indexes = numpy.flatnonzero(self.end[:started] > first_ms)
+        edges = self.edges[indexes]
+        carried = (
+            ((edges & (END_EVENT | END_APPLIED)) == END_EVENT)
+            & (self.end[indexes] <= last_ms)
+        )
+        indexes = indexes[(self.start[indexes] >= first_ms) | carried]
+        if spell_ids is not None:
+            indexes = indexes[numpy.isin(self.spell[indexes], _spells_array(spell_ids))]
+        return indexes
+
+    def uptime(
+        self,
+        first_ms: int,
+        last_ms: int,
+        spell_ids=None,
+        max_duration: dict[str, float]=None,
+        default_duration: float=None,
+        ignored: float=0.0,
+        ignored_forced=frozenset(),
+    ):
+        '''
+        (target guid, spell id, count, seconds) of every aura in [first_ms, last_ms].
+        Intervals are capped by max_duration of the spell,
+        intervals shorter than ignored seconds are skipped, except spells from ignored_forced.
+        '''
+        indexes = self.window(first_ms, last_ms, spell_ids)
+        start = numpy.maximum(self.start[indexes], first_ms).astype(numpy.int64)
+        end = numpy.minimum(self.end[indexes], last_ms).astype(numpy.int64)
+        seconds = (end - start) / 1000
+        spells = self.spell[indexes]
+
+        if max_duration is not None:
+            spells_unique, spells_inverse = numpy.unique(spells, return_inverse=True)
+            durations = numpy.array([
+                max_duration.get(str(spell_id), default_duration)
+                for spell_id in spells_unique.tolist()
+            ], dtype=numpy.float64)
+            seconds = numpy.minimum(seconds, durations[spells_inverse])
+
+        keep = seconds > 0
+        if ignored:
+            keep &= (seconds >= ignored) | numpy.isin(spells, _spells_array(ignored_forced))
+        seconds = seconds[keep]
+        keys = self.target[indexes][keep].astype(numpy.int64) << 32 | spells[keep]
+
+        keys_unique, keys_inverse = numpy.unique(keys, return_inverse=True)
+        counts = numpy.bincount(keys_inverse)
+        sums = numpy.bincount(keys_inverse, weights=seconds)
+        for key, count, total in zip(keys_unique.tolist(), counts.tolist(), sums.tolist()):
+            yield self.guids[key >> 32], str(key & 0xFFFFFFFF), count, total
+
+    def targets_count(self, first_ms: int, last_ms: int, spell_ids):
+        '''{spell id: number of targets} that had the aura in [first_ms, last_ms]'''
+        indexes = self.window(first_ms, last_ms, spell_ids)
+        keys = self.spell[indexes].astype(numpy.int64) << 32 | self.target[indexes]
+        spells = numpy.unique(keys) >> 32
+        spells_unique, counts = numpy.unique(spells, return_counts=True)
+        return {
+            str(spell_id): count
+            for spell_id, count in zip(spells_unique.tolist(), counts.tolist())
+        }
+
+    def events_ms(self, first_ms: int, last_ms: int, spell_id: str):
+        '''sorted ms of events of the aura on any target in [first_ms, last_ms]'''
+        indexes = self.window(first_ms, last_ms, (spell_id, ))
+        edges = self.edges[indexes]
+        starts = self.start[indexes][(edges & START_EVENT) > 0]
+        ends = self.end[indexes][(edges & END_EVENT) > 0]
+        timestamps = numpy.unique(numpy.concatenate((starts, ends)))
+        first, last = numpy.searchsorted(timestamps, (first_ms, last_ms + 1))
+        return timestamps[first:last]
+
+    @classmethod
+    @running_time
+    def from_events(cls, events: logs_events.EventsData):
+        flags = events.flags
+        applied_id = flags.index("SPELL_AURA_APPLIED")
+        removed_id = flags.index("SPELL_AURA_REMOVED")
+        is_player = numpy.array([
+            guid[:3] == "0x0" and guid != logs_events.NIL_GUID
+            for guid in events.guids
+        ], dtype=numpy.bool_)
+        last_ms = int(events.ms[-1]) if len(events) else 0
+
+        rows = numpy.flatnonzero(events.flag_mask("SPELL_AURA") & is_player[events.target])
+        target = events.target[rows]
+        spell = events.spell[rows]
+        order = numpy.lexsort((rows, spell, target))
+        target = target[order]
+        spell = spell[order]
+        ms = events.ms[rows][order]
+        flag = events.flag[rows][order]
+
+        same_next = (target[1:] == target[:-1]) & (spell[1:] == spell[:-1])
+        next_ms = numpy.full(len(rows), last_ms, dtype=numpy.uint32)
+        next_ms[:-1] = numpy.where(same_next, ms[1:], last_ms)
+        end_event = numpy.zeros(len(rows), dtype=numpy.bool_)
+        end_event[:-1] = same_next
+        end_applied = numpy.zeros(len(rows), dtype=numpy.bool_)
+        end_applied[:-1] = same_next & (flag[1:] == applied_id)
+        group_first = numpy.ones(len(rows), dtype=numpy.bool_)
+        group_first[1:] = ~same_next
+
+        active = flag != removed_id
+        from_start = group_first & (flag != applied_id)
+        columns = {
+            "target": numpy.concatenate((target[active], target[from_start])),
+            "spell": numpy.concatenate((spell[active], spell[from_start])),
+            "start": numpy.concatenate((ms[active], numpy.zeros(from_start.sum(), dtype=numpy.uint32))),
+            "end": numpy.concatenate((next_ms[active], ms[from_start])),
+            "edges": numpy.concatenate((
+                START_EVENT | end_event[active] * END_EVENT | end_applied[active] * END_APPLIED,
+                numpy.full(from_start.sum(), END_EVENT),
+            )),
+        }
+        order = numpy.argsort(columns["start"], kind="stable")
+        columns = {
+            column_name: columns[column_name][order].astype(dtype)
+            for column_name, dtype in COLUMNS.items()
+        }
+        return cls(columns, events.guids)
+
+    @classmethod
+    def read(cls, path: PathExt):
+        with numpy.load(path, allow_pickle=False) as data:
+            logs_events.check_format_version(data, FORMAT_VERSIONS)
+            columns = {column_name: data[column_name] for column_name in COLUMNS}
+            guids = data["guids"].tolist()
+        return cls(columns, guids)
+
+    def write(self, path: PathExt):
+        columns = {column_name: getattr(self, column_name) for column_name in COLUMNS}
+        with open(path, "wb") as f:
+            numpy.savez_compressed(
+                f,
+                format_version=logs_events.format_version_array(FORMAT_VERSIONS),
+                guids=numpy.array(self.guids, dtype=str),
+                **columns,
+            )
+
+
+def write_aura_intervals(path: PathExt, events: logs_events.EventsData):
+    aura_intervals = AuraIntervalsData.from_events(events)
+    aura_intervals.write(path)
+    return aura_intervals
+
+
+class AuraIntervals(logs_events.Events):
+    @property
+    def AURA_INTERVALS(self) -> AuraIntervalsData:
+        try:
+            return self.__AURA_INTERVALS
+        except AttributeError:
+            pass
+        with self.locks("AURA_INTERVALS"):
+            try:
+                return self.__AURA_INTERVALS
+            except AttributeError:
+                self.__AURA_INTERVALS = self._get_aura_intervals()
+                return self.__AURA_INTERVALS
+
+    def release_logs(self):
+        super().release_logs()
+        try:
+            del self.__AURA_INTERVALS
+        except AttributeError:
+            pass
+
+    def _get_aura_intervals(self):
+        try:
+            return self._read_aura_intervals()
+        except Exception:
+            return self._redo_aura_intervals()
+
+    def _read_aura_intervals(self):
+        return AuraIntervalsData.read(self.relative_path(FileNames.logs_aura_intervals))
+
+    @running_time
+    def _redo_aura_intervals(self):
+        aura_intervals_path = self.relative_path(FileNames.logs_aura_intervals)
+        return write_aura_intervals(aura_intervals_path, self.EVENTS)
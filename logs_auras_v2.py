@@ -1,6 +1,11 @@
 from collections import defaultdict
 
+import numpy
+
+import logs_aura_intervals
 import logs_base
+import logs_clock
+import logs_events
 from h_debug import running_time
 from h_other import sort_dict_by_value
 
@@ -258,95 +263,13 @@ class AuraUptimeDuration(Aura):
     pass
 
 
-class AuraLine:
-    __slots__ = "timestamp", "flag"
-    def __init__(self, timestamp: str, flag: str) -> None:
-        self.timestamp = timestamp
-        self.flag = flag
-
-    def __str__(self):
-        return f"{self.timestamp} | {self.flag}"
-
-class AuraLines(list[AuraLine]):
-    def calc_total_uptime(self, spell_id: str, delta_func):
-        MAX_DURATION = SPELLS.get(spell_id, DEFAULT_DURATION)
-        applied_timestamp = None
-        aura = AuraUptimeDuration()
-        for aura_line in self:
-            if applied_timestamp is not None:
-                _delta = delta_func(applied_timestamp, aura_line.timestamp)
-                _delta = min(_delta, MAX_DURATION)
-                if _delta < UPTIME_IGNORED and spell_id not in UPTIME_IGNORED_FORCED:
-                    continue
-                if _delta > 0:
-                    aura.count += 1
-                    aura.uptime += _delta
-            if aura_line.flag == "SPELL_AURA_REMOVED":
-                applied_timestamp = None
-            else:
-                applied_timestamp = aura_line.timestamp
-        return aura
-
-
-class AuraLinesSources(dict[str, AuraLines]):
-    def __missing__(self, key):
-        v = self[key] = AuraLines()
-        return v
+def check_icc_buff(targets_count: dict[str, int]):
+    icc = defaultdict(int)
+    for spell_id, count in targets_count.items():
+        icc[MULTISPELLS_D.get(spell_id, spell_id)] += count
 
-
-class AuraLinesByTarget(dict[str, AuraLinesSources]):
-    def __missing__(self, key):
-        v = self[key] = AuraLinesSources()
-        return v
-    
-    @running_time
-    def __init__(self, logs_slice: list[str]):
-        for line in logs_slice:
-            if "SPELL_A" not in line:
-                continue
-            _line = line.split(',', 7)
-            if _line[6] not in SPELLS:
-                continue
-
-            # if _line[6] == "16886":
-            #     print(line)
-            
-            spell_id = MULTISPELLS_D.get(_line[6], _line[6])
-            self[_line[4]][spell_id].append(AuraLine(*_line[:2]))
-        
-        self._add_missing_events(logs_slice)
-
-    def _add_missing_events(self, logs_slice: list[str]):
-        first_timestamp = logs_slice[0].split(',', 1)[0]
-        last_timestamp = logs_slice[-1].split(',', 1)[0]
-        AURA_APPLIED = AuraLine(first_timestamp, "SPELL_AURA_APPLIED")
-        AURA_REMOVED = AuraLine(last_timestamp, "SPELL_AURA_REMOVED")
-        for spells in self.values():
-            for aura_timestamps in spells.values():
-                if aura_timestamps[0].flag != "SPELL_AURA_APPLIED":
-                    aura_timestamps.insert(0, AURA_APPLIED)
-                if aura_timestamps[-1].flag != "SPELL_AURA_REMOVED":
-                    aura_timestamps.append(AURA_REMOVED)
-
-    def check_icc_buff(self):
-        icc = defaultdict(int)
-        for target_guid, target_data in self.items():
-            for spell_id in target_data:
-                if spell_id in ICC_BUFFS:
-                    icc[spell_id] += 1
-
-        if icc:
-            return list(sort_dict_by_value(icc))[0]
-
-    def room_grabs_timestamps(self):
-        timestamps = set()
-        for target_guid, target_data in self.items():
-            for spell_id, aura_lines in target_data.items():
-                if spell_id != ROOM_AURA_ID:
-                    continue
-                g_timestamps = (aura_line.timestamp for aura_line in aura_lines)
-                timestamps.update(g_timestamps)
-        return timestamps
+    if icc:
+        return list(sort_dict_by_value(icc))[0]
 
 
 class AuraUptimeDurationByTarget(dict[str, dict[str, AuraUptimeDuration]]):
@@ -355,14 +278,14 @@ class AuraUptimeDurationByTarget(dict[str, dict[str, AuraUptimeDuration]]):
         return v
     
     # @running_time
-    def __init__(self, data: AuraLinesByTarget, delta_func) -> None:
-        for target_guid, target_data in data.items():
-            for spell_id, aura_timestamps in target_data.items():
-                if target_guid[:3] != "0x0":
-                    continue
-                aura = aura_timestamps.calc_total_uptime(spell_id, delta_func)
-                if not aura.count:
-                    continue
+    def __init__(self, uptimes) -> None:
+        '''uptimes are (target guid, spell id, count, seconds) from AuraIntervalsData.uptime'''
+        for target_guid, spell_id, count, seconds in uptimes:
+            spell_id = MULTISPELLS_D.get(spell_id, spell_id)
+            aura = AuraUptimeDuration(count, seconds)
+            try:
+                self[target_guid][spell_id] += aura
+            except KeyError:
                 self[target_guid][spell_id] = aura
 
 
@@ -381,19 +304,27 @@ class AuraUptimePercentageByTarget(dict[str, dict[str, AuraUptimePercentage]]):
 
 
 class AurasUptimes(logs_base.THE_LOGS):
-    @logs_base.cache_wrap
+    @logs_base.cache_wrap_persistent(depends=(logs_aura_intervals, logs_events, logs_clock))
     @running_time
     def get_auras_uptime_duration(self, s, f):
-        logs_slice = self.LOGS[s:f]
-        auras_lines = AuraLinesByTarget(logs_slice)
-        auras_uptime = AuraUptimeDurationByTarget(auras_lines, self.get_timedelta_seconds)
+        first_ms, last_ms = self.get_slice_edges_ms(s, f)
+        intervals = self.AURA_INTERVALS
+        auras_uptime = AuraUptimeDurationByTarget(intervals.uptime(
+            first_ms,
+            last_ms,
+            spell_ids=SPELLS,
+            max_duration=SPELLS,
+            default_duration=DEFAULT_DURATION,
+            ignored=UPTIME_IGNORED,
+            ignored_forced=UPTIME_IGNORED_FORCED,
+        ))
 
         custom_auras = {}
-        _room_timestamps = auras_lines.room_grabs_timestamps()
-        if _room_timestamps:
-            custom_auras[ROOM_AURA_ID] = self._aura_lk_room(_room_timestamps, logs_slice[-1])
+        room_timestamps = intervals.events_ms(first_ms, last_ms, ROOM_AURA_ID)
+        if len(room_timestamps):
+            custom_auras[ROOM_AURA_ID] = self._aura_lk_room(room_timestamps, last_ms)
         
-        icc_buff = auras_lines.check_icc_buff()
+        icc_buff = check_icc_buff(intervals.targets_count(first_ms, last_ms, ICC_BUFFS))
         if icc_buff:
             duration = self.get_slice_duration(s, f)
             custom_auras[icc_buff] = AuraUptimeDuration(1, duration)
@@ -416,17 +347,12 @@ class AurasUptimes(logs_base.THE_LOGS):
         s, f = self.get_enc_data()[boss][attempt]
         return self.get_auras_uptime_percentage(s, f)
 
-    def _aura_lk_room(self, _room_timestamps: set[str], last_line: str):
-        room_aura = AuraUptimeDuration(count=1)
-        
-        room_timestamps = sorted(_room_timestamps)
-        for x, y in zip(room_timestamps, room_timestamps[1:]):
-            if self.get_timedelta_seconds(x, y) > 60:
-                room_aura.count += 1
-                room_aura.uptime += ROOM_DURATION
+    def _aura_lk_room(self, room_timestamps: numpy.ndarray, last_ms: int):
+        grabs = int((numpy.diff(room_timestamps.astype(numpy.int64)) > 60_000).sum())
+        room_aura = AuraUptimeDuration(count=1+grabs, uptime=grabs*ROOM_DURATION)
         
-        last_grab = room_timestamps[-1]
-        gap_after_last_room_grab = self.get_timedelta_seconds(last_grab, last_line)
+        last_grab = int(room_timestamps[-1])
+        gap_after_last_room_grab = (last_ms - last_grab) / 1000
         room_aura.uptime += min(gap_after_last_room_grab, ROOM_DURATION)
         if gap_after_last_room_grab < 10:
             room_aura.count -= 1
@@ -4,12 +4,13 @@ Example (every minute with a lock):
 */1 * * * * /usr/bin/flock -n /tmp/fcj.lockfile /usr/bin/python3 /home/uwu-logs/logs_auto.py
 
 For testing, run it when needed manually.
+
+Prewarm of new reports is configured with PREWARM_PAGES and PREWARM_PROCESSES or from command line:
+--prewarm=report,useful    only these pages, --prewarm=none to skip
+--prewarm-processes=2      worker processes, default is same as for tops
 '''
 
-<<<<<<< HEAD
-=======
 # imports (en haut du fichier)
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
 import itertools
 import os
 import sys
@@ -17,15 +18,13 @@ from collections import defaultdict
 from concurrent.futures import ProcessPoolExecutor
 from time import perf_counter
 
-<<<<<<< HEAD
-=======
 from functools import partial
 import top_gear as TG          # <= un seul import de top_gear
 import parser_profile as P
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
 import api_7z
 import api_top_db_v2
 import logs_calendar
+import logs_prewarm
 import logs_top
 from constants import DEFAULT_SERVER_NAME
 from c_path import Directories, FileNames
@@ -34,11 +33,13 @@ from h_other import get_report_name_info
 
 LOGGER_UPLOADS = Loggers.uploads
 
-<<<<<<< HEAD
-=======
+# pages from logs_prewarm.PAGES, computed for every kill segment of new reports
+PREWARM_PAGES = tuple(logs_prewarm.PAGES)
+# None - same as for tops
+PREWARM_PROCESSES = None
+
 # OK de s'assurer que le dossier existe au chargement
 Directories.gear.mkdir(parents=True, exist_ok=True)
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
 
 def remove_old_dublicate(report_id: str):
     if DEFAULT_SERVER_NAME in report_id:
@@ -61,15 +62,11 @@ def save_raw_logs(report_id: str):
     archive = api_7z.SevenZipArchive(archive_path)
     return_code = archive.create(pending_text)
     if return_code == 0:
-<<<<<<< HEAD
-        pending_text.unlink()
-=======
         try:
             if pending_text.is_file():
                 pending_text.unlink()
         except FileNotFoundError:
             pass
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
         remove_old_dublicate(report_id)
         LOGGER_UPLOADS.debug(f'{get_ms_str(pc)} | {report_id:50} | Saved raw')
         return
@@ -95,12 +92,6 @@ def gen_top_data(top_data: dict):
             table_name = api_top_db_v2.TopDB.get_table_name(boss_name, mode)
             yield table_name, data
 
-<<<<<<< HEAD
-
-def add_new_top_data(server, reports):
-    top_data: dict[str, dict[str, list[dict]]]
-
-=======
 def get_players_from_top(top_data: dict) -> set[str]:
     players = set()
     for _table_name, data in gen_top_data(top_data):
@@ -167,7 +158,6 @@ def build_gear_for_reports(server: str, reports: list[str]):
 
 
 def add_new_top_data(server, reports):
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
     pc = perf_counter()
 
     errors = set()
@@ -181,14 +171,6 @@ def add_new_top_data(server, reports):
                 break
             _data[table_name].extend(data)
 
-<<<<<<< HEAD
-    api_top_db_v2.TopDB(server, new=True).add_new_entries_wrap(_data)
-    
-    LOGGER_UPLOADS.debug(f'{get_ms_str(pc)} | Saved top | {server}')
-
-    return errors
-
-=======
     # crée/ouvre la DB TOP (comme avant)
     api_top_db_v2.TopDB(server, new=True).add_new_entries_wrap(_data)
 
@@ -196,7 +178,6 @@ def add_new_top_data(server, reports):
     return errors
 
 
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
 def group_reports_by_server(new_logs):
     new_logs = sorted(new_logs, key=_report_server)
     return itertools.groupby(new_logs, key=_report_server)
@@ -221,6 +202,45 @@ def make_top_data(new_logs: list[str], processes: int=1):
         if not done
     )
 
+def _prewarm_report(report_id: str, pages: tuple[str]):
+    try:
+        return report_id, logs_prewarm.prewarm_report(report_id, pages)
+    except Exception:
+        LOGGER_UPLOADS.exception(f'{report_id:50} | Prewarm')
+        return report_id, False
+
+def prewarm_reports(new_logs: list[str], pages: tuple[str], processes: int=1):
+    if not pages:
+        return
+    
+    pc = perf_counter()
+    pages_list = [pages] * len(new_logs)
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            done_data = list(executor.map(_prewarm_report, new_logs, pages_list))
+    else:
+        done_data = [
+            _prewarm_report(report_id, pages)
+            for report_id in new_logs
+        ]
+    
+    failed = [report_id for report_id, done in done_data if not done]
+    LOGGER_UPLOADS.debug(f'{get_ms_str(pc)} | Prewarm | {len(new_logs) - len(failed)}/{len(new_logs)} | {",".join(pages)}')
+
+def get_prewarm_config(argv: list[str]):
+    pages = PREWARM_PAGES
+    processes = PREWARM_PROCESSES
+    for arg in argv:
+        if arg.startswith("--prewarm="):
+            value = arg.split("=", 1)[1]
+            if value == "none":
+                pages = ()
+            else:
+                pages = tuple(page for page in value.split(",") if page in logs_prewarm.PAGES)
+        elif arg.startswith("--prewarm-processes="):
+            processes = int(arg.split("=", 1)[1])
+    return pages, processes
+
 def add_to_archives(new_logs: list[str], processes: int=1):
     api_7z.SevenZip().download()
 
@@ -242,7 +262,7 @@ def remove_errors(reports: list, errors: list, func="?"):
 
     print(f"logs left {len(reports):3} {func}")
 
-def main(multiprocessing=True):
+def main(multiprocessing=True, prewarm_pages=PREWARM_PAGES, prewarm_processes=PREWARM_PROCESSES):
     if not Directories.pending_archive.is_dir():
         return
     
@@ -269,8 +289,6 @@ def main(multiprocessing=True):
 
     remove_errors(NEW_LOGS, errors, func="add_new_top_data")
 
-<<<<<<< HEAD
-=======
     # === Build/Update gear DB par serveur, à partir des reports traités ===
     for server, reports_iter in group_reports_by_server(NEW_LOGS):
         reports = list(reports_iter)  # matérialiser l’itérateur !
@@ -278,10 +296,15 @@ def main(multiprocessing=True):
     # === fin gear ===
 
 
->>>>>>> a94d2b1 (Initial commit du projet uwu-logs avec mes modifs)
     # needs player and encounter data, thats why after logs top
     logs_calendar.add_new_logs(NEW_LOGS)
 
+    if not multiprocessing:
+        prewarm_processes = 1
+    elif prewarm_processes is None:
+        prewarm_processes = MAX_CPU
+    prewarm_reports(NEW_LOGS, prewarm_pages, prewarm_processes)
+
     add_to_archives(NEW_LOGS, MAX_CPU)
 
     for report_id in NEW_LOGS:
@@ -291,10 +314,11 @@ def main(multiprocessing=True):
 
 def main_wrap():
     no_debug = "--debug" not in sys.argv
+    prewarm_pages, prewarm_processes = get_prewarm_config(sys.argv[1:])
     pc = perf_counter()
     try:
         LOGGER_UPLOADS.debug(f'{get_ms_str(pc)} | Auto start')
-        main(multiprocessing=no_debug)
+        main(multiprocessing=no_debug, prewarm_pages=prewarm_pages, prewarm_processes=prewarm_processes)
         LOGGER_UPLOADS.debug(f'{get_ms_str(pc)} | Auto finish')
     except Exception:
         LOGGER_UPLOADS.exception(f'{get_ms_str(pc)} | Auto error')
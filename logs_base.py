@@ -1,13 +1,22 @@
 from c_player_classes import SPECS_LIST
 
 import json
-from bisect import bisect_left
+from bisect import bisect_right
+from time import perf_counter
 
+import h_metrics
+import logs_aura_intervals
+import logs_core
 import logs_fight_separator
 import logs_get_time
+import logs_lines_index
 import logs_player_spec
+import logs_slice_cache
+import logs_slice_pass
 import logs_spells_list
 import logs_units_guid
+import logs_units_table
+from c_path import FileNames
 from h_debug import Loggers, running_time
 
 
@@ -21,22 +30,64 @@ TOTAL_DUMMY_SPEC = {
     "class": "total",
 }
 
+def _cached_slices(cache: dict, func_name: str, args: tuple):
+    cached_data = cache[func_name]
+    for arg in args:
+        if not isinstance(arg, TYPES):
+            break
+        cached_data = cached_data[arg]
+    return cached_data
+
 def cache_wrap(func):
     def cache_inner(self, s, f, *args, **kwargs):
         slice_ID = f"{s}_{f}"
-        cached_data = self.CACHE[func.__name__]
-        for arg in args:
-            if not isinstance(arg, TYPES):
-                break
-            cached_data = cached_data[arg]
-            
+        cached_data = _cached_slices(self.CACHE, func.__name__, args)
         if slice_ID in cached_data:
+            h_metrics.observe_slice_hit(func.__name__, "memory")
             return cached_data[slice_ID]
         
-        data = func(self, s, f, *args, **kwargs)
-        cached_data[slice_ID] = data
-        return data
+        with self.locks(logs_core.flight_key(func.__name__, slice_ID, args)):
+            if slice_ID in cached_data:
+                h_metrics.observe_slice_hit(func.__name__, "memory")
+                return cached_data[slice_ID]
+            timestamp = perf_counter()
+            data = func(self, s, f, *args, **kwargs)
+            h_metrics.observe_slice_miss(func.__name__, s, f, perf_counter() - timestamp)
+            self.store_slice(cached_data, slice_ID, data)
+            return data
+
+    cache_inner.cache_name = func.__name__
+    cache_inner.cache_version = None
+    return cache_inner
 
+def cache_wrap_persistent(func=None, *, depends: tuple=()):
+    '''
+    cache_wrap + results are saved to SLICE_CACHE.db in report folder.
+    @cache_wrap_persistent(depends=(module, ...)) for results that change with other modules.
+    '''
+    if func is None:
+        return lambda func: cache_wrap_persistent(func, depends=depends)
+
+    func_version = logs_slice_cache.function_version(func, depends)
+
+    def cache_inner(self: "THE_LOGS", s, f, *args, **kwargs):
+        persistent = not kwargs
+        found, data = self.cache_get(cache_inner, s, f, *args, persistent=persistent)
+        if found:
+            return data
+
+        with self.locks(logs_core.flight_key(func.__name__, f"{s}_{f}", args)):
+            found, data = self.cache_get(cache_inner, s, f, *args, persistent=False)
+            if found:
+                return data
+            timestamp = perf_counter()
+            data = logs_slice_cache.to_plain(func(self, s, f, *args, **kwargs))
+            h_metrics.observe_slice_miss(func.__name__, s, f, perf_counter() - timestamp)
+            self.cache_set(cache_inner, s, f, data, *args, persistent=persistent)
+            return data
+
+    cache_inner.cache_name = func.__name__
+    cache_inner.cache_version = func_version
     return cache_inner
 
 
@@ -44,6 +95,8 @@ class THE_LOGS(
     logs_fight_separator.Fights,
     logs_spells_list.Spells,
     logs_get_time.Timestamps,
+    logs_lines_index.LinesIndex,
+    logs_aura_intervals.AuraIntervals,
 ):
     @property
     def ALL_GUIDS(self) -> dict[str, dict[str, str]]:
@@ -75,6 +128,19 @@ class THE_LOGS(
         self._guids_data()
         return self._guids_classes
         
+    @property
+    def UNITS(self) -> logs_units_table.UnitsTable:
+        try:
+            return self._units_table
+        except AttributeError:
+            pass
+        with self.locks("UNITS"):
+            try:
+                return self._units_table
+            except AttributeError:
+                self._units_table = self._get_units_table()
+                return self._units_table
+
     @property
     def PLAYERS_NAMES(self):
         try:
@@ -140,11 +206,76 @@ class THE_LOGS(
             self._controlled_units = {}
             return self._controlled_units
 
-    def _guids_data(self):
+    @property
+    def SLICE_CACHE(self):
         try:
-            self._read_guids()
-        except FileNotFoundError:
-            self._redo_guids()
+            return self._slice_cache
+        except AttributeError:
+            pass
+        with self.locks("SLICE_CACHE"):
+            try:
+                return self._slice_cache
+            except AttributeError:
+                slice_cache_path = self.relative_path(FileNames.logs_slice_cache)
+                self._slice_cache = logs_slice_cache.SliceCache(slice_cache_path)
+                return self._slice_cache
+
+    def cache_get(self, method, s, f, *args, persistent=True):
+        '''(found, data) for method wrapped with cache_wrap or cache_wrap_persistent, without calling it'''
+        slice_ID = f"{s}_{f}"
+        cached_data = _cached_slices(self.CACHE, method.cache_name, args)
+        if slice_ID in cached_data:
+            h_metrics.observe_slice_hit(method.cache_name, "memory")
+            return True, cached_data[slice_ID]
+
+        if not persistent or method.cache_version is None:
+            return False, None
+
+        key = logs_slice_cache.cache_key(method.cache_name, args, slice_ID)
+        if key is None:
+            return False, None
+
+        found, data = self.SLICE_CACHE.get(key, method.cache_version)
+        if found:
+            h_metrics.observe_slice_hit(method.cache_name, "disk")
+            self.store_slice(cached_data, slice_ID, data)
+        return found, data
+
+    def cache_set(self, method, s, f, data, *args, persistent=True):
+        if method.cache_version is not None:
+            data = logs_slice_cache.to_plain(data)
+        slice_ID = f"{s}_{f}"
+        cached_data = _cached_slices(self.CACHE, method.cache_name, args)
+        self.store_slice(cached_data, slice_ID, data)
+
+        if not persistent or method.cache_version is None:
+            return
+
+        key = logs_slice_cache.cache_key(method.cache_name, args, slice_ID)
+        if key is not None:
+            self.SLICE_CACHE.set(key, method.cache_version, data)
+
+    def run_slice_visitors(self, s, f, visitors: dict[tuple, logs_slice_pass.SliceVisitor]):
+        '''
+        One pass over self.LOGS[s:f] for all visitors.
+        visitors = {(method, *args): visitor}, visitor's result is cached as method(s, f, *args)
+        '''
+        if not visitors:
+            return
+
+        results = logs_slice_pass.run_visitors(self.LOGS[s:f], visitors.values())
+        for (method, *args), data in zip(visitors, results):
+            self.cache_set(method, s, f, data, *args)
+
+    def _guids_data(self):
+        with self.locks("GUIDS"):
+            # other thread loaded them while this one waited
+            if hasattr(self, "_guids_classes"):
+                return
+            try:
+                self._read_guids()
+            except FileNotFoundError:
+                self._redo_guids()
 
     def _read_guids(self):
         self._guids_all = self.relative_path("GUIDS_DATA.json").json()
@@ -171,6 +302,24 @@ class THE_LOGS(
         for file_name, data in to_write:
             self.relative_path(file_name).json_write(data, indent=2)
 
+    def _get_units_table(self):
+        try:
+            return self._read_units_table()
+        except Exception:
+            return self._redo_units_table()
+
+    def _read_units_table(self):
+        units_table = logs_units_table.UnitsTable.read(self.relative_path(FileNames.logs_units_table))
+        if units_table.guids != self.EVENTS.guids:
+            raise ValueError("units table doesn't match events")
+        return units_table
+
+    @running_time
+    def _redo_units_table(self):
+        units_table = logs_units_table.UnitsTable.from_events(self.EVENTS, self.ALL_GUIDS)
+        units_table.write(self.relative_path(FileNames.logs_units_table))
+        return units_table
+
     def get_players_guids(self, whitelist_guids=None, whitelist_names=None):
         players = self.PLAYERS_GUIDS
         if whitelist_guids is not None:
@@ -183,7 +332,12 @@ class THE_LOGS(
     @cache_wrap
     def get_players_specs_in_segments(self, s, f) -> dict[str, int]:
         '''specs = {guid: spec_index}'''
-        logs_slice = self.LOGS[s:f]
+        if s is None:
+            s = 0
+        if f is None:
+            f = len(self.LOGS)
+        # don't decode whole slice, only first lines are used
+        logs_slice = self.LOGS[s:min(f, s+logs_player_spec.SPECS_LINES)]
         return logs_player_spec.get_specs(logs_slice, self.PLAYERS_GUIDS, self.PLAYER_CLASSES)
     
     def get_slice_spec_info(self, s, f):
@@ -279,37 +433,21 @@ class THE_LOGS(
             self._classes_with_names_json = json.dumps(self.CLASSES_NAMES)
             return self._classes_with_names_json
     
-    def find_index(self, line_index: int, shift: int=0, slice_end=False):
-        if line_index is None:
-            if slice_end:
-                return self.TIMESTAMPS[-1]
-            return 0
-        if not shift:
-            shift = 0
-        shifted = bisect_left(self.TIMESTAMPS, line_index) + shift
-        return max(shifted, 0)
-    
-    def find_shifted_log_line(self, line_index: int, shift: int):
-        if not line_index or not shift:
-            return line_index
-        new_index = self.find_index(line_index, shift)
-        return self.TIMESTAMPS[new_index]
-    
     def find_sec_from_start(self, s):
-        return self.get_timedelta_seconds(self.LOGS[0], self.LOGS[s])
+        return self.get_lines_delta(0, s)
     
     def precise_shift(self, from_index: int, shift_seconds: int):
         if not shift_seconds:
             return from_index
-        first_line = self.LOGS[from_index]
         shifted_index = shift_seconds + int(self.find_sec_from_start(from_index))
-        s = self.TIMESTAMPS[shifted_index-1]
-        f = self.TIMESTAMPS[shifted_index+1]
-        for i, current_line in enumerate(self.LOGS[s:f]):
-            td = self.get_timedelta(first_line, current_line).total_seconds()
-            if td > shift_seconds:
-                return s+i
-        return self.TIMESTAMPS[shifted_index]
+        s = self.get_second_line(shifted_index-1)
+        f = self.get_second_line(shifted_index+1)
+        shifted_ms = self.get_line_ms(from_index) + shift_seconds * 1000
+        # first line in [s, f) more than shift_seconds after from_index
+        i = bisect_right(self.CLOCK[s:f].tolist(), shifted_ms)
+        if s + i < f:
+            return s + i
+        return self.get_second_line(shifted_index)
 
 
     def get_all_guids(self):
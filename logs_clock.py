@@ -0,0 +1,150 @@
+'''
+Per line millisecond clock.
+
+CLOCK.ms - uint32 ms since the first line for every line of LOGS_CUT,
+midnight and new year rollover included, bugged and out of order lines keep the previous line time.
+Written on upload from EVENTS_DATA ms column, made from LOGS for older reports.
+
+Time between 2 lines is CLOCK[b] - CLOCK[a] instead of parsing both timestamps to datetime.
+'''
+
+from datetime import date
+
+import numpy
+
+import logs_core
+from c_path import FileNames, PathExt
+from h_debug import running_time
+
+
+class LineClock:
+    '''Converts "6/25 21:46:32.302" to ms since the first converted timestamp.
+    Handles midnight and new year rollover.'''
+    def __init__(self, year: int) -> None:
+        self.year = year
+        self.last_month = None
+        self.first_day = None
+        self.days: dict[str, int] = {}
+        self.first_ms = None
+        self.last_ms = 0
+
+    def _day(self, date_str: str):
+        try:
+            return self.days[date_str]
+        except KeyError:
+            pass
+
+        month, day = map(int, date_str.split("/"))
+        if self.last_month is not None and month < self.last_month:
+            self.year += 1
+        self.last_month = month
+
+        ordinal = date(self.year, month, day).toordinal()
+        if self.first_day is None:
+            self.first_day = ordinal
+
+        self.days[date_str] = ordinal - self.first_day
+        return self.days[date_str]
+
+    def __call__(self, timestamp: str):
+        date_str, _, time_str = timestamp.partition(" ")
+        hms, ms = time_str.strip().split(".")
+        h, m, s = hms.split(":")
+        seconds = self._day(date_str) * 86400 + int(h) * 3600 + int(m) * 60 + int(s)
+        return seconds * 1000 + int(ms)
+
+    def line_ms(self, timestamp: str):
+        '''ms since the first line, never less than the previous line ms.
+        Bugged and out of order lines keep the previous line time,
+        so the column is sorted and fits uint32.'''
+        try:
+            ms = self(timestamp)
+        except ValueError:
+            return self.last_ms
+        if self.first_ms is None:
+            self.first_ms = ms
+        self.last_ms = max(ms - self.first_ms, self.last_ms)
+        return self.last_ms
+
+
+@running_time
+def lines_ms(lines: list[str], year: int):
+    clock = LineClock(year)
+    ms = numpy.zeros(len(lines), dtype=numpy.uint32)
+    for i, line in enumerate(lines):
+        ms[i] = clock.line_ms(line.split(",", 1)[0])
+    return ms
+
+def write_clock(path: PathExt, ms: numpy.ndarray):
+    path_temp = path.with_name(f"{path.name}.tmp")
+    ms.astype(numpy.uint32).tofile(path_temp)
+    path_temp.replace(path)
+
+def read_clock(path: PathExt):
+    return numpy.fromfile(path, dtype=numpy.uint32)
+
+
+class Clock(logs_core.Logs):
+    @property
+    def CLOCK(self) -> numpy.ndarray:
+        try:
+            return self.__CLOCK
+        except AttributeError:
+            pass
+        with self.locks("CLOCK"):
+            try:
+                return self.__CLOCK
+            except AttributeError:
+                self.__CLOCK = self._get_clock()
+                return self.__CLOCK
+
+    def release_logs(self):
+        super().release_logs()
+        try:
+            del self.__CLOCK
+        except AttributeError:
+            pass
+
+    def _get_clock(self):
+        try:
+            return self._read_clock()
+        except Exception:
+            return self._redo_clock()
+
+    def _read_clock(self):
+        clock = read_clock(self.relative_path(FileNames.logs_clock))
+        if len(clock) != len(self.LOGS):
+            raise ValueError("clock doesn't match logs")
+        return clock
+
+    @running_time
+    def _redo_clock(self):
+        clock = lines_ms(self.LOGS, self.year)
+        write_clock(self.relative_path(FileNames.logs_clock), clock)
+        return clock
+
+    def get_lines_delta(self, s: int, f: int):
+        '''seconds from line s to line f'''
+        return (int(self.CLOCK[f]) - int(self.CLOCK[s])) / 1000
+
+    def get_line_ms(self, i: int):
+        return int(self.CLOCK[i])
+
+    def get_slice_edges_ms(self, s: int, f: int):
+        '''ms of first and last lines of self.LOGS[s:f]'''
+        if not s:
+            s = 0
+        if not f:
+            f = len(self.LOGS)
+        return self.get_line_ms(s), self.get_line_ms(f-1)
+
+    @logs_core.cache_wrap
+    def get_slice_duration(self, s: int=None, f: int=None):
+        if s is None:
+            s = 0
+        if f is None:
+            f = 0
+        return self.get_lines_delta(s, f-1)
+
+    def get_fight_duration_total(self, segments):
+        return sum(self.get_slice_duration(s, f) for s, f in segments)
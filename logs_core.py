@@ -1,15 +1,35 @@
 from collections import defaultdict
+from time import perf_counter
 
+import h_metrics
+import logs_lines
+from h_locks import KeyLocks
+from h_size import deep_size
 from c_path import Directories, FileNames
 from h_debug import running_time, setup_logger
 from h_other import get_report_name_info
 from h_datetime import (
     MONTHS,
     get_now,
+    timestamps_delta_ms,
     to_dt_year_precise,
 )
 
 TYPES = (str, bool, type(None))
+# How LOGS is kept in memory:
+# "mmap"        - memory-mapped LOGS_CUT.txt, created from LOGS_CUT.zstd on open, see logs_lines.MMAP_MAX_BYTES
+# "zstd_frames" - decompresses only needed frames of LOGS_CUT.zstd, if it was written with frames
+# "list"        - whole LOGS_CUT.zstd decompressed into list[str]
+LOGS_STORAGE = "mmap"
+
+def flight_key(func_name: str, slice_ID: str, args: tuple):
+    '''same args as cache key'''
+    key = [func_name, slice_ID]
+    for arg in args:
+        if not isinstance(arg, TYPES):
+            break
+        key.append(arg)
+    return tuple(key)
 
 def cache_wrap(func: 'function'):
     def cache_inner(self: 'Logs', s, f, *args, **kwargs):
@@ -21,11 +41,18 @@ def cache_wrap(func: 'function'):
             cached_data = cached_data[arg]
             
         if slice_ID in cached_data:
+            h_metrics.observe_slice_hit(func.__name__, "memory")
             return cached_data[slice_ID]
         
-        data = func(self, s, f, *args, **kwargs)
-        cached_data[slice_ID] = data
-        return data
+        with self.locks(flight_key(func.__name__, slice_ID, args)):
+            if slice_ID in cached_data:
+                h_metrics.observe_slice_hit(func.__name__, "memory")
+                return cached_data[slice_ID]
+            timestamp = perf_counter()
+            data = func(self, s, f, *args, **kwargs)
+            h_metrics.observe_slice_miss(func.__name__, s, f, perf_counter() - timestamp)
+            self.store_slice(cached_data, slice_ID, data)
+            return data
 
     return cache_inner
 
@@ -40,6 +67,10 @@ class Logs:
         self.last_access = get_now()
 
         self.CACHE = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+        # estimated bytes of CACHE, each result is measured once when stored
+        self.cache_bytes = 0
+        # single flight for lazy properties and cached slices
+        self.locks = KeyLocks()
 
     @property
     def FORMATTED_NAME(self):
@@ -62,8 +93,30 @@ class Logs:
         try:
             return self.__LOGS
         except AttributeError:
-            self.__LOGS = self._open_logs()
-            return self.__LOGS
+            pass
+        with self.locks("LOGS"):
+            try:
+                return self.__LOGS
+            except AttributeError:
+                self.__LOGS = self._open_logs()
+                return self.__LOGS
+
+    def release_cache(self):
+        '''drops computed slices, they are read from SLICE_CACHE or recalculated on next access'''
+        self.CACHE = defaultdict(lambda: defaultdict(lambda: defaultdict(dict)))
+        self.cache_bytes = 0
+
+    def store_slice(self, cached_data: dict, slice_ID: str, data):
+        if slice_ID not in cached_data:
+            self.cache_bytes += deep_size(data)
+        cached_data[slice_ID] = data
+
+    def release_logs(self):
+        '''drops raw report data, it is opened again on next access'''
+        try:
+            del self.__LOGS
+        except AttributeError:
+            pass
 
     @property
     def LOGGER(self):
@@ -97,7 +150,7 @@ class Logs:
         return to_dt_year_precise(now, self.year) - to_dt_year_precise(last, self.year)
     
     def get_timedelta_seconds(self, last, now):
-        return self.get_timedelta(last, now).total_seconds()
+        return timestamps_delta_ms(last, now) / 1000
 
     @staticmethod
     def duration_to_string(t: float):
@@ -111,19 +164,6 @@ class Logs:
         seconds = t % 60
         return f"{hours}:{minutes:0>2}:{seconds:0>2}.{milliseconds:0>3.0f}"
 
-    @cache_wrap
-    def get_slice_duration(self, s: int=None, f: int=None):
-        if s is None:
-            s = 0
-        if f is None:
-            f = 0
-        first_line = self.LOGS[s]
-        last_line = self.LOGS[f-1]
-        return self.get_timedelta_seconds(first_line, last_line)
-
-    def get_fight_duration_total(self, segments):
-        return sum(self.get_slice_duration(s, f) for s, f in segments)
-
     @running_time
     def _open_logs(self):
         if self.copy_from_backup and self.path.parent != Directories.logs:
@@ -132,4 +172,28 @@ class Logs:
             report_dir.copy_from_backup()
             self.__path = report_dir
         
+        if LOGS_STORAGE == "mmap":
+            try:
+                return self._open_logs_mmap()
+            except (OSError, ValueError):
+                pass
+        elif LOGS_STORAGE == "zstd_frames":
+            logs_cut = self.relative_path(FileNames.logs_cut)
+            frames_index = logs_cut.zstd_frames_index()
+            if frames_index is not None:
+                return logs_lines.ZstdFramesLines(logs_cut, frames_index)
+
+        return self._read_logs_cut()
+
+    def _read_logs_cut(self):
         return self.relative_path(FileNames.logs_cut).zstd_read().splitlines()
+
+    def _open_logs_mmap(self):
+        lines_path = self.relative_path(FileNames.logs_cut_lines)
+        offsets_path = self.relative_path(FileNames.logs_cut_offsets)
+        if offsets_path.is_file():
+            logs_lines.touch_lines(offsets_path)
+        else:
+            logs_lines.write_lines(lines_path, offsets_path, self._read_logs_cut())
+            logs_lines.trim_lines(Directories.logs)
+        return logs_lines.MmapLines(lines_path, offsets_path)
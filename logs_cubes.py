@@ -0,0 +1,259 @@
+'''
+Damage and healing cubes.
+
+Amount and overkill of a segment summed by (100ms bucket, kind, source, target).
+Built from EVENTS once per segment and saved in SLICE_CACHE.
+Rows are sorted by bucket, so any time window of the segment is a range of rows
+and custom slices and dps graphs sum rows instead of parsing lines again.
+Lines of the 2 buckets on the edges of a window are summed from EVENTS on the fly.
+
+bucket = (ms - segment start ms) // BUCKET_MS
+
+Row key is packed into uint64:
+bucket << 44 | kind << 40 | source << 20 | target
+'''
+
+from collections import defaultdict
+
+import numpy
+
+import logs_base
+import logs_events
+import logs_units_table
+from logs_events import EventsData
+
+BUCKET_MS = 100
+ID_BITS = logs_units_table.ID_BITS
+KIND_BITS = 4
+BUCKET_BITS = 64 - KIND_BITS - ID_BITS * 2
+# bucket, kind, source, target
+KEY_BITS = (BUCKET_BITS, KIND_BITS, ID_BITS, ID_BITS)
+
+# logs_dps.get_raw_data
+DPS_FLAGS = {'SWING_DAMAGE', 'RANGE_DAMAGE', 'SPELL_DAMAGE', 'SPELL_PERIODIC_DAMAGE', 'DAMAGE_SHIELD'}
+# logs_dmg_useful.get_dmg
+NOT_DMG = {
+    "DAMAGE_SHIELD_MISSED",
+    "DAMAGE_SPLIT",
+}
+KINDS = {
+    # logs_dmg_heals.parse_both_events
+    "damage": lambda flag: "_DAMAGE" in flag,
+    "heal": lambda flag: "_HEAL" in flag,
+    # + not fully overhealed
+    "heal_useful": lambda flag: "_HEAL" in flag,
+    "dps": lambda flag: flag in DPS_FLAGS,
+    "target": lambda flag: "DAMAGE" in flag and flag not in NOT_DMG,
+}
+KIND_ID = {kind: kind_id for kind_id, kind in enumerate(KINDS)}
+ROWS_COLUMNS = ("bucket", "kind", "source", "target", "amount", "overkill")
+
+
+def build_cube(events: EventsData, start_ms: int=None):
+    '''
+    None if segment is too long or report has too many units to pack.
+    Buckets are counted from start_ms, from the first event by default.
+    '''
+    ms = events.ms.astype(numpy.int64)
+    if start_ms is not None:
+        ms -= start_ms
+    elif len(ms):
+        ms -= ms[0]
+    bucket = ms // BUCKET_MS
+
+    keys = []
+    amounts = []
+    overkills = []
+    for kind, kind_filter in KINDS.items():
+        flag_ids = [flag_id for flag_id, flag in enumerate(events.flags) if kind_filter(flag)]
+        mask = numpy.isin(events.flag, flag_ids)
+        if kind == "heal_useful":
+            mask &= events.amount != events.overkill
+        kind_column = numpy.full(numpy.count_nonzero(mask), KIND_ID[kind], dtype=numpy.uint8)
+        try:
+            keys.append(logs_units_table.pack_columns(
+                (bucket[mask], kind_column, events.source[mask], events.target[mask]),
+                KEY_BITS,
+            ))
+        except ValueError:
+            return None
+        amounts.append(events.amount[mask])
+        overkills.append(events.overkill[mask])
+
+    keys, inverse = numpy.unique(numpy.concatenate(keys), return_inverse=True)
+    amount = numpy.bincount(inverse, weights=numpy.concatenate(amounts), minlength=len(keys))
+    overkill = numpy.bincount(inverse, weights=numpy.concatenate(overkills), minlength=len(keys))
+
+    bucket, kind, source, target = logs_units_table.unpack_columns(keys, KEY_BITS)
+    return {
+        "bucket": bucket.astype(numpy.uint32),
+        "kind": kind.astype(numpy.uint8),
+        "source": source.astype(numpy.uint32),
+        "target": target.astype(numpy.uint32),
+        "amount": amount.astype(numpy.int64),
+        "overkill": overkill.astype(numpy.int64),
+    }
+
+def cube_rows(cube: dict[str, numpy.ndarray], first_bucket: int, last_bucket: int):
+    '''rows of buckets in [first_bucket, last_bucket)'''
+    start, end = numpy.searchsorted(cube["bucket"], (first_bucket, last_bucket))
+    return {
+        column: cube[column][start:end]
+        for column in ROWS_COLUMNS
+    }
+
+def concat_rows(*rows_list: dict[str, numpy.ndarray]):
+    return {
+        column: numpy.concatenate([rows[column] for rows in rows_list])
+        for column in ROWS_COLUMNS
+    }
+
+def _kind(rows: dict[str, numpy.ndarray], kind: str):
+    mask = rows["kind"] == KIND_ID[kind]
+    return {
+        column: values[mask]
+        for column, values in rows.items()
+    }
+
+def _sum_by(keys: numpy.ndarray, values: numpy.ndarray, guids: list[str]):
+    '''{guid: sum} for every guid that has at least 1 row'''
+    data: defaultdict[str, int] = defaultdict(int)
+    if not len(keys):
+        return data
+    counts = numpy.bincount(keys, minlength=len(guids))
+    sums = numpy.bincount(keys, weights=values, minlength=len(guids))
+    for guid_id in numpy.flatnonzero(counts):
+        data[guids[guid_id]] = int(sums[guid_id])
+    return data
+
+def cube_damage_heal(rows: dict[str, numpy.ndarray], guids: list[str], friendly: numpy.ndarray):
+    '''same as logs_dmg_heals.parse_both_events, friendly is bool array by guid id'''
+    damage = _kind(rows, "damage")
+    taken = friendly[damage["target"]]
+    heal = _kind(rows, "heal")
+    heal_useful = _kind(rows, "heal_useful")
+    return {
+        "damage": _sum_by(damage["source"][~taken], damage["amount"][~taken], guids),
+        "heal": _sum_by(heal_useful["source"], heal_useful["amount"] - heal_useful["overkill"], guids),
+        "taken": _sum_by(damage["target"][taken], damage["amount"][taken], guids),
+        "heal_total": _sum_by(heal["source"], heal["amount"], guids),
+    }
+
+def cube_target_damage(rows: dict[str, numpy.ndarray], guids: list[str]):
+    '''same as logs_dmg_useful.get_dmg'''
+    total = defaultdict(lambda: defaultdict(int))
+    no_overkill = defaultdict(lambda: defaultdict(int))
+    damage = _kind(rows, "target")
+    for source_id, target_id, amount, overkill in zip(
+        damage["source"].tolist(),
+        damage["target"].tolist(),
+        damage["amount"].tolist(),
+        damage["overkill"].tolist(),
+    ):
+        tGUID_ID = guids[target_id][6:-6]
+        source_guid = guids[source_id]
+        total[tGUID_ID][source_guid] += amount
+        no_overkill[tGUID_ID][source_guid] += amount - overkill
+    return {
+        "total": total,
+        "no_overkill": no_overkill,
+    }
+
+def cube_dps(rows: dict[str, numpy.ndarray], sources: numpy.ndarray, friendly: numpy.ndarray):
+    '''{bucket: damage} from sources to not friendly targets, sources and friendly are bool arrays by guid id'''
+    damage = _kind(rows, "dps")
+    mask = sources[damage["source"]] & ~friendly[damage["target"]]
+    buckets = damage["bucket"][mask]
+    data: dict[int, int] = {}
+    if not len(buckets):
+        return data
+    counts = numpy.bincount(buckets)
+    sums = numpy.bincount(buckets, weights=damage["amount"][mask])
+    for bucket in numpy.flatnonzero(counts).tolist():
+        data[bucket] = int(sums[bucket])
+    return data
+
+
+class Cubes(logs_base.THE_LOGS):
+    @logs_base.cache_wrap_persistent(depends=(logs_events, ))
+    def get_segment_cube(self, s, f):
+        return build_cube(self.get_events_slice(s, f))
+
+    def find_boss_segment(self, s: int, f: int):
+        for segments in self.ENCOUNTER_DATA.values():
+            for segment_s, segment_f in segments:
+                if segment_s <= s and f <= segment_f:
+                    return segment_s, segment_f
+        return None
+
+    def get_cube_window(self, s, f):
+        '''
+        rows of lines [s, f) inside a boss segment, buckets are counted from the bucket of line s.
+        Whole buckets are taken from the segment cube,
+        lines of buckets split by s or f are summed from EVENTS.
+        None if [s, f) isn't inside a boss segment or segment has no cube.
+        '''
+        if not isinstance(s, int) or not isinstance(f, int) or f <= s:
+            return None
+        segment = self.find_boss_segment(s, f)
+        if segment is None:
+            return None
+        segment_s, segment_f = segment
+
+        cube = self.get_segment_cube(segment_s, segment_f)
+        if cube is None:
+            return None
+
+        ms = self.EVENTS.ms
+        start_ms = int(ms[segment_s])
+        def bucket(i):
+            return (int(ms[i]) - start_ms) // BUCKET_MS
+
+        first_bucket = bucket(s)
+        last_bucket = bucket(f-1) + 1
+        first_whole = first_bucket
+        if s > segment_s and bucket(s-1) == first_bucket:
+            first_whole += 1
+        last_whole = last_bucket
+        if f < segment_f and bucket(f) == last_bucket - 1:
+            last_whole -= 1
+
+        def edge_rows(edge_s, edge_f):
+            return build_cube(self.get_events_slice(edge_s, edge_f), start_ms)
+
+        if first_whole >= last_whole:
+            rows = edge_rows(s, f)
+        else:
+            window_ms = ms[s:f]
+            head_f = s + int(numpy.searchsorted(window_ms, start_ms + first_whole * BUCKET_MS))
+            tail_s = s + int(numpy.searchsorted(window_ms, start_ms + last_whole * BUCKET_MS))
+            rows = concat_rows(
+                edge_rows(s, head_f),
+                cube_rows(cube, first_whole, last_whole),
+                edge_rows(tail_s, f),
+            )
+
+        rows["bucket"] = rows["bucket"].astype(numpy.int64) - first_bucket
+        return rows
+
+    def get_cube_damage_heal(self, s, f):
+        rows = self.get_cube_window(s, f)
+        if rows is None:
+            return None
+        guids = self.EVENTS.guids
+        friendly = self.EVENTS.guids_mask(self.get_players_and_pets_guids())
+        return cube_damage_heal(rows, guids, friendly)
+
+    def get_cube_target_damage(self, s, f):
+        rows = self.get_cube_window(s, f)
+        if rows is None:
+            return None
+        return cube_target_damage(rows, self.EVENTS.guids)
+
+    def get_cube_dps(self, s, f, source_guids: set[str]):
+        rows = self.get_cube_window(s, f)
+        if rows is None:
+            return None
+        sources = self.EVENTS.guids_mask(source_guids)
+        friendly = self.EVENTS.guids_mask(self.get_players_and_pets_guids())
+        return cube_dps(rows, sources, friendly)
@@ -1,6 +1,7 @@
 from collections import defaultdict
 from typing import TypedDict
 from h_debug import running_time
+from logs_slice_pass import SliceVisitor
 
 FESTER_SPAMMERS = {
     0,  # Death Knight
@@ -242,6 +243,16 @@ def valks_shield(logs_slice: list[str]):
             pass
     return DAMAGE
 
+# every line specific_useful reads for the boss contains one of these
+SPECIFIC_LINES_FILTER = {
+    "The Lich King": ("8F01", ),
+    "Freya": ("00808A", ),
+    "Festergut": (",72553,", "008F12"),
+    "Twin Val'kyr": ("ABSORB", ),
+    "Kologarn": ("ABSORB", ),
+    "Assembly of Iron": ("0080", ),
+}
+
 def specific_useful(logs_slice, boss_name, specs):
     data: dict[str, defaultdict[str, int]] = {}
     if boss_name == "The Lich King":
@@ -261,6 +272,23 @@ def specific_useful(logs_slice, boss_name, specs):
     return data
 
 
+class SpecificUsefulVisitor(SliceVisitor):
+    '''specific_useful on lines of the slice, that it would read'''
+    SPLIT = False
+
+    def __init__(self, boss_name: str, specs: dict[str, int]) -> None:
+        self.LINE_FILTER = SPECIFIC_LINES_FILTER.get(boss_name, ())
+        self.boss_name = boss_name
+        self.specs = specs
+        self.lines: list[str] = []
+
+    def visit(self, line: str, _line: list[str]):
+        self.lines.append(line)
+
+    def result(self):
+        return specific_useful(self.lines, self.boss_name, self.specs)
+
+
 def test1():
     import logs_base
     report = logs_base.THE_LOGS("24-05-10--21-04--Jengo--Lordaeron")
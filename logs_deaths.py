@@ -2,12 +2,21 @@ from collections import defaultdict
 import collections
 
 import logs_base
+import logs_deaths_index
+import logs_events
+import logs_lines_index
+from c_path import FileNames
 from h_debug import running_time
+from logs_deaths_index import (
+    ARDENT_DEFENDER,
+    DEATH_FLAGS,
+    HEAL_FLAGS,
+    SELF_RESSURECT,
+    DeathsIndexData,
+    write_deaths_index,
+)
 
 
-DEATH_FLAGS = {"UNIT_DIED", "SPELL_INSTAKILL"}
-HEAL_FLAGS = {"SPELL_HEAL", "SPELL_PERIODIC_HEAL"}
-
 FLAGS_DMG = {"SWING_DAMAGE", "SPELL_DAMAGE", "SPELL_PERIODIC_DAMAGE", "RANGE_DAMAGE", "DAMAGE_SHIELD", "ENVIRONMENTAL_DAMAGE"}
 FLAGS_MISS = {"SWING_MISSED", "SPELL_MISSED", "SPELL_PERIODIC_MISSED", "RANGE_MISSED", "DAMAGE_SHIELD_MISSED"}
 FLAGS_OFFENSIVE = FLAGS_DMG | FLAGS_MISS
@@ -133,11 +142,6 @@ SAVE_SPELLS = {
     "58374", # Glyph of Blocking
 }
 
-ARDENT_DEFENDER = {"66235", }
-SELF_RESSURECT = {
-    "21169", # Reincarnation
-    "47882", # Soulstone
-}
 # 2/15 21:38:50.554  SPELL_CAST_SUCCESS,0x07000000006CC66E,"Enhica",0x514,0x0000000000000000,nil,0x80000000,21169,"Reincarnation",0x8
 # 2/18 14:36:53.002  SPELL_CAST_SUCCESS,0x00000000003DD0B6,"Afalla",0x40514,0x0000000000000000,nil,0x80000000,47882,"Use Soulstone",0x1
 
@@ -292,12 +296,63 @@ def get_deaths(logs_slice: list[str]):
 
 
 class Deaths(logs_base.THE_LOGS):
-    # @logs_base.cache_wrap
+    @property
+    def DEATHS_INDEX(self) -> DeathsIndexData:
+        try:
+            return self.__DEATHS_INDEX
+        except AttributeError:
+            pass
+        with self.locks("DEATHS_INDEX"):
+            try:
+                return self.__DEATHS_INDEX
+            except AttributeError:
+                self.__DEATHS_INDEX = self._get_deaths_index()
+                return self.__DEATHS_INDEX
+
+    def release_logs(self):
+        super().release_logs()
+        try:
+            del self.__DEATHS_INDEX
+        except AttributeError:
+            pass
+
+    def _get_deaths_index(self):
+        try:
+            return self._read_deaths_index()
+        except Exception:
+            return self._redo_deaths_index()
+
+    def _read_deaths_index(self):
+        return DeathsIndexData.read(self.relative_path(FileNames.logs_deaths_index))
+
+    @running_time
+    def _redo_deaths_index(self):
+        deaths_index_path = self.relative_path(FileNames.logs_deaths_index)
+        return write_deaths_index(deaths_index_path, self.EVENTS)
+
+    def _get_deaths_from_index(self, s, f):
+        '''same as get_deaths(self.LOGS[s:f]), but only lines around deaths are decoded'''
+        players_deaths: dict[str, CharDeaths] = {}
+        for guid, line, start, end in self.DEATHS_INDEX.slice_deaths(s, f):
+            if s is not None:
+                start = max(start, s)
+            if f is not None:
+                end = min(end, f)
+            lines = self.LINES_INDEX.unit_lines(start, end, guid)
+            player_deaths = get_deaths(self.get_lines_by_index(lines)).get(guid)
+            if not player_deaths:
+                continue
+            try:
+                players_deaths[guid].update(player_deaths)
+            except KeyError:
+                players_deaths[guid] = player_deaths
+        return players_deaths
+
+    @logs_base.cache_wrap_persistent(depends=(logs_deaths_index, logs_lines_index, logs_events))
     def get_deaths_v2(self, s, f):
-        logs_slice = self.LOGS[s:f]
-        slice_start = logs_slice[0].split(',')[0]
+        slice_start = self.get_slice_edges(s, f)[0].split(',')[0]
 
-        players_deaths = get_deaths(logs_slice)
+        players_deaths = self._get_deaths_from_index(s, f)
         players_deaths_sorted = sorted((
             (ts, player_guid, player_death)
             for player_guid, player_deaths in players_deaths.items()
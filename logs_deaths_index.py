@@ -0,0 +1,192 @@
+'''
+Player deaths of the whole report.
+
+Built from EVENTS_DATA once per report and saved as DEATHS_INDEX.npz,
+so deaths page decodes only lines around every death instead of walking the whole slice.
+
+Every row is 1 death or 1 resurrect that didn't follow a death of the report, sorted by line:
+guid  - index in guids
+line  - UNIT_DIED / SPELL_INSTAKILL / Ardent Defender heal line or resurrect line
+ms    - ms of line since the first line of the report
+start - first line of the window of events before the death:
+        end of the previous row of the player or WINDOW_MS before,
+        get_deaths cuts the window at the last overheal itself
+end   - line after the death or after resurrect that followed it
+'''
+
+import numpy
+
+import logs_events
+from c_path import PathExt
+from h_debug import running_time
+
+DEATH_FLAGS = {"UNIT_DIED", "SPELL_INSTAKILL"}
+HEAL_FLAGS = {"SPELL_HEAL", "SPELL_PERIODIC_HEAL"}
+ARDENT_DEFENDER = {"66235", }
+SELF_RESSURECT = {
+    "21169", # Reincarnation
+    "47882", # Soulstone
+}
+COLUMNS = ("guid", "line", "ms", "start", "end")
+WINDOW_MS = 120_000
+EMPTY = numpy.empty(0, dtype=numpy.int64)
+FORMAT_VERSION = 1
+FORMAT_VERSIONS = (FORMAT_VERSION, logs_events.FORMAT_VERSION)
+
+
+def _flag_ids(events: logs_events.EventsData, flags: set[str]):
+    return [flag_id for flag_id, flag in enumerate(events.flags) if flag in flags]
+
+def _spell_mask(events: logs_events.EventsData, spells: set[str]):
+    return numpy.isin(events.spell, [int(spell_id) for spell_id in spells])
+
+def _lines_by_unit(mask: numpy.ndarray, units: numpy.ndarray) -> dict[int, numpy.ndarray]:
+    '''{unit id: sorted lines} of lines in mask'''
+    lines = numpy.flatnonzero(mask)
+    if not len(lines):
+        return {}
+    units = units[lines]
+    order = numpy.argsort(units, kind="stable")
+    units_unique, starts = numpy.unique(units[order], return_index=True)
+    return dict(zip(units_unique.tolist(), numpy.split(lines[order], starts[1:])))
+
+def _between(lines: numpy.ndarray, s: int, f: int):
+    '''True if any of lines is in (s, f)'''
+    i = numpy.searchsorted(lines, s, side="right")
+    return i < len(lines) and lines[i] < f
+
+def _first_after(lines: numpy.ndarray, line: int):
+    i = numpy.searchsorted(lines, line, side="right")
+    return int(lines[i]) if i < len(lines) else None
+
+def _group_anchors(anchors: numpy.ndarray, alive: numpy.ndarray, revived: numpy.ndarray):
+    '''[first anchor, last anchor] of every death, anchors with no heal or resurrect between are 1 death'''
+    deaths = []
+    for anchor in anchors.tolist():
+        if deaths:
+            previous = deaths[-1]
+            if not _between(alive, previous[1], anchor) and not _between(revived, previous[1], anchor):
+                previous[1] = anchor
+                continue
+        deaths.append([anchor, anchor])
+    return deaths
+
+
+class DeathsIndexData:
+    __slots__ = (*COLUMNS, "guids")
+
+    def __init__(self, columns: dict[str, numpy.ndarray], guids: list[str]) -> None:
+        for column_name in COLUMNS:
+            setattr(self, column_name, columns[column_name])
+        self.guids = guids
+
+    def __len__(self):
+        return len(self.line)
+
+    def slice_deaths(self, s: int, f: int):
+        '''
+        (guid, line, start, end) of deaths with line in [s, f)
+        and of deaths before s with resurrect in [s, f)
+        '''
+        if s is None:
+            s = 0
+        if f is None:
+            f = numpy.iinfo(numpy.int64).max
+        last = numpy.searchsorted(self.line, f)
+        for i in numpy.flatnonzero(self.end[:last] > s).tolist():
+            yield (
+                self.guids[self.guid[i]],
+                int(self.line[i]),
+                int(self.start[i]),
+                int(self.end[i]),
+            )
+
+    @classmethod
+    @running_time
+    def from_events(cls, events: logs_events.EventsData):
+        is_player = numpy.array([
+            guid[:3] == "0x0" and guid != logs_events.NIL_GUID
+            for guid in events.guids
+        ], dtype=numpy.bool_)
+        target_player = is_player[events.target]
+        flag = events.flag
+        heal = numpy.isin(flag, _flag_ids(events, HEAL_FLAGS)) & target_player
+
+        anchors = numpy.isin(flag, _flag_ids(events, DEATH_FLAGS)) & target_player
+        anchors |= heal & _spell_mask(events, ARDENT_DEFENDER)
+        alive = heal & (events.overkill > 0)
+        resurrect = numpy.isin(flag, _flag_ids(events, {"SPELL_RESURRECT"})) & target_player
+        self_resurrect = (
+            numpy.isin(flag, _flag_ids(events, {"SPELL_CAST_SUCCESS"}))
+            & is_player[events.source]
+            & _spell_mask(events, SELF_RESSURECT)
+        )
+
+        anchors_by_unit = _lines_by_unit(anchors, events.target)
+        alive_by_unit = _lines_by_unit(alive, events.target)
+        revived_by_unit = _lines_by_unit(resurrect, events.target)
+        for unit, lines in _lines_by_unit(self_resurrect, events.source).items():
+            revived_by_unit[unit] = numpy.union1d(revived_by_unit.get(unit, EMPTY), lines)
+
+        rows = []
+        for unit in anchors_by_unit.keys() | revived_by_unit.keys():
+            revived = revived_by_unit.get(unit, EMPTY)
+            deaths = _group_anchors(
+                anchors_by_unit.get(unit, EMPTY),
+                alive_by_unit.get(unit, EMPTY),
+                revived,
+            )
+            windows = []
+            revives_used = set()
+            for i, (_, line) in enumerate(deaths):
+                end = line + 1
+                revive = _first_after(revived, line)
+                next_death = deaths[i+1][0] if i+1 < len(deaths) else None
+                if revive is not None and (next_death is None or revive < next_death):
+                    end = revive + 1
+                    revives_used.add(revive)
+                windows.append((line, end))
+            
+            for revive in revived.tolist():
+                if revive not in revives_used:
+                    windows.append((revive, revive + 1))
+            windows.sort()
+
+            previous_end = 0
+            for line, end in windows:
+                line_ms = int(events.ms[line])
+                window_ms = max(line_ms - WINDOW_MS, 0)
+                start = max(int(numpy.searchsorted(events.ms, window_ms)), previous_end)
+                rows.append((unit, line, line_ms, start, end))
+                previous_end = end
+
+        rows.sort(key=lambda row: row[1])
+        columns = {
+            column_name: numpy.array([row[i] for row in rows], dtype=numpy.int64)
+            for i, column_name in enumerate(COLUMNS)
+        }
+        return cls(columns, events.guids)
+
+    @classmethod
+    def read(cls, path: PathExt):
+        with numpy.load(path, allow_pickle=False) as data:
+            logs_events.check_format_version(data, FORMAT_VERSIONS)
+            columns = {column_name: data[column_name] for column_name in COLUMNS}
+            guids = data["guids"].tolist()
+        return cls(columns, guids)
+
+    def write(self, path: PathExt):
+        columns = {column_name: getattr(self, column_name) for column_name in COLUMNS}
+        with open(path, "wb") as f:
+            numpy.savez_compressed(
+                f,
+                format_version=logs_events.format_version_array(FORMAT_VERSIONS),
+                guids=numpy.array(self.guids, dtype=str),
+                **columns,
+            )
+
+
+def write_deaths_index(path: PathExt, events: logs_events.EventsData):
+    deaths_index = DeathsIndexData.from_events(events)
+    deaths_index.write(path)
+    return deaths_index
@@ -1,8 +1,14 @@
 from collections import defaultdict
 from typing import TypedDict
 
+import numpy
+
 import logs_base
+import logs_units_table
+from logs_events import EventsData
+from logs_units_table import UnitsTable
 from h_debug import running_time
+from h_sketch import HitsSketch
 from h_other import (
     sort_dict_by_value,
     separate_thousands,
@@ -24,7 +30,7 @@ FLAGS_DAMAGE = {
 
 class BreakdownType(TypedDict):
     ACTUAL: defaultdict[str, defaultdict[str, defaultdict[str, int]]]
-    HITS: defaultdict[str, defaultdict[str, defaultdict[str, defaultdict[str, list[int]]]]]
+    HITS: defaultdict[str, defaultdict[str, defaultdict[str, defaultdict[str, HitsSketch]]]]
     OTHER: defaultdict[str, defaultdict[str, defaultdict[str, defaultdict[str, int]]]]
     MISSES: defaultdict[str, defaultdict[str, defaultdict[str, defaultdict[str, int]]]]
 
@@ -52,24 +58,11 @@ def detailed_sort_separate_thousands(d: dict):
         for t, v in d.items()
     }
     
-def get_avgs(hits: list):
+def get_avgs(hits: HitsSketch):
     if not hits:
         return "", []
 
-    hits = sorted(hits)
-    _len = len(hits)
-    len10 = _len//10 or 1
-    len50 = _len//2 or 1
-    avgs = [
-        sum(hits) // _len,
-        max(hits),
-        sum(hits[-len10:]) // len10,
-        sum(hits[-len50:]) // len50,
-        sum(hits[:len50]) // len50,
-        sum(hits[:len10]) // len10,
-        min(hits),
-    ]
-    avg, *other = map(separate_thousands, avgs)
+    avg, *other = map(separate_thousands, hits.averages())
     return avg, other
 
 def format_percent(hit, crit):
@@ -96,20 +89,42 @@ def format_hits_data(hits, crits):
         "crits_avg": crits_avg,
     }
 
-def format_hits(hits: dict[str, list[int]]):
-    hit_hit, hit_crt, dot_hit, dot_crt = [hits.get(x, []) for x in HIT_TYPE]
+def format_hits(hits: dict[str, HitsSketch]):
+    hit_hit, hit_crt, dot_hit, dot_crt = [hits.get(x) or HitsSketch() for x in HIT_TYPE]
     return {
         "HIT": format_hits_data(hit_hit, hit_crt),
         "DOT": format_hits_data(dot_hit, dot_crt),
     }
 
-def hits_data(data: dict[int, dict[str, list[int]]]):
+def hits_data(data: dict[int, dict[str, HitsSketch]]):
     return {spell_id: format_hits(hits) for spell_id, hits in data.items()}
 
+# columns of numbers_compare, all per spell per player
+COMPARE_COLUMNS = [
+    "actual", "reduced", "casts", "misses",
+    "hit_total", "hit_hits", "hit_avg", "hit_crits", "hit_crit_avg", "hit_percent",
+    "dot_total", "dot_hits", "dot_avg", "dot_crits", "dot_crit_avg", "dot_percent",
+]
+
+NO_HITS = HitsSketch()
+
+def _compare_hits(hits: HitsSketch, crits: HitsSketch):
+    '''compare table shows only averages, no tails'''
+    hits_count, hits_sum = hits.count, hits.sum
+    crits_count, crits_sum = crits.count, crits.sum
+    return [
+        separate_thousands(hits_count+crits_count),
+        separate_thousands(hits_count),
+        separate_thousands(hits_sum // hits_count) if hits_count else "",
+        separate_thousands(crits_count),
+        separate_thousands(crits_sum // crits_count) if crits_count else "",
+        format_percent(hits_count, crits_count),
+    ]
+
 
 def default_dict() -> BreakdownType:
     actual = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-    hits = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(list))))
+    hits = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(HitsSketch))))
     other = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(int))))
     misses = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: defaultdict(int))))
 
@@ -139,7 +154,7 @@ def _damage(logs_slice: list[str]) -> BreakdownType:
         _value = int(dmg)
         
         _hit_type = (flag in PERIODIC) * 2 + (crit == "1")
-        hits[sGUID][tGUID][spell_id][HIT_TYPE[_hit_type]].append(_value)
+        hits[sGUID][tGUID][spell_id][HIT_TYPE[_hit_type]].add(_value)
         
         _other = other[sGUID][tGUID][spell_id]
         
@@ -175,7 +190,7 @@ def _heal(logs_slice: list[str]) -> BreakdownType:
         _value = int(heal)
 
         _hit_type = (flag in PERIODIC) * 2 + (crit == "1")
-        hits[sGUID][tGUID][spell_id][HIT_TYPE[_hit_type]].append(_value)
+        hits[sGUID][tGUID][spell_id][HIT_TYPE[_hit_type]].add(_value)
         
         if over != "0":
             _over = int(over)
@@ -185,6 +200,55 @@ def _heal(logs_slice: list[str]) -> BreakdownType:
 
     return d
 
+def _group_hits(keys: numpy.ndarray, hit_type: numpy.ndarray, values: numpy.ndarray):
+    '''(key index, hit type, values in line order) for every key and hit type'''
+    groups = keys * len(HIT_TYPE) + hit_type
+    order = numpy.argsort(groups, kind="stable")
+    groups_unique, starts = numpy.unique(groups[order], return_index=True)
+    values_groups = numpy.split(values[order], starts[1:])
+    for group, group_values in zip(groups_unique.tolist(), values_groups):
+        yield group // len(HIT_TYPE), HIT_TYPE[group % len(HIT_TYPE)], group_values.tolist()
+
+@running_time
+def _heal_events(events: EventsData, units: UnitsTable) -> BreakdownType:
+    '''same as _heal, but from EVENTS columns, aggregated on unit ids'''
+    d = default_dict()
+    actual = d["ACTUAL"]
+    hits = d["HITS"]
+    other = d["OTHER"]
+
+    mask = events.flag_mask("_HEAL")
+    if not mask.any():
+        return d
+
+    spell_index = units.spell_indexes(events.spell[mask])
+    keys = logs_units_table.pack_keys(events.source[mask], events.target[mask], spell_index)
+    keys_unique, inverse = numpy.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    amount = events.amount[mask].astype(numpy.int64)
+    overkill = events.overkill[mask].astype(numpy.int64)
+    actual_sums = numpy.bincount(inverse, weights=amount - overkill).tolist()
+    overheal_sums = numpy.bincount(inverse, weights=overkill).tolist()
+
+    # translate ids back to strings only once per key
+    guids = units.guids
+    keys_str = [
+        (guids[source_id], guids[target_id], str(units.spells[spell_i]))
+        for source_id, target_id, spell_i in zip(*logs_units_table.unpack_keys(keys_unique, 3))
+    ]
+    for (sGUID, tGUID, spell_id), _actual, _overheal in zip(keys_str, actual_sums, overheal_sums):
+        actual[sGUID][tGUID][spell_id] += int(_actual)
+        if _overheal:
+            other[sGUID][tGUID][spell_id]["OVERHEAL"] += int(_overheal)
+
+    periodic = numpy.isin(events.flag[mask], events.flag_ids(*PERIODIC))
+    hit_type = periodic * 2 + events.crit[mask].astype(numpy.int64)
+    for key_i, _hit_type, values in _group_hits(inverse, hit_type, amount):
+        sGUID, tGUID, spell_id = keys_str[key_i]
+        hits[sGUID][tGUID][spell_id][_hit_type] = HitsSketch.from_values(values)
+
+    return d
+
 @running_time
 def _cast(logs_slice: list[str]):
     casts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
@@ -199,6 +263,24 @@ def _cast(logs_slice: list[str]):
 
     return casts
 
+@running_time
+def _cast_events(events: EventsData, units: UnitsTable):
+    '''same as _cast, but from EVENTS columns, aggregated on unit ids'''
+    casts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+
+    mask = events.flag_mask("_CAST")
+    if not mask.any():
+        return casts
+
+    spell_index = units.spell_indexes(events.spell[mask])
+    keys = logs_units_table.pack_keys(events.source[mask], events.target[mask], spell_index)
+    keys_unique, counts = numpy.unique(keys, return_counts=True)
+    guids = units.guids
+    for source_id, target_id, spell_i, count in zip(*logs_units_table.unpack_keys(keys_unique, 3), counts.tolist()):
+        casts[guids[source_id]][guids[target_id]][str(units.spells[spell_i])] += count
+
+    return casts
+
 @running_time
 def _miss(logs_slice: list[str]) -> BreakdownType:
     d = default_dict()
@@ -239,7 +321,7 @@ def sort_by_name_type(targets: set[str]):
 def _return_dict():
     casts = defaultdict(int)
     actual = defaultdict(int)
-    hits = defaultdict(lambda: defaultdict(list))
+    hits = defaultdict(lambda: defaultdict(HitsSketch))
     other = defaultdict(lambda: defaultdict(int))
     misses = defaultdict(lambda: defaultdict(int))
 
@@ -263,19 +345,24 @@ class SourceNumbers(logs_base.THE_LOGS):
     
     @logs_base.cache_wrap
     def numbers_damage(self, s, f):
-        logs_slice = self.LOGS[s:f]
+        logs_slice = self.get_flag_lines(s, f, *FLAGS_DAMAGE)
         return _damage(logs_slice)
     @logs_base.cache_wrap
     def numbers_heal(self, s, f):
-        logs_slice = self.LOGS[s:f]
-        return _heal(logs_slice)
+        try:
+            return _heal_events(self.get_events_slice(s, f), self.UNITS)
+        except ValueError:
+            # too many units or spells to pack keys
+            return _heal(self.get_flag_lines(s, f, "_HEAL"))
     @logs_base.cache_wrap
     def numbers_cast(self, s, f):
-        logs_slice = self.LOGS[s:f]
-        return _cast(logs_slice)
+        try:
+            return _cast_events(self.get_events_slice(s, f), self.UNITS)
+        except ValueError:
+            return _cast(self.get_flag_lines(s, f, "_CAST"))
     @logs_base.cache_wrap
     def numbers_miss(self, s, f):
-        logs_slice = self.LOGS[s:f]
+        logs_slice = self.get_flag_lines(s, f, "_MISSED")
         return _miss(logs_slice)
 
     @staticmethod
@@ -437,6 +524,76 @@ class SourceNumbers(logs_base.THE_LOGS):
         d.update(self._misses(d["MISSES"]))
         return d
 
+    @running_time
+    def numbers_compare(self, segments: list[str, str], players: list[str], target_filter: str=None, heal=False):
+        '''
+        Breakdown of many players in 1 pass over numbers_combined.
+        Columnar: DATA[spell_id][column] is a list of values in PLAYERS order.
+        '''
+        owners: dict[str, int] = {}
+        for player_i, guid in enumerate(players):
+            for unit_guid in self.get_units_controlled_by(guid):
+                owners.setdefault(unit_guid, player_i)
+
+        a = self.numbers_combined(segments, heal)
+        spell_ids_full: dict[tuple[str, str], str] = {}
+        per_spell = defaultdict(lambda: [defaultdict(int) for _ in players])
+        hits = defaultdict(lambda: [defaultdict(HitsSketch) for _ in players])
+        all_targets = set()
+        for k, sources in a.items():
+            for source_guid, targets in sources.items():
+                player_i = owners.get(source_guid)
+                if player_i is None:
+                    continue
+                all_targets.update(targets)
+                for target_guid, spells in self._filter_sources(targets, target_filter):
+                    for spell_id, vv in spells.items():
+                        try:
+                            spell_id_full = spell_ids_full[(spell_id, source_guid)]
+                        except KeyError:
+                            spell_id_full = self.conv_spell_id(spell_id, source_guid)
+                            spell_ids_full[(spell_id, source_guid)] = spell_id_full
+                        if k == "HITS":
+                            _hits = hits[spell_id_full][player_i]
+                            for _type, sketch in vv.items():
+                                _hits[_type] += sketch
+                        elif k in ("ACTUAL", "CASTS"):
+                            per_spell[spell_id_full][player_i][k] += vv
+                        else:
+                            per_spell[spell_id_full][player_i][k] += sum(vv.values())
+
+        spell_order = sorted(
+            set(per_spell) | set(hits),
+            key=lambda spell_id: sum(v["ACTUAL"] for v in per_spell[spell_id]),
+            reverse=True,
+        )
+        data = {}
+        for spell_id in spell_order:
+            columns = {column: [] for column in COMPARE_COLUMNS}
+            for player_i in range(len(players)):
+                v = per_spell[spell_id][player_i]
+                h = hits[spell_id][player_i]
+                row = [
+                    separate_thousands(v["ACTUAL"]),
+                    separate_thousands(v["OTHER"]),
+                    separate_thousands(v["CASTS"]),
+                    separate_thousands(v["MISSES"]),
+                    *_compare_hits(h.get("spells_hit") or NO_HITS, h.get("spells_crit") or NO_HITS),
+                    *_compare_hits(h.get("dot_hit") or NO_HITS, h.get("dot_crit") or NO_HITS),
+                ]
+                for column, value in zip(COMPARE_COLUMNS, row):
+                    columns[column].append(value)
+            data[spell_id] = columns
+
+        targets = self._order_targets(all_targets)
+        return {
+            "PLAYERS": [self.guid_to_name(guid) for guid in players],
+            "COLUMNS": COMPARE_COLUMNS,
+            "SPELLS": {spell_id: self._get_spell_data(spell_id) for spell_id in spell_order},
+            "TARGETS": targets["NPCS"] | targets["Players"] | targets["Pets"],
+            "DATA": data,
+        }
+
     @running_time
     def numbers_combined(self, segments: list[str, str], heal=False):
         combined = default_dict()
@@ -2,6 +2,7 @@ from collections import defaultdict
 
 from h_other import is_player, sort_dict_by_value
 from h_debug import Loggers, running_time
+from logs_events import EventsData
 
 LOGGER_REPORTS = Loggers.reports
 FLAG_DAMAGE = {
@@ -123,6 +124,25 @@ def parse_both(logs: list[str], players_and_pets: set[str]):
         "heal_total": HEAL_TOTAL,
     }
 
+@running_time
+def parse_both_events(events: EventsData, players_and_pets: set[str]):
+    friendly = events.guids_mask(players_and_pets)
+
+    damage = events.flag_mask("_DAMAGE")
+    taken = damage & friendly[events.target]
+    damage &= ~taken
+
+    heal = events.flag_mask("_HEAL")
+    effective = events.amount - events.overkill
+    heal_useful = heal & (effective != 0)
+
+    return {
+        "damage": events.sum_by_guid(events.source[damage], events.amount[damage]),
+        "heal": events.sum_by_guid(events.source[heal_useful], effective[heal_useful]),
+        "taken": events.sum_by_guid(events.target[taken], events.amount[taken]),
+        "heal_total": events.sum_by_guid(events.source[heal], events.amount[heal]),
+    }
+
 def parse_dmg_all_no_friendly(logs: list[str], players_and_pets: set[str]):
     data = defaultdict(int)
     for line in logs:
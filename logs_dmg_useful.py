@@ -2,6 +2,10 @@ from collections import defaultdict
 from typing import TypedDict
 
 import logs_base
+import logs_cubes
+import logs_damage_specific
+import logs_events
+import logs_player_spec
 from c_bosses import (
     TOC_CHAMPIONS,
     BOSSES_GUIDS,
@@ -13,13 +17,15 @@ from h_other import (
     separate_thousands_dict,
     add_new_numeric_data,
 )
-from logs_damage_specific import specific_useful
+from logs_damage_specific import (
+    SPECIFIC_LINES_FILTER,
+    SpecificUsefulVisitor,
+    specific_useful,
+)
+from logs_slice_pass import SliceVisitor
 
 
-NOT_DMG = {
-    "DAMAGE_SHIELD_MISSED",
-    "DAMAGE_SPLIT",
-}
+NOT_DMG = logs_cubes.NOT_DMG
 TOC_PETS = {
     "008B1A": "Cat",
     "008A89": "Demon",
@@ -606,6 +612,29 @@ def get_dmg(logs_slice: list[str]):
         "no_overkill": no_overkill,
     }
 
+class TargetDamageVisitor(SliceVisitor):
+    '''get_dmg as a slice visitor'''
+    LINE_FILTER = ("DAMAGE", )
+
+    def __init__(self) -> None:
+        self.total = defaultdict(lambda: defaultdict(int))
+        self.no_overkill = defaultdict(lambda: defaultdict(int))
+
+    def visit(self, line: str, _line: list[str]):
+        if _line[1] in NOT_DMG:
+            return
+        _dmg = int(_line[9])
+        tGUID_ID = _line[4][6:-6]
+        source_guid = _line[2]
+        self.total[tGUID_ID][source_guid] += _dmg
+        self.no_overkill[tGUID_ID][source_guid] += _dmg - int(_line[10])
+
+    def result(self):
+        return {
+            "total": self.total,
+            "no_overkill": self.no_overkill,
+        }
+
 
 def get_total_damage(data: dict[str, dict[str, int]], filter_targets=None, ignore_targets=None):
     total = defaultdict(int)
@@ -663,24 +692,54 @@ def guid_to_custom_name(data: dict[str, dict]):
         if q in USEFUL_NAMES
     }
 
-class UsefulDamage(logs_base.THE_LOGS):
-    @logs_base.cache_wrap
+class UsefulDamage(logs_cubes.Cubes):
+    @logs_base.cache_wrap_persistent(depends=(logs_cubes, logs_events))
     def target_damage(self, s, f):
+        cube_data = self.get_cube_target_damage(s, f)
+        if cube_data is not None:
+            return cube_data
+
         logs_slice = self.LOGS[s:f]
         return get_dmg(logs_slice)
     
-    @logs_base.cache_wrap
+    @logs_base.cache_wrap_persistent(depends=(logs_damage_specific, logs_player_spec))
     def target_damage_specific(self, s, f, boss_name: str):
         logs_slice = self.LOGS[s:f]
         specs = self.get_players_specs_in_segments(s, f)
         return specific_useful(logs_slice, boss_name, specs)
 
+    def target_damage_visitors(self, s, f, boss_name: str, specs: dict[str, int]=None):
+        '''
+        slice pass visitors for target_damage and target_damage_specific, that aren't cached.
+        target_damage of a slice with a cube window is cached right away from that window.
+        '''
+        visitors = {}
+        found, _ = self.cache_get(self.target_damage, s, f)
+        if not found:
+            rows = self.get_cube_window(s, f)
+            if rows is None:
+                visitors[(self.target_damage, )] = TargetDamageVisitor()
+            else:
+                data = logs_cubes.cube_target_damage(rows, self.EVENTS.guids)
+                self.cache_set(self.target_damage, s, f, data)
+
+        found, _ = self.cache_get(self.target_damage_specific, s, f, boss_name)
+        if not found:
+            if boss_name not in SPECIFIC_LINES_FILTER:
+                specs = {}
+            elif specs is None:
+                specs = self.get_players_specs_in_segments(s, f)
+            visitors[(self.target_damage_specific, boss_name)] = SpecificUsefulVisitor(boss_name, specs)
+
+        return visitors
+
     def target_damage_wrap(self, segments: list, boss_name: str):
         damage = defaultdict(lambda: defaultdict(int))
         no_overkill = defaultdict(lambda: defaultdict(int))
         useful_specific = defaultdict(lambda: defaultdict(int))
 
         for s, f in segments:
+            self.run_slice_visitors(s, f, self.target_damage_visitors(s, f, boss_name))
             _damage = self.target_damage(s, f)
             add_new_numeric_data_wrap(damage, _damage["total"])
             add_new_numeric_data_wrap(no_overkill, _damage["no_overkill"])
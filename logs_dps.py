@@ -1,10 +1,11 @@
 from collections import defaultdict
 
 import logs_base
+import logs_cubes
 from c_bosses import BOSSES_FROM_HTML
 from h_debug import running_time
 
-FLAGS = {'SWING_DAMAGE', 'RANGE_DAMAGE', 'SPELL_DAMAGE', 'SPELL_PERIODIC_DAMAGE', 'DAMAGE_SHIELD'}
+FLAGS = logs_cubes.DPS_FLAGS
 
 def get_raw_data(logs: list[str], guids: set[str]):
     data = defaultdict(int)
@@ -133,15 +134,21 @@ def convert_keys_to_str(data: dict[int, int]):
         data[f"{minutes:0>2}:{seconds:0>2}"] = data.pop(k)
 
 
-class Dps(logs_base.THE_LOGS):
+class Dps(logs_cubes.Cubes):
     @logs_base.cache_wrap
     def get_dps(self, s, f, player: str):
-        logs_slice = self.LOGS[s:f]
         all_guids = self.get_players_and_pets_guids()
         if player:
             source_guids = self.get_units_controlled_by(player)
         else:
             source_guids = all_guids
+
+        # keys are 100ms buckets from the start of the slice, same as convert_keys does
+        data = self.get_cube_dps(s, f, source_guids)
+        if data is not None:
+            return data
+
+        logs_slice = self.LOGS[s:f]
         data = get_raw_data(logs_slice, source_guids, all_guids)
         convert_keys(data, logs_slice[0])
         return data
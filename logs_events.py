@@ -0,0 +1,275 @@
+'''
+Columnar event store.
+
+Every line of LOGS_CUT is 1 row, row index == line index,
+so any [s:f] slice used by the mixins can be applied to the columns as is.
+
+Columns:
+    flag     - index in EventsData.flags
+    source   - index in EventsData.guids
+    target   - index in EventsData.guids
+    spell    - spell id
+    amount   - damage / heal / energize amount
+    overkill - overkill / overheal
+    absorbed - absorbed part of damage or heal, ABSORB misses amount
+    crit     - 1 if critical
+    ms       - milliseconds since the first line, never decreases
+'''
+
+from array import array
+from collections import defaultdict
+
+import numpy
+
+import logs_clock
+from constants import FLAG_ORDER
+from c_path import FileNames, PathExt
+from h_debug import running_time
+
+COLUMNS = {
+    "flag": ("B", numpy.uint8),
+    "source": ("I", numpy.uint32),
+    "target": ("I", numpy.uint32),
+    "spell": ("I", numpy.uint32),
+    "amount": ("i", numpy.int32),
+    "overkill": ("i", numpy.int32),
+    "absorbed": ("i", numpy.int32),
+    "crit": ("B", numpy.uint8),
+    "ms": ("I", numpy.uint32),
+}
+NIL_GUID = "0x0000000000000000"
+# bump when columns change, files of older format and indexes made from them are rebuilt
+FORMAT_VERSION = 1
+FORMAT_VERSIONS = (FORMAT_VERSION, )
+
+
+def format_version_array(format_versions: tuple[int]):
+    return numpy.array(format_versions, dtype=numpy.int64)
+
+def check_format_version(data, format_versions: tuple[int]):
+    '''npz of an older format raises, callers rebuild it'''
+    if "format_version" not in data.files or tuple(data["format_version"].tolist()) != format_versions:
+        raise ValueError("old format")
+
+
+def _to_int(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+class EventsData:
+    __slots__ = (*COLUMNS, "flags", "guids", "_guids_index")
+
+    def __init__(self, columns: dict[str, numpy.ndarray], flags: list[str], guids: list[str]) -> None:
+        for column_name in COLUMNS:
+            setattr(self, column_name, columns[column_name])
+        self.flags = flags
+        self.guids = guids
+
+    def __len__(self):
+        return len(self.flag)
+
+    def __getitem__(self, key: slice):
+        if not isinstance(key, slice):
+            raise TypeError("EventsData supports only slices")
+
+        columns = {
+            column_name: getattr(self, column_name)[key]
+            for column_name in COLUMNS
+        }
+        return EventsData(columns, self.flags, self.guids)
+
+    @property
+    def guids_index(self) -> dict[str, int]:
+        try:
+            return self._guids_index
+        except AttributeError:
+            self._guids_index = {guid: i for i, guid in enumerate(self.guids)}
+            return self._guids_index
+
+    def flag_ids(self, *substrings: str):
+        return [
+            flag_id
+            for flag_id, flag in enumerate(self.flags)
+            if any(s in flag for s in substrings)
+        ]
+
+    def flag_mask(self, *substrings: str):
+        return numpy.isin(self.flag, self.flag_ids(*substrings))
+
+    def guids_mask(self, guids: set[str]):
+        '''bool array by guid id, use as mask[self.source]'''
+        mask = numpy.zeros(len(self.guids), dtype=numpy.bool_)
+        ids = [self.guids_index[guid] for guid in guids if guid in self.guids_index]
+        mask[ids] = True
+        return mask
+
+    def sum_by_guid(self, guid_ids: numpy.ndarray, values: numpy.ndarray):
+        '''{guid: sum of values} for every guid that has at least 1 row'''
+        data: defaultdict[str, int] = defaultdict(int)
+        if not len(guid_ids):
+            return data
+
+        size = len(self.guids)
+        counts = numpy.bincount(guid_ids, minlength=size)
+        sums = numpy.bincount(guid_ids, weights=values, minlength=size)
+        for guid_id in numpy.flatnonzero(counts):
+            data[self.guids[guid_id]] = int(sums[guid_id])
+        return data
+
+    @classmethod
+    @running_time
+    def from_lines(cls, lines: list[str], year: int):
+        columns = {
+            column_name: array(typecode)
+            for column_name, (typecode, _) in COLUMNS.items()
+        }
+        flag_column = columns["flag"]
+        source_column = columns["source"]
+        target_column = columns["target"]
+        spell_column = columns["spell"]
+        amount_column = columns["amount"]
+        overkill_column = columns["overkill"]
+        absorbed_column = columns["absorbed"]
+        crit_column = columns["crit"]
+        ms_column = columns["ms"]
+
+        flags = {flag: i for i, flag in enumerate(FLAG_ORDER)}
+        guids = {NIL_GUID: 0}
+        clock = logs_clock.LineClock(year)
+
+        for line in lines:
+            _line = line.split(",", 17)
+            amount = overkill = absorbed = crit = 0
+            try:
+                flag = _line[1]
+                source = _line[2]
+                target = _line[4]
+            except IndexError:
+                flag = _line[1] if len(_line) > 1 else ""
+                source = target = NIL_GUID
+
+            try:
+                spell = int(_line[6])
+            except (IndexError, ValueError):
+                spell = 0
+
+            try:
+                if flag.endswith("_MISSED"):
+                    if _line[9] == "ABSORB":
+                        absorbed = _to_int(_line[10])
+                elif "DAMAGE" in flag:
+                    amount = int(_line[9])
+                    overkill = _to_int(_line[10])
+                    absorbed = _to_int(_line[14])
+                    crit = _line[15] == "1"
+                elif "_HEAL" in flag:
+                    amount = int(_line[9])
+                    overkill = _to_int(_line[10])
+                    absorbed = _to_int(_line[11])
+                    crit = _line[12] == "1"
+                elif "ENERGIZE" in flag or "DRAIN" in flag or "LEECH" in flag:
+                    amount = int(_line[9])
+            except (IndexError, ValueError):
+                pass
+
+            try:
+                flag_column.append(flags[flag])
+            except KeyError:
+                flags[flag] = len(flags)
+                flag_column.append(flags[flag])
+            try:
+                source_column.append(guids[source])
+            except KeyError:
+                guids[source] = len(guids)
+                source_column.append(guids[source])
+            try:
+                target_column.append(guids[target])
+            except KeyError:
+                guids[target] = len(guids)
+                target_column.append(guids[target])
+            spell_column.append(spell)
+            amount_column.append(amount)
+            overkill_column.append(overkill)
+            absorbed_column.append(absorbed)
+            crit_column.append(crit)
+            ms_column.append(clock.line_ms(_line[0]))
+
+        np_columns = {
+            column_name: numpy.frombuffer(columns[column_name], dtype=dtype)
+            for column_name, (_, dtype) in COLUMNS.items()
+        }
+        return cls(np_columns, list(flags), list(guids))
+
+    @classmethod
+    def read(cls, path: PathExt):
+        with numpy.load(path, allow_pickle=False) as data:
+            check_format_version(data, FORMAT_VERSIONS)
+            columns = {
+                column_name: data[column_name]
+                for column_name in COLUMNS
+            }
+            flags = data["flags"].tolist()
+            guids = data["guids"].tolist()
+        return cls(columns, flags, guids)
+
+    def write(self, path: PathExt):
+        columns = {
+            column_name: getattr(self, column_name)
+            for column_name in COLUMNS
+        }
+        with open(path, "wb") as f:
+            numpy.savez_compressed(
+                f,
+                format_version=format_version_array(FORMAT_VERSIONS),
+                flags=numpy.array(self.flags, dtype=str),
+                guids=numpy.array(self.guids, dtype=str),
+                **columns,
+            )
+
+
+def write_events(path: PathExt, lines: list[str], year: int):
+    events = EventsData.from_lines(lines, year)
+    events.write(path)
+    return events
+
+
+class Events(logs_clock.Clock):
+    @property
+    def EVENTS(self) -> EventsData:
+        try:
+            return self.__EVENTS
+        except AttributeError:
+            pass
+        with self.locks("EVENTS"):
+            try:
+                return self.__EVENTS
+            except AttributeError:
+                self.__EVENTS = self._get_events()
+                return self.__EVENTS
+
+    def release_logs(self):
+        super().release_logs()
+        try:
+            del self.__EVENTS
+        except AttributeError:
+            pass
+
+    def _get_events(self):
+        try:
+            return self._read_events()
+        except Exception:
+            return self._redo_events()
+
+    def _read_events(self):
+        return EventsData.read(self.relative_path(FileNames.logs_events_data))
+
+    @running_time
+    def _redo_events(self):
+        events_path = self.relative_path(FileNames.logs_events_data)
+        return write_events(events_path, self.LOGS, self.year)
+
+    def get_events_slice(self, s: int, f: int):
+        return self.EVENTS[s:f]
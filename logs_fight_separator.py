@@ -337,8 +337,12 @@ class Fights(logs_core.Logs):
             return self.__ENCOUNTER_DATA
         except AttributeError:
             pass
-        self.__ENCOUNTER_DATA = self._get_enc_data()
-        return self.__ENCOUNTER_DATA
+        with self.locks("ENCOUNTER_DATA"):
+            try:
+                return self.__ENCOUNTER_DATA
+            except AttributeError:
+                self.__ENCOUNTER_DATA = self._get_enc_data()
+                return self.__ENCOUNTER_DATA
         
     @property
     def encounter_data_path(self):
@@ -1,35 +1,76 @@
+'''
+TIMESTAMP_DATA.u32 - first line of every second of the report.
+TIMESTAMPS[n] is the first line, that is n seconds after the first line.
+Raw uint32, memory-mapped on read, TIMESTAMP_DATA.json is the old format.
+'''
+
+from array import array
+
+import numpy
+
 import logs_core
+from c_path import FileNames, PathExt
 from h_debug import running_time
 
+
+def write_timestamps(path: PathExt, timestamps: array):
+    path_temp = path.with_name(f"{path.name}.tmp")
+    with open(path_temp, "wb") as f:
+        timestamps.tofile(f)
+    path_temp.replace(path)
+
+def read_timestamps(path: PathExt) -> numpy.ndarray:
+    if not path.stat().st_size:
+        return numpy.empty(0, dtype=numpy.uint32)
+    return numpy.memmap(path, dtype=numpy.uint32, mode="r")
+
+
 class Timestamps(logs_core.Logs):
     @property
-    def TIMESTAMPS(self):
+    def TIMESTAMPS(self) -> numpy.ndarray:
         try:
             return self.__TIMESTAMPS
         except AttributeError:
-            self.__TIMESTAMPS = self._get_timestamps()
-            return self.__TIMESTAMPS
+            pass
+        with self.locks("TIMESTAMPS"):
+            try:
+                return self.__TIMESTAMPS
+            except AttributeError:
+                self.__TIMESTAMPS = self._get_timestamps()
+                return self.__TIMESTAMPS
     
     def _get_timestamps(self):
         try:
             return self._read_timestamps()
+        except Exception:
+            pass
+        try:
+            return self._convert_timestamps_json()
         except Exception:
             return self._redo_timestamps()
     
     # @running_time
     def _read_timestamps(self):
-        timestamp_data_file_name = self.relative_path("TIMESTAMP_DATA.json")
-        return timestamp_data_file_name.json()
+        return read_timestamps(self.relative_path(FileNames.logs_timestamp_data))
     
+    @running_time
+    def _convert_timestamps_json(self):
+        timestamps_json = self.relative_path(FileNames.logs_timestamp_data_old)
+        timestamps = array("I", timestamps_json.json())
+        return self._write_timestamps(timestamps)
+
     @running_time
     def _redo_timestamps(self):
         timestamps = self._new_timestamps()
-        timestamp_data_file_name = self.relative_path("TIMESTAMP_DATA.json")
-        timestamp_data_file_name.json_write(timestamps)
-        return timestamps
+        return self._write_timestamps(timestamps)
+
+    def _write_timestamps(self, timestamps: array):
+        timestamps_path = self.relative_path(FileNames.logs_timestamp_data)
+        write_timestamps(timestamps_path, timestamps)
+        return self._read_timestamps()
     
     def _new_timestamps(self):
-        times: list[int] = []
+        times = array("I")
         first_line = self.LOGS[0]
         i = first_line.index('.')
         last_minutes, last_seconds = int(first_line[i-5:i-3]), int(first_line[i-2:i])
@@ -58,3 +99,27 @@ class Timestamps(logs_core.Logs):
                 last_seconds = seconds
             
         return times
+
+    def get_second_line(self, second: int) -> int:
+        '''first line, that is second seconds after the first line'''
+        return int(self.TIMESTAMPS[second])
+
+    def find_index(self, line_index: int, shift: int=0, slice_end=False):
+        if line_index is None:
+            if slice_end:
+                return self.get_second_line(-1)
+            return 0
+        if not shift:
+            shift = 0
+        shifted = int(numpy.searchsorted(self.TIMESTAMPS, line_index)) + shift
+        return max(shifted, 0)
+    
+    def find_indexes(self, lines_indexes) -> numpy.ndarray:
+        '''seconds from the first line for every line, same as find_index for each'''
+        return numpy.searchsorted(self.TIMESTAMPS, lines_indexes)
+
+    def find_shifted_log_line(self, line_index: int, shift: int):
+        if not line_index or not shift:
+            return line_index
+        new_index = self.find_index(line_index, shift)
+        return self.get_second_line(new_index)
@@ -0,0 +1,170 @@
+'''
+Lazy LOGS storage.
+
+MmapLines:
+LOGS_CUT.txt     - uncompressed lines, separated by '\\n'
+LOGS_CUT.offsets - uint64 byte offset of each line start + total size
+Both are memory-mapped, LOGS[s:f] decodes only the requested range,
+so opening a report doesn't create millions of str objects.
+They are an uncompressed copy of LOGS_CUT.zstd, made when the report is opened,
+and removed for least recently opened reports once all copies take over MMAP_MAX_BYTES.
+
+ZstdFramesLines:
+LOGS_CUT.zstd written as independent frames of N lines + LOGS_CUT.frames.json index.
+LOGS[s:f] decompresses only frames that cover the range.
+'''
+
+import mmap
+import os
+from abc import ABC, abstractmethod
+from array import array
+
+from c_path import FileNames, PathExt, zstd_frame_text
+
+NEW_LINE = b"\n"
+ITER_CHUNK = 100_000
+FRAMES_CACHE_SIZE = 4
+# disk taken by LOGS_CUT.txt + LOGS_CUT.offsets of all reports
+MMAP_MAX_BYTES = 20 * 1024 * 1024 * 1024
+
+
+class LogsLines(ABC):
+    '''Read only list[str] look alike.'''
+    lines_count: int
+
+    @abstractmethod
+    def _read_range(self, s: int, f: int) -> list[str]:
+        ...
+
+    def __len__(self):
+        return self.lines_count
+
+    def __bool__(self):
+        return self.lines_count > 0
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            s, f, step = key.indices(self.lines_count)
+            if step != 1:
+                return [self[i] for i in range(s, f, step)]
+            if f <= s:
+                return []
+            return self._read_range(s, f)
+
+        if key < 0:
+            key += self.lines_count
+        if key < 0 or key >= self.lines_count:
+            raise IndexError("list index out of range")
+        return self._read_range(key, key+1)[0]
+
+    def __iter__(self):
+        for s in range(0, self.lines_count, ITER_CHUNK):
+            yield from self._read_range(s, min(s+ITER_CHUNK, self.lines_count))
+
+    def __reversed__(self):
+        for f in range(self.lines_count, 0, -ITER_CHUNK):
+            yield from reversed(self._read_range(max(f-ITER_CHUNK, 0), f))
+
+
+class MmapLines(LogsLines):
+    def __init__(self, lines_path: PathExt, offsets_path: PathExt) -> None:
+        self._lines = self._mmap(lines_path)
+        self._offsets = memoryview(self._mmap(offsets_path)).cast("Q")
+        self.lines_count = len(self._offsets) - 1
+
+    @staticmethod
+    def _mmap(path: PathExt):
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _read_range(self, s: int, f: int):
+        # -1 to skip last '\n'
+        data = self._lines[self._offsets[s]:self._offsets[f]-1]
+        return data.decode().split("\n")
+
+
+class ZstdFramesLines(LogsLines):
+    def __init__(self, path: PathExt, frames_index: dict) -> None:
+        self._data = MmapLines._mmap(path)
+        self._frames_offsets: list[int] = frames_index["offsets"]
+        self._frames_cache: dict[int, list[str]] = {}
+        self.lines_per_frame: int = frames_index["lines_per_frame"]
+        self.lines_count: int = frames_index["lines"]
+
+    def _frame(self, frame_n: int):
+        try:
+            return self._frames_cache[frame_n]
+        except KeyError:
+            pass
+
+        start = self._frames_offsets[frame_n]
+        end = self._frames_offsets[frame_n+1]
+        frame = zstd_frame_text(self._data[start:end]).split("\n")
+        
+        if len(self._frames_cache) >= FRAMES_CACHE_SIZE:
+            oldest = next(iter(self._frames_cache))
+            self._frames_cache.pop(oldest, None)
+        self._frames_cache[frame_n] = frame
+        return frame
+
+    def _read_range(self, s: int, f: int):
+        first_frame = s // self.lines_per_frame
+        last_frame = (f-1) // self.lines_per_frame
+        shift = first_frame * self.lines_per_frame
+        if first_frame == last_frame:
+            return self._frame(first_frame)[s-shift:f-shift]
+
+        lines: list[str] = []
+        for frame_n in range(first_frame, last_frame+1):
+            lines.extend(self._frame(frame_n))
+        return lines[s-shift:f-shift]
+
+
+def write_lines(lines_path: PathExt, offsets_path: PathExt, lines: list[str]):
+    offsets = array("Q", [0])
+    position = 0
+
+    lines_path_temp = lines_path.with_name(f"{lines_path.name}.tmp")
+    with open(lines_path_temp, "wb") as f:
+        for line in lines:
+            line_bytes = line.encode() + NEW_LINE
+            f.write(line_bytes)
+            position += len(line_bytes)
+            offsets.append(position)
+    lines_path_temp.replace(lines_path)
+
+    # offsets are written last, report is ready when they exist
+    offsets_path_temp = offsets_path.with_name(f"{offsets_path.name}.tmp")
+    offsets_path_temp.write_bytes(offsets.tobytes())
+    offsets_path_temp.replace(offsets_path)
+
+
+def touch_lines(offsets_path: PathExt):
+    '''marks mmap files as recently opened'''
+    try:
+        os.utime(offsets_path)
+    except OSError:
+        pass
+
+def trim_lines(logs_dir: PathExt, max_bytes: int=MMAP_MAX_BYTES):
+    '''removes mmap files of least recently opened reports while all of them take over max_bytes'''
+    files = []
+    for offsets_path in logs_dir.glob(f"*/{FileNames.logs_cut_offsets}"):
+        lines_path = offsets_path.parent / FileNames.logs_cut_lines
+        try:
+            offsets_stat = offsets_path.stat()
+            size = offsets_stat.st_size + lines_path.stat().st_size
+        except FileNotFoundError:
+            continue
+        files.append((offsets_stat.st_mtime, size, offsets_path, lines_path))
+
+    total = sum(size for _, size, _, _ in files)
+    # most recently opened report is the one that is being opened now, it's never removed
+    for _, size, offsets_path, lines_path in sorted(files)[:-1]:
+        if total <= max_bytes:
+            break
+        # offsets first, without them files are rebuilt on next open
+        # processes that have them mapped keep reading the unlinked files
+        offsets_path.unlink(missing_ok=True)
+        lines_path.unlink(missing_ok=True)
+        total -= size
@@ -0,0 +1,210 @@
+'''
+Line numbers grouped by flag, source and target.
+
+Built from EVENTS_DATA once per report and saved as LINES_INDEX.npz.
+Every group is sorted, so lines in [s, f) are found with searchsorted
+and analyzers can skip lines they would filter out with "_DAMAGE" in line etc.
+
+by_*         - line numbers, sorted by key, then by line number
+by_*_offsets - by_*[offsets[key]:offsets[key+1]] are lines of the key
+'''
+
+import numpy
+
+import logs_events
+from c_path import FileNames, PathExt
+from h_debug import running_time
+
+GROUPS = ("flag", "source", "target")
+FORMAT_VERSION = 1
+FORMAT_VERSIONS = (FORMAT_VERSION, logs_events.FORMAT_VERSION)
+# if more lines than this part of the slice are needed, decoding whole slice is faster
+DECODE_SLICE_RATIO = 4
+
+
+def _group_by(keys: numpy.ndarray, size: int):
+    lines = numpy.argsort(keys, kind="stable").astype(numpy.uint32)
+    offsets = numpy.zeros(size+1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(keys, minlength=size), out=offsets[1:])
+    return lines, offsets
+
+def _merge(parts: list[numpy.ndarray]):
+    if not parts:
+        return numpy.empty(0, dtype=numpy.uint32)
+    if len(parts) == 1:
+        return parts[0]
+    return numpy.sort(numpy.concatenate(parts))
+
+
+class LinesIndexData:
+    __slots__ = (
+        *(f"by_{group}" for group in GROUPS),
+        *(f"by_{group}_offsets" for group in GROUPS),
+        "flags", "guids", "lines_count", "_guids_index",
+    )
+
+    def __init__(self, arrays: dict[str, numpy.ndarray], flags: list[str], guids: list[str]) -> None:
+        for group in GROUPS:
+            setattr(self, f"by_{group}", arrays[f"by_{group}"])
+            setattr(self, f"by_{group}_offsets", arrays[f"by_{group}_offsets"])
+        self.flags = flags
+        self.guids = guids
+        self.lines_count = len(self.by_flag)
+
+    @property
+    def guids_index(self) -> dict[str, int]:
+        try:
+            return self._guids_index
+        except AttributeError:
+            self._guids_index = {guid: i for i, guid in enumerate(self.guids)}
+            return self._guids_index
+
+    def _slice_lines(self, group: str, key: int, s: int, f: int):
+        lines: numpy.ndarray = getattr(self, f"by_{group}")
+        offsets: numpy.ndarray = getattr(self, f"by_{group}_offsets")
+        key_lines = lines[offsets[key]:offsets[key+1]]
+        if s is None:
+            s = 0
+        if f is None:
+            f = self.lines_count
+        start, end = numpy.searchsorted(key_lines, (s, f))
+        return key_lines[start:end]
+
+    def flag_lines(self, s: int, f: int, *flag_substrings: str):
+        '''sorted line numbers in [s, f) with flag that contains any of flag_substrings'''
+        parts = [
+            self._slice_lines("flag", flag_id, s, f)
+            for flag_id, flag in enumerate(self.flags)
+            if any(x in flag for x in flag_substrings)
+        ]
+        return _merge(parts)
+
+    def unit_lines(self, s: int, f: int, guid: str, as_source=True, as_target=True):
+        '''sorted line numbers in [s, f) where guid is source or target'''
+        guid_id = self.guids_index.get(guid)
+        if guid_id is None:
+            return _merge([])
+
+        parts = []
+        if as_source:
+            parts.append(self._slice_lines("source", guid_id, s, f))
+        if as_target:
+            parts.append(self._slice_lines("target", guid_id, s, f))
+        if len(parts) == 2:
+            return numpy.union1d(*parts)
+        return _merge(parts)
+
+    @classmethod
+    @running_time
+    def from_events(cls, events: logs_events.EventsData):
+        arrays = {}
+        sizes = {
+            "flag": len(events.flags),
+            "source": len(events.guids),
+            "target": len(events.guids),
+        }
+        for group, size in sizes.items():
+            lines, offsets = _group_by(getattr(events, group), size)
+            arrays[f"by_{group}"] = lines
+            arrays[f"by_{group}_offsets"] = offsets
+        return cls(arrays, events.flags, events.guids)
+
+    @classmethod
+    def read(cls, path: PathExt):
+        with numpy.load(path, allow_pickle=False) as data:
+            logs_events.check_format_version(data, FORMAT_VERSIONS)
+            arrays = {
+                key: data[key]
+                for key in data.files
+                if key.startswith("by_")
+            }
+            flags = data["flags"].tolist()
+            guids = data["guids"].tolist()
+        return cls(arrays, flags, guids)
+
+    def write(self, path: PathExt):
+        arrays = {
+            key: getattr(self, key)
+            for key in self.__slots__
+            if key.startswith("by_")
+        }
+        with open(path, "wb") as f:
+            numpy.savez_compressed(
+                f,
+                format_version=logs_events.format_version_array(FORMAT_VERSIONS),
+                flags=numpy.array(self.flags, dtype=str),
+                guids=numpy.array(self.guids, dtype=str),
+                **arrays,
+            )
+
+
+def write_lines_index(path: PathExt, events: logs_events.EventsData):
+    lines_index = LinesIndexData.from_events(events)
+    lines_index.write(path)
+    return lines_index
+
+
+class LinesIndex(logs_events.Events):
+    @property
+    def LINES_INDEX(self) -> LinesIndexData:
+        try:
+            return self.__LINES_INDEX
+        except AttributeError:
+            pass
+        with self.locks("LINES_INDEX"):
+            try:
+                return self.__LINES_INDEX
+            except AttributeError:
+                self.__LINES_INDEX = self._get_lines_index()
+                return self.__LINES_INDEX
+
+    def release_logs(self):
+        super().release_logs()
+        try:
+            del self.__LINES_INDEX
+        except AttributeError:
+            pass
+
+    def _get_lines_index(self):
+        try:
+            return self._read_lines_index()
+        except Exception:
+            return self._redo_lines_index()
+
+    def _read_lines_index(self):
+        return LinesIndexData.read(self.relative_path(FileNames.logs_lines_index))
+
+    @running_time
+    def _redo_lines_index(self):
+        lines_index_path = self.relative_path(FileNames.logs_lines_index)
+        return write_lines_index(lines_index_path, self.EVENTS)
+
+    def get_lines_by_index(self, lines: numpy.ndarray) -> list[str]:
+        if not len(lines):
+            return []
+
+        lines = lines.tolist()
+        if len(lines) * DECODE_SLICE_RATIO < lines[-1] - lines[0]:
+            return [self.LOGS[i] for i in lines]
+
+        first = lines[0]
+        logs_slice = self.LOGS[first:lines[-1]+1]
+        return [logs_slice[i-first] for i in lines]
+
+    def get_slice_edges(self, s: int, f: int):
+        '''first and last lines of self.LOGS[s:f]'''
+        if not s:
+            s = 0
+        if not f:
+            f = len(self.LOGS)
+        return self.LOGS[s], self.LOGS[f-1]
+
+    def get_flag_lines(self, s: int, f: int, *flag_substrings: str):
+        '''superset of self.LOGS[s:f] lines that contain any of flag_substrings in flag'''
+        lines = self.LINES_INDEX.flag_lines(s, f, *flag_substrings)
+        return self.get_lines_by_index(lines)
+
+    def get_unit_lines(self, s: int, f: int, guid: str):
+        '''self.LOGS[s:f] lines where guid is source or target'''
+        lines = self.LINES_INDEX.unit_lines(s, f, guid)
+        return self.get_lines_by_index(lines)
@@ -19,6 +19,7 @@ import logs_valk_grabs
 import logs_ucm
 import logs_auras_v2
 
+from c_path import FileNames
 from c_spells import UNKNOWN_ICON
 from c_bosses import (
     BOSSES_GUIDS,
@@ -39,6 +40,14 @@ SHIFT = {
     'consumables': 10,
     'player_auras': 10,
 }
+# bump when segment summary format or its numbers change
+SEGMENTS_SUMMARY_VERSION = 1
+SUMMARY_KEYS = (
+    "damage",
+    "heal",
+    "heal_total",
+    "taken",
+)
 ENTITIES_KEYS = (
     "BOSSES",
     "PLAYERS' PERMANENT PETS",
@@ -81,6 +90,15 @@ def get_dict_int(d: dict, key, default=None):
     except KeyError:
         return default
 
+def summary_with_absorbs(summary: dict[str, dict[str, int]]):
+    data = {
+        k: defaultdict(int, summary[k])
+        for k in SUMMARY_KEYS
+    }
+    add_new_numeric_data(data["heal"], summary["absorbs"])
+    add_new_numeric_data(data["heal_total"], summary["absorbs"])
+    return data
+
 def str_slice_from_to(s: str, start, end):
     try:
         i_s = s.index(start)
@@ -182,7 +200,7 @@ class THE_LOGS(
         slice_name = "Custom Slice"
         slice_tries = ""
         if query.start and query.end:
-            segments = [[self.TIMESTAMPS[query.start], self.TIMESTAMPS[query.end]]]
+            segments = [[self.get_second_line(query.start), self.get_second_line(query.end)]]
         else:
             segments =  [[None, None]]
         return {
@@ -296,7 +314,7 @@ class THE_LOGS(
             "DURATION_STR": self.duration_to_string(duration),
             "SERVER": _server,
         }
-        cached_data[QUERY] = return_data
+        self.store_slice(cached_data, QUERY, return_data)
         return return_data
     
     def request_get_kill_segment(self, request):
@@ -307,18 +325,109 @@ class THE_LOGS(
 
     @logs_base.cache_wrap
     def get_slice_damage_heal(self, s, f):
-        logs_slice = self.LOGS[s:f]
+        cube_data = self.get_cube_damage_heal(s, f)
+        if cube_data is not None:
+            return cube_data
+
+        events = self.get_events_slice(s, f)
         players_and_pets = self.get_players_and_pets_guids()
-        return logs_dmg_heals.parse_both(logs_slice, players_and_pets)
+        return logs_dmg_heals.parse_both_events(events, players_and_pets)
     
     @logs_base.cache_wrap
     def get_slice_damage_heal_absorbs(self, s, f):
-        data = self.get_slice_damage_heal(s, f)
+        # copy, get_slice_damage_heal result is cached
+        data = {
+            k: defaultdict(int, v)
+            for k, v in self.get_slice_damage_heal(s, f).items()
+        }
         for guid, v in self.get_absorbs_by_source(s, f).items():
             data["heal"][guid] += v
             data["heal_total"][guid] += v
         return data
 
+    @property
+    def SEGMENTS_SUMMARY(self) -> dict:
+        try:
+            return self.__SEGMENTS_SUMMARY
+        except AttributeError:
+            pass
+        with self.locks("SEGMENTS_SUMMARY"):
+            try:
+                return self.__SEGMENTS_SUMMARY
+            except AttributeError:
+                self.__SEGMENTS_SUMMARY = self._get_segments_summary()
+                return self.__SEGMENTS_SUMMARY
+
+    def _get_segments_summary(self):
+        '''
+        Made off request by logs_top and logs_prewarm, a full pass over every segment is too slow for a page.
+        Until then summaries of all segments are missing and pages sum per segment slices.
+        '''
+        try:
+            return self._read_segments_summary()
+        except Exception:
+            return {
+                "VERSION": SEGMENTS_SUMMARY_VERSION,
+                "SPECS": None,
+                "SEGMENTS": {},
+            }
+
+    def _read_segments_summary(self):
+        summary = self.relative_path(FileNames.logs_segments_summary).json()
+        if summary["VERSION"] != SEGMENTS_SUMMARY_VERSION:
+            raise ValueError("old segments summary")
+        return summary
+
+    @running_time
+    def _redo_segments_summary(self):
+        SEGMENTS = {}
+        for boss_name, segments in self.ENCOUNTER_DATA.items():
+            self.report_page_slice_pass(segments, boss_name)
+            for s, f in segments:
+                SEGMENTS[f"{s}_{f}"] = self._segment_summary(s, f, boss_name)
+
+        summary = {
+            "VERSION": SEGMENTS_SUMMARY_VERSION,
+            "SPECS": self.get_players_specs_in_segments(None, None),
+            "SEGMENTS": SEGMENTS,
+        }
+        self.relative_path(FileNames.logs_segments_summary).json_write(summary)
+        self.__SEGMENTS_SUMMARY = summary
+        return summary
+
+    def make_segments_summary(self, rewrite=False):
+        if not rewrite:
+            try:
+                return self._read_segments_summary()
+            except Exception:
+                pass
+        return self._redo_segments_summary()
+
+    def _segment_summary(self, s, f, boss_name: str):
+        summary = {
+            k: v
+            for k, v in self.get_slice_damage_heal(s, f).items()
+            if k in SUMMARY_KEYS
+        }
+        summary["absorbs"] = self.get_absorbs_by_source(s, f)
+        summary["useful"] = self.target_damage_all([[s, f]], boss_name)["useful_total"]
+        summary["specs"] = self.get_players_specs_in_segments(s, f)
+        summary["boss"] = boss_name
+        return summary
+
+    def get_segments_summaries(self, segments: list[tuple[int, int]], boss_name: str=None):
+        '''precomputed totals of each segment, None if any segment is not a boss segment'''
+        SEGMENTS = self.SEGMENTS_SUMMARY["SEGMENTS"]
+        summaries = []
+        for s, f in segments:
+            summary = SEGMENTS.get(f"{s}_{f}")
+            if summary is None:
+                return None
+            if boss_name and summary["boss"] != boss_name:
+                return None
+            summaries.append(summary)
+        return summaries
+
     def get_slice_first_last_hit(self, s: int=None, f: int=None):
         if not s or type(s) != int:
             s = 0
@@ -344,7 +453,7 @@ class THE_LOGS(
                 new_specs[unit_name] = (unit_name, UNKNOWN_ICON)
         return new_specs
 
-    def get_report_page_all(self, segments):
+    def get_report_page_all(self, segments, summaries: list[dict]=None):
         combined_data = {
             "damage": defaultdict(int),
             "heal": defaultdict(int),
@@ -352,12 +461,19 @@ class THE_LOGS(
             "taken": defaultdict(int),
         }
 
-        for s, f in segments:
-            new_data = self.get_slice_damage_heal_absorbs(s, f)
-            for k, _data in combined_data.items():
-                add_new_numeric_data(_data, new_data[k])
+        if summaries is None:
+            for s, f in segments:
+                new_data = self.get_slice_damage_heal_absorbs(s, f)
+                for k, _data in combined_data.items():
+                    add_new_numeric_data(_data, new_data[k])
+            specs = self.get_players_specs_in_segments(*segments[0])
+        else:
+            for summary in summaries:
+                new_data = summary_with_absorbs(summary)
+                for k, _data in combined_data.items():
+                    add_new_numeric_data(_data, new_data[k])
+            specs = summaries[0]["specs"]
 
-        specs = self.get_players_specs_in_segments(*segments[0])
         return_data = {
             "DATA": combined_data,
             "SPECS": specs,
@@ -374,12 +490,17 @@ class THE_LOGS(
             "heal": defaultdict(int),
             "taken": defaultdict(int),
         }
-        for s, f in segments:
-            new_data = self.get_slice_damage_heal(s, f)
+        summaries = self.get_segments_summaries(segments)
+        if summaries is None:
+            summaries = [self.get_slice_damage_heal(s, f) for s, f in segments]
+            specs = self.get_players_specs_in_segments(None, None)
+        else:
+            specs = self.SEGMENTS_SUMMARY["SPECS"]
+
+        for new_data in summaries:
             for k, _data in combined_data.items():
                 add_new_numeric_data(_data, new_data[k])
 
-        specs = self.get_players_specs_in_segments(None, None)
 
         return_data = {
             "DATA": combined_data,
@@ -407,12 +528,33 @@ class THE_LOGS(
             
         return d
 
+    def report_page_slice_pass(self, segments: list[tuple[int, int]], boss_name: str):
+        '''useful damage of each segment from a single pass over it, absorbs use EVENTS'''
+        if not boss_name:
+            return
+        for s, f in segments:
+            specs = self.get_players_specs_in_segments(s, f)
+            visitors = self.target_damage_visitors(s, f, boss_name, specs)
+            self.run_slice_visitors(s, f, visitors)
+
     @running_time
     def get_report_page_all_wrap(self, segments: list[tuple[int, int]], boss_name: str):
         boss_name = BOSSES_FROM_HTML.get(boss_name, boss_name)
 
+        summaries = None
+        if boss_name != "all" and len(segments) > 1:
+            summaries = self.get_segments_summaries(segments, boss_name)
+
+        if boss_name != "all" and summaries is None:
+            self.report_page_slice_pass(segments, boss_name)
+
         if not boss_name or  boss_name == "all":
             _useful = {}
+        elif summaries is not None:
+            _useful = defaultdict(int)
+            for summary in summaries:
+                add_new_numeric_data(_useful, summary["useful"])
+            _useful = sort_dict_by_value(_useful)
         else:
             _useful = self.target_damage_all(segments, boss_name)["useful_total"]
             _useful = sort_dict_by_value(_useful)
@@ -423,7 +565,7 @@ class THE_LOGS(
         if boss_name == "all":
             DD = self.get_report_page_boss_only()
         else:
-            DD = self.get_report_page_all(segments)
+            DD = self.get_report_page_all(segments, summaries)
         columns.update(DD["DATA"])
 
         TABLE = {}
@@ -484,23 +626,13 @@ class THE_LOGS(
     @running_time
     def get_comparison_data(self, segments, class_filter: str, tGUID=None):
         class_filter = class_filter.lower()
-        players = []
-        targets = {}
-        spells = {}
-        for guid, class_name in self.get_classes().items():
-            if class_name != class_filter:
-                continue
-            data = self.get_numbers_breakdown_wrap(segments, guid, filter_guid=tGUID)
-            data["NAME"] = self.guid_to_name(guid)
-            targets |= data["TARGETS"]
-            spells |= data["SPELLS_DATA"]
-            players.append(data)
-
-        return json.dumps({
-            "PLAYERS": players,
-            "SPELLS": spells,
-            "TARGETS": targets,
-        }, default=list)
+        players = [
+            guid
+            for guid, class_name in self.get_classes().items()
+            if class_name == class_filter
+        ]
+        data = self.numbers_compare(segments, players, target_filter=tGUID)
+        return json.dumps(data, default=list)
 
     @logs_base.cache_wrap
     def entities(self, s, f):
@@ -46,7 +46,7 @@ def get_powers(logs: list[str]):
 class Powers(logs_base.THE_LOGS):
     @logs_base.cache_wrap
     def get_powers(self, s, f):
-        logs_slice = self.LOGS[s:f]
+        logs_slice = self.get_flag_lines(s, f, "_ENERGIZE")
         return get_powers(logs_slice)
 
     def powers_add_data(
@@ -0,0 +1,64 @@
+'''
+Post upload prewarm.
+
+Opens a new report and computes pages for every kill segment,
+so guids, timestamps, spells, segments and slice results are saved to the report folder
+(SLICE_CACHE.db, SEGMENTS_SUMMARY.json, etc.) and the first visitor reads them instead of parsing.
+'''
+
+from time import perf_counter
+
+import logs_main
+from h_debug import Loggers, get_ms_str
+
+LOGGER_REPORTS = Loggers.reports
+
+
+def _report(report: logs_main.THE_LOGS, boss_name: str, segments: list[tuple[int, int]]):
+    report.get_report_page_all_wrap(segments, boss_name)
+
+def _useful(report: logs_main.THE_LOGS, boss_name: str, segments: list[tuple[int, int]]):
+    report.damage_to_target_all_formatted(segments, boss_name)
+
+def _deaths(report: logs_main.THE_LOGS, boss_name: str, segments: list[tuple[int, int]]):
+    for s, f in segments:
+        report.get_deaths_v2(s, f)
+
+def _auras(report: logs_main.THE_LOGS, boss_name: str, segments: list[tuple[int, int]]):
+    report.auras_info_all(segments)
+
+def _consumables(report: logs_main.THE_LOGS, boss_name: str, segments: list[tuple[int, int]]):
+    report.potions_all(segments)
+
+PAGES = {
+    "report": _report,
+    "useful": _useful,
+    "deaths": _deaths,
+    "auras": _auras,
+    "consumables": _consumables,
+}
+
+
+def prewarm_report(report_id: str, pages: tuple[str]=tuple(PAGES)):
+    '''True if every page of every kill segment was computed'''
+    pc = perf_counter()
+    report = logs_main.THE_LOGS(report_id)
+    done = True
+    for boss_name, segment in report.gen_kill_segments():
+        segments = [(segment.start, segment.end)]
+        for page in pages:
+            try:
+                PAGES[page](report, boss_name, segments)
+            except Exception:
+                done = False
+                LOGGER_REPORTS.exception(f"{report_id} | Prewarm | {page} | {boss_name}")
+
+    # after pages, summaries reuse their slices
+    try:
+        report.make_segments_summary()
+    except Exception:
+        done = False
+        LOGGER_REPORTS.exception(f"{report_id} | Prewarm | Segments summary")
+
+    LOGGER_REPORTS.debug(f'{get_ms_str(pc)} | {report_id:50} | Prewarm done')
+    return done
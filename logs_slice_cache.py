@@ -0,0 +1,107 @@
+'''
+Persistent slice results cache.
+
+SLICE_CACHE.db in report folder, survives report eviction and restarts,
+shared between workers, since it's sqlite in WAL mode.
+
+key     = function name + repr of args + s_f
+version = CACHE_VERSION + hash of sources of the function's module and of modules it depends on,
+          entries made by an older parser are dropped on read.
+Results are saved and returned as plain dicts, same type from disk and from a fresh run.
+'''
+
+import hashlib
+import inspect
+import pickle
+import sqlite3
+import threading
+from collections import defaultdict
+
+import zstd
+
+from c_path import PathExt
+from h_debug import Loggers
+
+# bump when a cached function changes because of a change in a module not in its depends
+CACHE_VERSION = 1
+TYPES = (str, bool, type(None))
+LOGGER_REPORTS = Loggers.reports
+
+QUERY_CREATE = "CREATE TABLE IF NOT EXISTS slice_cache (key TEXT PRIMARY KEY, version TEXT, data BLOB) WITHOUT ROWID"
+QUERY_SELECT = "SELECT version, data FROM slice_cache WHERE key=?"
+QUERY_REPLACE = "REPLACE INTO slice_cache VALUES(?, ?, ?)"
+QUERY_DELETE = "DELETE FROM slice_cache WHERE key=?"
+
+
+def function_version(func, depends: tuple=()):
+    '''depends - modules the result depends on besides the function's own module'''
+    func = inspect.unwrap(func)
+    paths = [func.__code__.co_filename]
+    paths.extend(module.__file__ for module in depends)
+    _hash = hashlib.sha1()
+    for path in paths:
+        with open(path, "rb") as f:
+            _hash.update(f.read())
+    _hash.update(f"{CACHE_VERSION}|{func.__qualname__}".encode())
+    return _hash.hexdigest()[:16]
+
+def cache_key(func_name: str, args: tuple, slice_ID: str):
+    for arg in args:
+        if not isinstance(arg, TYPES):
+            return None
+    _args = "|".join(map(repr, args))
+    return f"{func_name}|{_args}|{slice_ID}"
+
+def to_plain(data):
+    '''defaultdict with lambdas can't be pickled'''
+    if isinstance(data, defaultdict) or type(data) is dict:
+        return {k: to_plain(v) for k, v in data.items()}
+    if type(data) in (list, tuple):
+        return type(data)(to_plain(v) for v in data)
+    return data
+
+
+class SliceCache:
+    def __init__(self, path: PathExt) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+
+    @property
+    def connection(self):
+        try:
+            return self.__connection
+        except AttributeError:
+            pass
+
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(QUERY_CREATE)
+        connection.commit()
+        self.__connection = connection
+        return self.__connection
+
+    def get(self, key: str, version: str):
+        '''returns (found, data)'''
+        try:
+            with self.lock:
+                row = self.connection.execute(QUERY_SELECT, (key, )).fetchone()
+                if row is None:
+                    return False, None
+                if row[0] != version:
+                    self.connection.execute(QUERY_DELETE, (key, ))
+                    self.connection.commit()
+                    return False, None
+            return True, pickle.loads(zstd.decompress(row[1]))
+        except Exception:
+            LOGGER_REPORTS.exception(f"SliceCache.get | {self.path} | {key}")
+            return False, None
+
+    def set(self, key: str, version: str, data):
+        try:
+            data = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            data = zstd.compress(data, 3)
+            with self.lock:
+                self.connection.execute(QUERY_REPLACE, (key, version, data))
+                self.connection.commit()
+        except Exception:
+            LOGGER_REPORTS.exception(f"SliceCache.set | {self.path} | {key}")
@@ -0,0 +1,48 @@
+'''
+One pass over a slice for analyzers, that would scan it on their own.
+
+Visitors register substrings the lines they need contain,
+line is split once and given to every visitor that needs it.
+'''
+
+from abc import ABC, abstractmethod
+
+from h_debug import running_time
+
+
+class SliceVisitor(ABC):
+    # line is visited only if it contains any of these, None - every line
+    LINE_FILTER: tuple[str, ...] = None
+    # visit gets line.split(',') too
+    SPLIT = True
+
+    @abstractmethod
+    def visit(self, line: str, _line: list[str]):
+        ...
+
+    @abstractmethod
+    def result(self):
+        ...
+
+
+@running_time
+def run_visitors(logs_slice: list[str], visitors: list[SliceVisitor]):
+    visitors = list(visitors)
+    plan = [
+        (visitor.visit, visitor.LINE_FILTER, visitor.SPLIT)
+        for visitor in visitors
+    ]
+    for line in logs_slice:
+        _line = None
+        for visit, line_filter, split in plan:
+            if line_filter is not None:
+                for x in line_filter:
+                    if x in line:
+                        break
+                else:
+                    continue
+            if split and _line is None:
+                _line = line.split(',')
+            visit(line, _line)
+
+    return [visitor.result() for visitor in visitors]
@@ -1,6 +1,9 @@
 from collections import defaultdict
 
+import logs_aura_intervals
 import logs_base
+import logs_clock
+import logs_events
 from constants import FLAG_ORDER
 from h_debug import Loggers, running_time
 from h_other import (
@@ -521,7 +524,7 @@ def get_potions_count(logs_slice: list[str]):
 
 
 class Consumables(logs_base.THE_LOGS):
-    @logs_base.cache_wrap
+    @logs_base.cache_wrap_persistent
     def potions_info(self, s, f) -> dict[str, dict[str, int]]:
         logs_slice = self.LOGS[s:f]
         return get_potions_count(logs_slice)
@@ -610,21 +613,6 @@ class SpellCount(logs_base.THE_LOGS):
             "SPELL_COLOR": SPELL.color,
         }
 
-class _TargetBuffCount(list[tuple[str, str]]):
-    pass
-
-def get_raid_buff_count(logs_slice: list[str], flag_filter='SPELL_AURA'):
-    auras = defaultdict(lambda: defaultdict(_TargetBuffCount))
-    for line in logs_slice:
-        if flag_filter not in line:
-            continue
-        timestamp, flag, _, _, target_guid, _, spell_id, _ = line.split(',', 7)
-        if spell_id in AURAS:
-            spell_id = MULTISPELLS_D.get(spell_id, spell_id)
-            auras[target_guid][spell_id].append((flag, timestamp))
-
-    return auras
-
 def get_filtered_info(data):
     return {
         spell_id: spell_info
@@ -636,53 +624,36 @@ class _TargetAuraUptime(dict[str, tuple[int, float]]):
     pass
 
 class AuraUptime(logs_base.THE_LOGS):
-    def iter_spell(self, data: list[str, str], ignore_fast_remove=True):
-        count = 0
-        uptime = 0.0
-        start = None
-        for flag, timestamp in data:
-            if start is None:
-                if flag == "SPELL_AURA_APPLIED":
-                    start = timestamp
-                    count += 1
-            elif flag == "SPELL_AURA_REMOVED":
-                new_uptime = self.get_timedelta_seconds(start, timestamp)
-                start = None
-                if ignore_fast_remove and new_uptime < UPTIME_IGNORED:
-                    continue
-                uptime += new_uptime
-            else:
-                count += 1
-        
-        return count, uptime
-
-    def get_auras_uptime(self, logs_slice, data: dict[str, dict[str, _TargetBuffCount]]):
-        first_line = logs_slice[0]
-        last_line = logs_slice[-1]
-        DUR = self.get_timedelta_seconds(first_line, last_line)
+    @logs_base.cache_wrap_persistent(depends=(logs_aura_intervals, logs_events, logs_clock))
+    def auras_info(self, s, f):
+        first_ms, last_ms = self.get_slice_edges_ms(s, f)
+        DUR = self.get_slice_duration(s, f)
+
+        auras: defaultdict[str, dict[str, list]] = defaultdict(dict)
+        for target_guid, spell_id, count, uptime in self.AURA_INTERVALS.uptime(
+            first_ms,
+            last_ms,
+            spell_ids=AURAS,
+            ignored=UPTIME_IGNORED,
+            ignored_forced=UPTIME_IGNORED_FORCED,
+        ):
+            spell_id = MULTISPELLS_D.get(spell_id, spell_id)
+            try:
+                aura = auras[target_guid][spell_id]
+                aura[0] += count
+                aura[1] += uptime
+            except KeyError:
+                auras[target_guid][spell_id] = [count, uptime]
 
         new_auras = defaultdict(_TargetAuraUptime)
-
-        for target_guid, spells in data.items():
-            for spell_id, spell_data in spells.items():
-                if spell_data[0][0] != "SPELL_AURA_APPLIED":
-                    spell_data.insert(0, ("SPELL_AURA_APPLIED", first_line))
-                if spell_data[-1][0] != "SPELL_AURA_REMOVED":
-                    spell_data.append(("SPELL_AURA_REMOVED", last_line))
-                ignore_fast_remove = spell_id not in UPTIME_IGNORED_FORCED
-                count, uptime = self.iter_spell(spell_data, ignore_fast_remove=ignore_fast_remove)
-                if ignore_fast_remove and uptime < UPTIME_IGNORED:
+        for target_guid, spells in auras.items():
+            for spell_id, (count, uptime) in spells.items():
+                if spell_id not in UPTIME_IGNORED_FORCED and uptime < UPTIME_IGNORED:
                     continue
                 new_auras[target_guid][spell_id] = (count, uptime/DUR)
         
         return new_auras
 
-    @logs_base.cache_wrap
-    def auras_info(self, s, f):
-        logs_slice = self.LOGS[s:f]
-        data = get_raid_buff_count(logs_slice)
-        return self.get_auras_uptime(logs_slice, data)
-
     def auras_info_all(self, segments, trim_non_players=True):
         auras_uptime = defaultdict(lambda: defaultdict(list))
         auras_count = defaultdict(lambda: defaultdict(int))
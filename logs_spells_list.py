@@ -1,4 +1,25 @@
-from c_path import Files, PathExt
+'''
+Spells of reports.
+
+Every spell ever seen is kept once per client locale in db/spells_catalog.<locale>.json, {spell_id: [name, school]}.
+The catalog is loaded once per process and reloaded only when another process added spells to it.
+Reports save only ids of their spells and their locale in SPELLS_IDS.json and share Spell objects of the catalog.
+Names that differ from the catalog are saved with the report.
+'''
+
+import os
+import re
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # windows, only threads of 1 process are locked out
+    fcntl = None
+
+from c_path import FileNames, Files, PathExt
 from c_spells import (
     COMBINE_SPELLS,
     CUSTOM_SPELL_NAMES,
@@ -110,14 +131,198 @@ def spell_id_to_int(data: dict[str, Spell]):
     }
 
 
+# search index, lower case names are split into NGRAM long parts
+NGRAM = 3
+DEFAULT_LOCALE = "enUS"
+CYRILLIC = re.compile("[а-яё]", re.IGNORECASE)
+CATALOG_LOCK = threading.Lock()
+
+def _ngrams(text: str):
+    return {text[i:i+NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+def _short_parts(text: str):
+    '''parts of text shorter than NGRAM'''
+    return {text[i:i+n] for n in range(1, NGRAM) for i in range(len(text) - n + 1)}
+
+def _index(spells: dict[int, Spell], split) -> dict[str, list[int]]:
+    index = defaultdict(list)
+    for spell_id, spell in spells.items():
+        for part in split(spell.name_lower):
+            index[part].append(spell_id)
+    return dict(index)
+
+def spells_locale(spells: dict[str, Spell]):
+    '''client locale of spell names, only Russian and English clients are told apart'''
+    for spell in spells.values():
+        if CYRILLIC.search(spell.name):
+            return "ruRU"
+    return DEFAULT_LOCALE
+
+
+class SpellsCatalog:
+    def __init__(self, spells: dict[int, Spell], mtime: float) -> None:
+        self.spells = spells
+        self.mtime = mtime
+        self.lock = threading.Lock()
+
+    @property
+    def ngrams(self) -> dict[str, list[int]]:
+        try:
+            return self._ngrams
+        except AttributeError:
+            pass
+        with self.lock:
+            try:
+                return self._ngrams
+            except AttributeError:
+                self._ngrams = _index(self.spells, _ngrams)
+                return self._ngrams
+
+    @property
+    def short_parts(self) -> dict[str, list[int]]:
+        try:
+            return self._short_parts
+        except AttributeError:
+            pass
+        with self.lock:
+            try:
+                return self._short_parts
+            except AttributeError:
+                self._short_parts = _index(self.spells, _short_parts)
+                return self._short_parts
+
+    def has_all(self, spell_ids: list[int]):
+        return all(spell_id in self.spells for spell_id in spell_ids)
+
+    def _same_name(self, spell_id: int, spell_ids: dict[int, Spell]):
+        spell = spell_ids.get(spell_id)
+        return spell is not None and spell.name_lower == self.spells[spell_id].name_lower
+
+    def search(self, _filter: str, spell_ids: dict[int, Spell]):
+        '''ids from spell_ids with _filter in name, spells named not as in the catalog are skipped'''
+        _filter = _filter.lower()
+        if len(_filter) < NGRAM:
+            return [
+                spell_id
+                for spell_id in self.short_parts.get(_filter, ())
+                if self._same_name(spell_id, spell_ids)
+            ]
+
+        ngrams = self.ngrams
+        postings = sorted((ngrams.get(ngram, ()) for ngram in _ngrams(_filter)), key=len)
+        others = [set(posting) for posting in postings[1:]]
+        return [
+            spell_id
+            for spell_id in postings[0]
+            if self._same_name(spell_id, spell_ids)
+            and all(spell_id in posting for posting in others)
+            and _filter in self.spells[spell_id].name_lower
+        ]
+
+    @classmethod
+    @running_time
+    def read(cls, path: PathExt, mtime: float):
+        spells = {
+            spell_id: Spell(spell_id, name, school)
+            for spell_id, (name, school) in path.json_ignore_error().items()
+        }
+        add_spells_icons(spells)
+        spells_raname_to_custom(spells)
+        return cls(spell_id_to_int(spells), mtime)
+
+
+_CATALOGS: dict[str, SpellsCatalog] = {}
+
+def _catalog_path(locale: str) -> PathExt:
+    path = Files.spells_catalog_db
+    return path.with_name(f"{path.stem}.{locale}{path.suffix}")
+
+def _catalog_mtime(path: PathExt):
+    try:
+        return path.mtime
+    except FileNotFoundError:
+        return 0.0
+
+def spells_catalog(locale: str=DEFAULT_LOCALE):
+    path = _catalog_path(locale)
+    mtime = _catalog_mtime(path)
+    catalog = _CATALOGS.get(locale)
+    if catalog is not None and catalog.mtime == mtime:
+        return catalog
+    with CATALOG_LOCK:
+        catalog = _CATALOGS.get(locale)
+        if catalog is None or catalog.mtime != mtime:
+            catalog = _CATALOGS[locale] = SpellsCatalog.read(path, mtime)
+        return catalog
+
+@contextmanager
+def _catalog_file_lock(path: PathExt):
+    '''writers are in different processes, file lock around read and replace'''
+    with CATALOG_LOCK, open(path.with_name(f"{path.name}.lock"), "a") as lock_file:
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def add_to_catalog(spells: dict[str, Spell], locale: str=DEFAULT_LOCALE) -> dict[str, list[str]]:
+    '''
+    Adds spells missing from the catalog file of the locale, returns the catalog.
+    File is replaced, so readers never see a half written catalog.
+    '''
+    path = _catalog_path(locale)
+    with _catalog_file_lock(path):
+        j: dict[str, list[str]] = path.json_ignore_error()
+        new_spells = {
+            spell_id: [spell.name, spell.school]
+            for spell_id, spell in spells.items()
+            if spell_id not in j
+        }
+        if not new_spells:
+            return j
+
+        j.update(new_spells)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.json_write(j, condensed=True)
+        temp_path.replace(path)
+        return j
+
+
 class Spells(Logs):
     @property
     def SPELLS(self):
         try:
             return self._spells
         except AttributeError:
-            self._spells = self._get_spells()
-            return self._spells
+            pass
+        with self.locks("SPELLS"):
+            try:
+                return self._spells
+            except AttributeError:
+                self._spells = self._get_spells()
+                return self._spells
+
+    @property
+    def SPELLS_INFO(self) -> dict:
+        '''
+        SPELLS_IDS.json:
+        locale - catalog of the report
+        ids    - all spell ids of the report
+        names  - {spell_id: [name, school]} of spells named not as in the catalog
+        '''
+        try:
+            return self._spells_info
+        except AttributeError:
+            pass
+        with self.locks("SPELLS_INFO"):
+            try:
+                return self._spells_info
+            except AttributeError:
+                self._spells_info = self._get_spells_info()
+                return self._spells_info
 
     def convert_to_main_spell_id(self, spell_id: str):
         if spell_id not in COMBINE_SPELLS:
@@ -146,34 +351,75 @@ class Spells(Logs):
                 if _filter in spell.id
             }
         
+        catalog = spells_catalog(self.SPELLS_INFO["locale"])
+        spell_ids = set(catalog.search(_filter, self.SPELLS))
+
         _filter = _filter.lower()
+        own_spell_ids = [*map(int, self.SPELLS_INFO["names"]), *PASSIVE_SPELLS]
+        spell_ids.update(
+            spell_id
+            for spell_id in own_spell_ids
+            if _filter in self.SPELLS[spell_id].name_lower
+        )
         return {
-            spell_id: spell.name
-            for spell_id, spell in self.SPELLS.items()
-            if _filter in spell.name_lower
+            spell_id: self.SPELLS[spell_id].name
+            for spell_id in sorted(spell_ids)
         }
     
     def _get_spells(self):
-        try:
-            spells = self._read_spells()
-        except Exception:
-            spells = self._redo_spells()
-        
-        add_spells_icons(spells)
-        spells_raname_to_custom(spells)
-        
-        spells = spell_id_to_int(spells)
+        info = self.SPELLS_INFO
+        catalog = spells_catalog(info["locale"])
+        spells = {
+            spell_id: catalog.spells[spell_id]
+            for spell_id in info["ids"]
+            if spell_id in catalog.spells
+        }
+
+        own_spells = {
+            spell_id: Spell(spell_id, name, school)
+            for spell_id, (name, school) in info["names"].items()
+        }
+        add_spells_icons(own_spells)
+        spells_raname_to_custom(own_spells)
+        spells.update(spell_id_to_int(own_spells))
+
         spells.update(PASSIVE_SPELLS)
         return spells
+
+    def _get_spells_info(self):
+        info = self._get_spells_info_any()
+        if not spells_catalog(info["locale"]).has_all(info["ids"]):
+            # catalog file was lost or replaced
+            info = self._redo_spells()
+        return info
+
+    def _get_spells_info_any(self):
+        try:
+            return self._read_spells()
+        except Exception:
+            pass
+        try:
+            return self._convert_spells_data()
+        except Exception:
+            return self._redo_spells()
     
-    def _read_spells(self):
-        spells_data_file_name = self.relative_path("SPELLS_DATA.json")
+    def _read_spells(self) -> dict:
+        info = self.relative_path(FileNames.logs_spells_ids).json()
+        # list of ids from before catalogs had locales
+        if not isinstance(info, dict):
+            raise TypeError
+        return info
+
+    def _convert_spells_data(self):
+        '''reports before the catalog have names and schools in SPELLS_DATA.json'''
         j: dict[str, dict[str, str]]
-        j = spells_data_file_name.json()
-        return {
+        j = self.relative_path(FileNames.logs_spells_data).json()
+        spells = {
             spell_id: Spell(id=spell_id, **v)
             for spell_id, v in j.items()
+            if spell_id.isdigit()
         }
+        return self._save_spells(spells)
     
     @running_time
     def _redo_spells(self):
@@ -187,8 +433,7 @@ class Spells(Logs):
             spell_id: spells[spell_id]
             for spell_id in sorted(spell_ids, key=int)
         }
-        self._save_spells(spells)
-        return spells
+        return self._save_spells(spells)
 
     def _get_all_spells(self):
         spells = {
@@ -208,12 +453,19 @@ class Spells(Logs):
         return spells
     
     def _save_spells(self, _spells: dict[str, Spell]):
-        spells_data_file_name = self.relative_path("SPELLS_DATA.json")
-        j = {
-            spell_id: spell.json_format()
-            for spell_id, spell in _spells.items()
+        locale = spells_locale(_spells)
+        catalog = add_to_catalog(_spells, locale)
+        info = {
+            "locale": locale,
+            "ids": sorted(map(int, _spells)),
+            "names": {
+                spell_id: [spell.name, spell.school]
+                for spell_id, spell in _spells.items()
+                if catalog.get(spell_id) != [spell.name, spell.school]
+            },
         }
-        spells_data_file_name.json_write(j)  
+        self.relative_path(FileNames.logs_spells_ids).json_write(info)
+        return info
 
 
 def _test1():
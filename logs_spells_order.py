@@ -74,10 +74,10 @@ class StartsBeforeHour(LineDeltaSeconds):
         return int((_minutes * 60 + _seconds)*1000)
 
 
-def get_delta_wrap(logs_slice, combat_start_line: str):
+def get_delta_wrap(first_line: str, last_line: str, combat_start_line: str):
     start_minutes, start_seconds = _timestamp_float(combat_start_line)
-    first_minutes, _ = _timestamp_float(logs_slice[0])
-    end_minutes, _ = _timestamp_float(logs_slice[-1])
+    first_minutes, _ = _timestamp_float(first_line)
+    end_minutes, _ = _timestamp_float(last_line)
     if first_minutes > start_minutes:
         c = EndAfterHour
     elif start_minutes > end_minutes:
@@ -87,11 +87,22 @@ def get_delta_wrap(logs_slice, combat_start_line: str):
     return c(start_minutes, start_seconds).get_delta
 
 @running_time
-def get_history(logs_slice: list[str], source_guid: str, ignored_guids: set[str], combat_start_line: str):
+def get_history(
+    logs_slice: list[str],
+    source_guid: str,
+    ignored_guids: set[str],
+    combat_start_line: str,
+    first_line: str=None,
+    last_line: str=None,
+):
     flags = set()
     history = defaultdict(list)
 
-    get_delta = get_delta_wrap(logs_slice, combat_start_line)
+    if first_line is None:
+        first_line = logs_slice[0]
+    if last_line is None:
+        last_line = logs_slice[-1]
+    get_delta = get_delta_wrap(first_line, last_line, combat_start_line)
 
     if not ignored_guids:
         ignored_guids = set()
@@ -99,8 +110,6 @@ def get_history(logs_slice: list[str], source_guid: str, ignored_guids: set[str]
         ignored_guids.remove(source_guid)
     
     for line in logs_slice:
-        if source_guid not in line:
-            continue
         try:
             timestamp, flag, _, sName, tGUID, tName, spell_id, _, etc = line.split(',', 8)
             # if flag in IGNORED_FLAGS or tGUID in ignored_guids:
@@ -122,11 +131,12 @@ class Timeline(logs_base.THE_LOGS):
     @logs_base.cache_wrap
     def get_spell_history(self, s: int, f: int, guid: str) -> dict[str, defaultdict[str, int]]:
         s_shifted = self.find_shifted_log_line(s, -180)
-        logs_slice = self.LOGS[s_shifted:f]
+        logs_slice = self.get_unit_lines(s_shifted, f, guid)
+        first_line, last_line = self.get_slice_edges(s_shifted, f)
 
         players_and_pets = self.get_players_and_pets_guids()
         combat_start_line = self.LOGS[s]
-        data = get_history(logs_slice, guid, players_and_pets, combat_start_line)
+        data = get_history(logs_slice, guid, players_and_pets, combat_start_line, first_line, last_line)
 
         self.spell_history_combine_spells(data["DATA"])
         
@@ -155,3 +165,13 @@ class Timeline(logs_base.THE_LOGS):
         player_guid = self.name_to_guid(player_name)
         spell_history = self.get_spell_history(s, f, player_guid)
         return json.dumps(spell_history, default=list)
+
+    @running_time
+    def get_spell_history_many_wrap_json(self, s: int, f: int, player_names: list[str]):
+        spell_history = {}
+        for player_name in player_names:
+            player_guid = self.name_to_guid(player_name)
+            if player_guid is None:
+                continue
+            spell_history[player_name] = self.get_spell_history(s, f, player_guid)
+        return json.dumps(spell_history, default=list)
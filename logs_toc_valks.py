@@ -76,9 +76,8 @@ class ValksTOC(THE_LOGS):
                 continue
 
             # calc stop 15 sec after cast
-            cast_line = logs_slice[cast.start_index]
-            sec_from_start = self.get_timedelta_seconds(self.LOGS[0], cast_line)
-            after_cast = self.TIMESTAMPS[int(sec_from_start + CAST_DURATION)]
+            sec_from_start = self.find_sec_from_start(s + cast.start_index)
+            after_cast = self.get_second_line(int(sec_from_start + CAST_DURATION))
             after_cast = min(f, after_cast)
             cast.stop_index = after_cast - s
             yield cast
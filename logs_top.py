@@ -62,6 +62,11 @@ class Top(logs_main.THE_LOGS):
     def make_report_top_wrap(self, rewrite=False):
         top_path = self.relative_path(FileNames.logs_top)
         if not rewrite and top_path.is_file():
+            # older reports get summaries on the next reparse
+            try:
+                self.make_segments_summary()
+            except Exception:
+                LOGGER_REPORTS.exception(f"{self.NAME} | Segments summary")
             return
         
         pc = perf_counter()
@@ -74,6 +79,12 @@ class Top(logs_main.THE_LOGS):
             LOGGER_REPORTS.debug(f'{get_ms_str(pc)} | {self.NAME:50} | Done top')
 
         top_path.json_write(report_top)
+
+        try:
+            self.make_segments_summary(rewrite=True)
+        except Exception:
+            LOGGER_REPORTS.exception(f"{self.NAME} | Segments summary")
+
         return report_top
 
     @running_time
@@ -130,6 +141,7 @@ class Top(logs_main.THE_LOGS):
         if boss_name == "Valithria Dreamwalker":
             _data = self.get_vali_heal_wrap(s, f)
         else:
+            self.run_slice_visitors(s, f, self.target_damage_visitors(s, f, boss_name, SPECS))
             _damage = self.target_damage(s, f)
             _total = _damage["total"]
             _no_overkill = _damage["no_overkill"]
@@ -143,7 +143,7 @@ def format_damage(dmg_events):
 class UCM(logs_base.THE_LOGS):
     def stacks_before_explosion(self, t1, stacks):
         for t2, _stacks in stacks.items():
-            dt = abs(self.get_timedelta(t2, t1)).total_seconds()
+            dt = abs(self.get_timedelta_seconds(t2, t1))
             if dt < 4:
                 return _stacks
         return 0
@@ -151,7 +151,7 @@ class UCM(logs_base.THE_LOGS):
     def explostions_after_removed(self, t1, dmg):
         for t2, dmg_events in dmg.items():
             
-            dt = self.get_timedelta(t1, t2).total_seconds()
+            dt = self.get_timedelta_seconds(t1, t2)
             if dt >= 0 and dt < 0.2:
                 return dmg_events
         return {}
@@ -163,7 +163,7 @@ class UCM(logs_base.THE_LOGS):
         groupped.append(qqq)
         for q in x:
             t_now = q[0]
-            d = self.get_timedelta(t_prev, t_now).total_seconds()
+            d = self.get_timedelta_seconds(t_prev, t_now)
             if d > window_sec:
                 qqq = []
                 groupped.append(qqq)
@@ -191,7 +191,7 @@ class UCM(logs_base.THE_LOGS):
                     continue
                 explosion = format_damage(dmg_events)
                 explosion["stacks"] = _stacks
-                t = self.get_timedelta(_start, timestamp).total_seconds()
+                t = self.get_timedelta_seconds(_start, timestamp)
                 explosion["timestamp"] = sec_to_str(t)
                 explosion["source"] = source
                 explosions.append(explosion)
@@ -223,7 +223,7 @@ class UCM(logs_base.THE_LOGS):
                 
                 explosion = format_damage(dmg_events)
                 explosion["stacks"] = self.stacks_before_explosion(timestamp, stacks)
-                t = self.get_timedelta(_start, timestamp).total_seconds()
+                t = self.get_timedelta_seconds(_start, timestamp)
                 explosion["timestamp"] = sec_to_str(t)
                 explosion["source"] = source
                 explosions.append(explosion)
@@ -0,0 +1,170 @@
+'''
+Per report units table.
+
+Dense int ids for guids, npc ids, names and spell ids.
+Guid ids are EventsData.guids indexes, so EVENTS source and target columns are unit ids as is.
+Analyzers aggregate on ids and translate back to strings only when formatting.
+
+UNITS_TABLE.json:
+    GUIDS       - guid by guid id
+    NPC_IDS     - npc id (guid[6:-6]) by npc index
+    NAMES       - name by name index
+    SPELLS      - sorted spell ids, spell index is position in this list
+    GUID_NPC    - npc index by guid id
+    GUID_NAME   - name index by guid id
+    GUID_MASTER - master guid id by guid id, guid id itself if unit has no master
+'''
+
+import numpy
+
+import logs_events
+from c_path import PathExt
+from h_debug import running_time
+
+VERSION = 1
+ID_BITS = 20
+MAX_ID = 1 << ID_BITS
+UNKNOWN_NAME = "Unknown"
+
+
+def _intern(values: list[str]):
+    '''unique values in order of appearance and index of every value in it'''
+    unique: dict[str, int] = {}
+    ids = []
+    for value in values:
+        try:
+            ids.append(unique[value])
+        except KeyError:
+            unique[value] = len(unique)
+            ids.append(unique[value])
+    return list(unique), ids
+
+
+class UnitsTable:
+    __slots__ = (
+        "guids", "npc_ids", "names", "spells",
+        "guid_npc", "guid_name", "guid_master",
+        "_guids_index", "_spells_array",
+    )
+
+    def __init__(self, data: dict[str, list]) -> None:
+        self.guids: list[str] = data["GUIDS"]
+        self.npc_ids: list[str] = data["NPC_IDS"]
+        self.names: list[str] = data["NAMES"]
+        self.spells: list[int] = data["SPELLS"]
+        self.guid_npc: list[int] = data["GUID_NPC"]
+        self.guid_name: list[int] = data["GUID_NAME"]
+        self.guid_master: list[int] = data["GUID_MASTER"]
+
+    @property
+    def guids_index(self) -> dict[str, int]:
+        try:
+            return self._guids_index
+        except AttributeError:
+            self._guids_index = {guid: i for i, guid in enumerate(self.guids)}
+            return self._guids_index
+
+    @property
+    def spells_array(self) -> numpy.ndarray:
+        try:
+            return self._spells_array
+        except AttributeError:
+            self._spells_array = numpy.array(self.spells, dtype=numpy.uint32)
+            return self._spells_array
+
+    def guid_id(self, guid: str):
+        return self.guids_index.get(guid)
+
+    def name(self, guid_id: int):
+        return self.names[self.guid_name[guid_id]]
+
+    def npc_id(self, guid_id: int):
+        return self.npc_ids[self.guid_npc[guid_id]]
+
+    def master(self, guid_id: int):
+        return self.guid_master[guid_id]
+
+    def spell_indexes(self, spell_ids: numpy.ndarray) -> numpy.ndarray:
+        '''spell index for every spell id of EVENTS spell column'''
+        return numpy.searchsorted(self.spells_array, spell_ids).astype(numpy.uint32)
+
+    @classmethod
+    @running_time
+    def from_events(cls, events: logs_events.EventsData, all_guids: dict[str, dict[str, str]]):
+        guids = list(events.guids)
+        guids_index = {guid: i for i, guid in enumerate(guids)}
+        npc_ids, guid_npc = _intern([guid[6:-6] for guid in guids])
+        names, guid_name = _intern([
+            all_guids.get(guid, {}).get("name", UNKNOWN_NAME)
+            for guid in guids
+        ])
+        guid_master = []
+        for guid_id, guid in enumerate(guids):
+            master_guid = all_guids.get(guid, {}).get("master_guid")
+            guid_master.append(guids_index.get(master_guid, guid_id))
+
+        return cls({
+            "GUIDS": guids,
+            "NPC_IDS": npc_ids,
+            "NAMES": names,
+            "SPELLS": numpy.unique(events.spell).tolist(),
+            "GUID_NPC": guid_npc,
+            "GUID_NAME": guid_name,
+            "GUID_MASTER": guid_master,
+        })
+
+    @classmethod
+    def read(cls, path: PathExt):
+        data = path.json()
+        if data.get("VERSION") != VERSION:
+            raise ValueError("old units table version")
+        return cls(data)
+
+    def write(self, path: PathExt):
+        path.json_write({
+            "VERSION": VERSION,
+            "GUIDS": self.guids,
+            "NPC_IDS": self.npc_ids,
+            "NAMES": self.names,
+            "SPELLS": self.spells,
+            "GUID_NPC": self.guid_npc,
+            "GUID_NAME": self.guid_name,
+            "GUID_MASTER": self.guid_master,
+        })
+
+
+def pack_columns(columns: list[numpy.ndarray], bits: tuple[int]):
+    '''
+    Packs int columns into 1 uint64 key column, first column in the highest bits.
+    Raises ValueError if a value doesn't fit its bits, callers fall back to lines.
+    '''
+    if sum(bits) > 64:
+        raise ValueError("key doesn't fit uint64")
+    key = numpy.zeros(len(columns[0]), dtype=numpy.uint64)
+    for column, column_bits in zip(columns, bits):
+        if len(column) and (column.min() < 0 or int(column.max()) >> column_bits):
+            raise ValueError(f"value doesn't fit {column_bits} bits")
+        key <<= numpy.uint64(column_bits)
+        key |= column.astype(numpy.uint64)
+    return key
+
+def unpack_columns(keys: numpy.ndarray, bits: tuple[int]):
+    '''reverse of pack_columns, list of uint64 columns'''
+    columns = []
+    shift = sum(bits)
+    for column_bits in bits:
+        shift -= column_bits
+        mask = numpy.uint64((1 << column_bits) - 1)
+        columns.append((keys >> numpy.uint64(shift)) & mask)
+    return columns
+
+def pack_keys(*ids: numpy.ndarray):
+    '''packs up to 3 id columns into 1 uint64 key column, raises ValueError if an id is >= MAX_ID'''
+    return pack_columns(ids, (ID_BITS, ) * len(ids))
+
+def unpack_keys(keys: numpy.ndarray, columns: int):
+    '''reverse of pack_keys, list of columns as python ints'''
+    return [
+        column.tolist()
+        for column in unpack_columns(keys, (ID_BITS, ) * columns)
+    ]
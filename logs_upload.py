@@ -11,14 +11,19 @@ from time import perf_counter, sleep
 
 import api_7z
 import h_server_fix
+import logs_aura_intervals
+import logs_clock
+import logs_deaths_index
+import logs_events
 import logs_fix
+import logs_lines_index
 from constants import (
     DEFAULT_SERVER_NAME,
     LOGS_CUT_NAME,
     SERVERS,
 )
 from c_bosses import convert_to_fight_name
-from c_path import Directories, PathExt
+from c_path import Directories, FileNames, PathExt
 from h_debug import Loggers, get_ms_str, running_time
 from h_datetime import to_dt_bytes_closure
 from h_other import get_report_name_info
@@ -644,10 +649,26 @@ class LogsArchiveParser(api_7z.SevenZipArchive):
         temp_slice_path = self.upload_data.directory / f"{raid_id}.txt"
         
         data = b'\n'.join(logs_fix.normalize_read_from_file(temp_slice_path))
-        slice_path.zstd_write(data)
+        lines = data.decode().splitlines()
+        slice_path.zstd_write_frames(lines)
 
         self.change_slice_status("Saved zstd", raid_id, pc=pc)
 
+        pc = perf_counter()
+        events_path = slice_folder / FileNames.logs_events_data
+        year = int(raid_id[:2]) + 2000
+        events = logs_events.write_events(events_path, lines, year)
+        lines_index_path = slice_folder / FileNames.logs_lines_index
+        logs_lines_index.write_lines_index(lines_index_path, events)
+        deaths_index_path = slice_folder / FileNames.logs_deaths_index
+        logs_deaths_index.write_deaths_index(deaths_index_path, events)
+        aura_intervals_path = slice_folder / FileNames.logs_aura_intervals
+        logs_aura_intervals.write_aura_intervals(aura_intervals_path, events)
+        clock_path = slice_folder / FileNames.logs_clock
+        logs_clock.write_clock(clock_path, events.ms)
+
+        self.change_slice_status("Saved events", raid_id, pc=pc)
+
     def save_segment(self, logs_slice: LogsSlice, timestamp: float):
         # print(logs_slice)
 
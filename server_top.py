@@ -1,3 +1,5 @@
+from time import perf_counter
+
 from fastapi import (
     FastAPI,
     HTTPException,
@@ -8,6 +10,7 @@ from fastapi import (
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
+import h_metrics
 import parser_all
 from api_db import DataCompressed
 from constants import GEAR
@@ -71,8 +74,21 @@ async def request_format(request: Request):
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    await add_log_entry_wrap(request)
-    return await call_next(request)
+    request_start = perf_counter()
+    if request.url.path != "/metrics":
+        await add_log_entry_wrap(request)
+    response = await call_next(request)
+    # route template, not path, so labels don't grow with every character name
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    seconds = perf_counter() - request_start
+    h_metrics.observe_request("server_top", request.method, route, response.status_code, seconds)
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if not h_metrics.scrape_allowed(request.client.host, request.headers):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(content=h_metrics.render(), media_type=h_metrics.CONTENT_TYPE)
 
 
 def make_response_compressed_headers(z: DataCompressed):
@@ -1,3 +1,5 @@
+from time import perf_counter
+
 from fastapi import (
     FastAPI,
     HTTPException,
@@ -8,6 +10,7 @@ from fastapi import (
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
+import h_metrics
 from constants import SERVERS
 from c_path import Directories
 from logs_upload import (
@@ -33,6 +36,21 @@ def real_ip(request: Request):
         ip = "0.0.0.0"
     return ip
 
+@app.middleware("http")
+async def observe_request_time(request: Request, call_next):
+    request_start = perf_counter()
+    response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    seconds = perf_counter() - request_start
+    h_metrics.observe_request("server_upload", request.method, route, response.status_code, seconds)
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if not h_metrics.scrape_allowed(request.client.host, request.headers):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(content=h_metrics.render(), media_type=h_metrics.CONTENT_TYPE)
+
 def check_upload_id_header(request: Request):
     try:
         return request.headers['x-upload-id']
@@ -13,7 +13,7 @@ const XHR_COMPARE = new XMLHttpRequest();
 const COLUMNS_ORDER = {
   "total": "count-small border-thin",
   "hits": "count-small",
-  "hit_avg": "count border-thin",
+  "avg": "count border-thin",
   "crits": "count-small",
   "crit_avg": "count",
   "percent": "count border",
@@ -78,22 +78,22 @@ function player_name_cell(player_name) {
   return name_cell;
 }
 
-function new_table_row(spell_data) {
+function new_table_row(parsed_json, player_i) {
   const row = document.createElement("tr");
 
-  row.appendChild(player_name_cell(spell_data["NAME"]));
+  row.appendChild(player_name_cell(parsed_json.PLAYERS[player_i]));
 
-  const spell_name = SELECT_SPELL.value;
-  row.appendChild(new_table_cell(spell_data.ACTUAL[spell_name] ?? "0", "total-cell"));
-  row.appendChild(new_table_cell(spell_data.REDUCED[spell_name], "total-cell border"));
-  row.appendChild(new_table_cell(spell_data.CASTS[spell_name], "count-small"));
-  row.appendChild(new_table_cell(spell_data.MISSES[spell_name], "count-small border"));
+  // DATA is columnar: DATA[spell][column][player index]
+  const columns = parsed_json.DATA[SELECT_SPELL.value] ?? {};
+  const value = column => columns[column] ? columns[column][player_i] : "";
+  row.appendChild(new_table_cell(value("actual") || "0", "total-cell"));
+  row.appendChild(new_table_cell(value("reduced"), "total-cell border"));
+  row.appendChild(new_table_cell(value("casts"), "count-small"));
+  row.appendChild(new_table_cell(value("misses"), "count-small border"));
   
-  const hits = spell_data.HITS[spell_name] ?? {};
-  for (const t of ["HIT", "DOT"]) {
-    const h = hits[t] ?? {};
+  for (const t of ["hit", "dot"]) {
     for (const key in COLUMNS_ORDER) {
-      row.appendChild(new_table_cell(h[key], COLUMNS_ORDER[key]));
+      row.appendChild(new_table_cell(value(`${t}_${key}`), COLUMNS_ORDER[key]));
     }
   }
 
@@ -110,8 +110,8 @@ function populate_table() {
     return;
   }
   
-  for (const player_data of parsed_json.PLAYERS) {
-    COMPARE_TABLE_BODY.append(new_table_row(player_data));
+  for (let player_i = 0; player_i < parsed_json.PLAYERS.length; player_i++) {
+    COMPARE_TABLE_BODY.append(new_table_row(parsed_json, player_i));
   }
 
   const totalHeader = document.querySelector("th.player-cell + th");
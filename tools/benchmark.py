@@ -0,0 +1,375 @@
+'''
+Benchmarks of the upload pipeline and analyzers on a fixed corpus.
+
+Corpus is tools/synthetic_log.py output, generated once per options and kept in temp/benchmarks.
+Every stage runs in a forked process, so peak RSS of one stage doesn't leak into the next one.
+Results are saved as JSON per commit, --compare flags stages slower or heavier than --threshold.
+
+python tools/benchmark.py --size 200M
+python tools/benchmark.py --size 200M --compare temp/benchmarks/<old commit>.json
+python tools/benchmark.py --stages normalize,parse_both --repeat 5
+'''
+
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+import synthetic_log
+
+RESULTS_DIR = BASE_DIR / "temp" / "benchmarks"
+DEFAULT_THRESHOLD = 0.1
+# memory metrics below this are noise, relative changes of them aren't reported
+MIN_COMPARED_MB = 10
+# metric: True if higher is better
+COMPARED_METRICS = {
+    "lines_per_sec": True,
+    # peak RSS of the child includes inputs made before the fork and depends on stage order
+    "rss_delta_mb": False,
+    "alloc_peak_mb": False,
+}
+SERVER = "Lordaeron"
+
+
+class Corpus:
+    '''inputs of stages, everything is made lazily and isn't measured'''
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.timestamp = path.stat().st_mtime
+        self.year = datetime.fromtimestamp(self.timestamp).year
+
+    @property
+    def raw(self) -> list[bytes]:
+        try:
+            return self._raw
+        except AttributeError:
+            with open(self.path, "rb") as f:
+                self._raw = f.readlines()
+            return self._raw
+
+    @property
+    def lines(self) -> list[str]:
+        try:
+            return self._lines
+        except AttributeError:
+            import logs_fix
+            data = b'\n'.join(logs_fix.normalize(self.raw))
+            self._lines = data.decode().splitlines()
+            return self._lines
+
+    @property
+    def events(self):
+        try:
+            return self._events
+        except AttributeError:
+            import logs_events
+            self._events = logs_events.EventsData.from_lines(self.lines, self.year)
+            return self._events
+
+    @property
+    def enc_data(self) -> dict[str, list[list[int]]]:
+        try:
+            return self._enc_data
+        except AttributeError:
+            self._enc_data = _encounter_data(self.lines, self.year)
+            return self._enc_data
+
+    @property
+    def guids(self) -> dict:
+        try:
+            return self._guids
+        except AttributeError:
+            import logs_units_guid
+            self._guids = logs_units_guid.guids_main(self.lines, self.enc_data)
+            return self._guids
+
+    @property
+    def players_and_pets(self) -> set[str]:
+        try:
+            return self._players_and_pets
+        except AttributeError:
+            players = set(self.guids["players"])
+            pets = {
+                guid
+                for guid, unit in self.guids["everything"].items()
+                if unit.get("master_guid") in players
+            }
+            self._players_and_pets = players | pets
+            return self._players_and_pets
+
+
+def _encounter_data(lines: list[str], year: int):
+    import logs_fight_separator
+    from h_locks import KeyLocks
+
+    class CorpusFights(logs_fight_separator.Fights):
+        LOGS = lines
+
+        def __init__(self) -> None:
+            self.year = year
+            self.locks = KeyLocks()
+
+    return CorpusFights()._make_enc_data()
+
+
+def _normalize(corpus: Corpus):
+    import logs_fix
+    for _ in logs_fix.normalize(corpus.raw):
+        pass
+    return len(corpus.raw)
+
+def _separate(corpus: Corpus):
+    import logs_upload
+    separator = logs_upload.LogsSeparator(server=SERVER, timestamp=corpus.timestamp)
+    for _ in separator.generate_segments(corpus.raw):
+        pass
+    return len(corpus.raw)
+
+def _guids(corpus: Corpus):
+    import logs_units_guid
+    logs_units_guid.guids_main(corpus.lines, corpus.enc_data)
+    return len(corpus.lines)
+
+def _parse_both(corpus: Corpus):
+    import logs_dmg_heals
+    logs_dmg_heals.parse_both(corpus.lines, corpus.players_and_pets)
+    return len(corpus.lines)
+
+def _damage_breakdown(corpus: Corpus):
+    import logs_dmg_breakdown
+    logs_dmg_breakdown._damage(corpus.lines)
+    return len(corpus.lines)
+
+def _absorbs(corpus: Corpus):
+    import logs_absorbs
+    logs_absorbs.parse_absorb_related(corpus.lines)
+    return len(corpus.lines)
+
+def _absorbs_masked(corpus: Corpus):
+    import logs_absorbs
+    import numpy
+    mask = logs_absorbs.absorb_events_mask(corpus.events, set())
+    lines = [corpus.lines[i] for i in numpy.flatnonzero(mask).tolist()]
+    logs_absorbs.parse_absorb_related(lines)
+    return len(corpus.lines)
+
+def _aura_intervals(corpus: Corpus):
+    import logs_aura_intervals
+    intervals = logs_aura_intervals.AuraIntervalsData.from_events(corpus.events)
+    for _ in intervals.uptime(0, int(corpus.events.ms[-1])):
+        pass
+    return len(corpus.lines)
+
+# name: (prepare, run), prepare makes inputs before the timed part
+# a stage that measures something else gets a new name, results of old runs stay comparable
+STAGES = {
+    "normalize": (lambda c: c.raw, _normalize),
+    "separate": (lambda c: c.raw, _separate),
+    "guids": (lambda c: c.enc_data, _guids),
+    "parse_both": (lambda c: c.players_and_pets, _parse_both),
+    "damage_breakdown": (lambda c: c.lines, _damage_breakdown),
+    "absorbs": (lambda c: c.lines, _absorbs),
+    "absorbs_masked": (lambda c: c.events, _absorbs_masked),
+    "aura_intervals": (lambda c: c.events, _aura_intervals),
+}
+
+
+def _rss_mb():
+    '''current RSS, linux only'''
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return 0.0
+
+def _peak_rss_mb():
+    # ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure(corpus: Corpus, stage: str, repeat: int):
+    prepare, run = STAGES[stage]
+    prepare(corpus)
+
+    rss_before = _rss_mb()
+    timings = []
+    for _ in range(repeat):
+        pc = perf_counter()
+        lines = run(corpus)
+        timings.append(perf_counter() - pc)
+    peak_rss = _peak_rss_mb()
+
+    # separate run, tracemalloc slows everything down
+    tracemalloc.start()
+    run(corpus)
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        "lines": lines,
+        "seconds": round(seconds, 4),
+        "seconds_all": [round(t, 4) for t in timings],
+        "lines_per_sec": int(lines / seconds) if seconds else 0,
+        "peak_rss_mb": round(peak_rss, 1),
+        "rss_delta_mb": round(peak_rss - rss_before, 1),
+        "alloc_peak_mb": round(alloc_peak / 1024 / 1024, 1),
+    }
+
+def _measure_child(conn, corpus: Corpus, stage: str, repeat: int):
+    try:
+        conn.send(measure(corpus, stage, repeat))
+    except Exception as e:
+        conn.send({"error": f"{e.__class__.__name__}: {e}"})
+    finally:
+        conn.close()
+
+def measure_forked(corpus: Corpus, stage: str, repeat: int):
+    # inputs are made once in parent and shared with children
+    prepare, _ = STAGES[stage]
+    try:
+        prepare(corpus)
+    except Exception as e:
+        return {"error": f"{e.__class__.__name__}: {e}"}
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return measure(corpus, stage, repeat)
+
+    context = multiprocessing.get_context("fork")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_measure_child, args=(child_conn, corpus, stage, repeat))
+    process.start()
+    child_conn.close()
+    result = parent_conn.recv()
+    process.join()
+    return result
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def get_corpus_path(args):
+    if args.log:
+        return args.log
+    name = f"{args.raid}-{args.raid_size}-{args.size or args.nights}-{args.seed}.txt"
+    path = RESULTS_DIR / "corpus" / name
+    if not path.is_file():
+        generator = synthetic_log.CombatLogGenerator(
+            raid=args.raid,
+            raid_size=args.raid_size,
+            seed=args.seed,
+        )
+        synthetic_log.write_log(path, generator, synthetic_log.parse_size(args.size), args.nights)
+    return path
+
+def compare(old: dict, new: dict, threshold: float):
+    '''[(stage, metric, old, new, change)] of changes worse than threshold'''
+    regressions = []
+    for stage, new_stage in new["stages"].items():
+        old_stage = old.get("stages", {}).get(stage)
+        if not old_stage or "error" in old_stage or "error" in new_stage:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old_value = old_stage.get(metric)
+            new_value = new_stage.get(metric)
+            if not old_value or new_value is None:
+                continue
+            if metric.endswith("_mb") and max(old_value, new_value) < MIN_COMPARED_MB:
+                continue
+            change = (new_value - old_value) / abs(old_value)
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append((stage, metric, old_value, new_value, change))
+    return regressions
+
+
+def print_results(results: dict):
+    print(f"{'stage':<18} {'lines/s':>12} {'sec':>8} {'peak rss':>9} {'rss +':>8} {'alloc':>8}")
+    for stage, r in results["stages"].items():
+        if "error" in r:
+            print(f"{stage:<18} {r['error']}")
+            continue
+        print(" ".join((
+            f"{stage:<18}",
+            f"{r['lines_per_sec']:>12,}",
+            f"{r['seconds']:>8.3f}",
+            f"{r['peak_rss_mb']:>6.0f} MB",
+            f"{r['rss_delta_mb']:>5.0f} MB",
+            f"{r['alloc_peak_mb']:>5.0f} MB",
+        )))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks upload pipeline and analyzers")
+    parser.add_argument("--log", type=Path, help="raw WoWCombatLog.txt instead of synthetic corpus")
+    parser.add_argument("--raid", choices=list(synthetic_log.RAIDS), default="icc")
+    parser.add_argument("--raid-size", type=int, choices=(10, 25), default=25)
+    parser.add_argument("--nights", type=int, default=1)
+    parser.add_argument("--size", help="synthetic corpus size: 100M, 1G")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", help=f"comma separated, default all: {','.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, help="results json, default temp/benchmarks/<commit>.json")
+    parser.add_argument("--compare", type=Path, help="results json of an older run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    stages = args.stages.split(",") if args.stages else list(STAGES)
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"unknown stage {stage}")
+
+    corpus_path = get_corpus_path(args)
+    corpus = Corpus(corpus_path)
+    commit = get_commit()
+    results = {
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "corpus": {
+            "path": str(corpus_path),
+            "bytes": corpus_path.stat().st_size,
+        },
+        "repeat": args.repeat,
+        "stages": {},
+    }
+    for stage in stages:
+        results["stages"][stage] = measure_forked(corpus, stage, args.repeat)
+
+    print_results(results)
+
+    out = args.out or RESULTS_DIR / f"{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"saved {out}")
+
+    if not args.compare:
+        return
+
+    old = json.loads(args.compare.read_text())
+    regressions = compare(old, results, args.threshold)
+    for stage, metric, old_value, new_value, change in regressions:
+        print(f"REGRESSION {stage:<18} {metric:<14} {old_value} -> {new_value} ({change:+.1%})")
+    if regressions:
+        sys.exit(1)
+    print(f"no regressions over {args.threshold:.0%} vs {old.get('commit')}")
+
+
+if __name__ == "__main__":
+    main()
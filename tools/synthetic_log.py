@@ -0,0 +1,510 @@
+'''
+Deterministic synthetic 3.3.5 combat log for load and regression tests.
+
+Writes raw WoWCombatLog.txt lines, same format the client writes:
+6/25 21:46:32.302  SPELL_DAMAGE,0x060000000040F817,"Nomadra",0x514,0xF130008F130004E9,"Rotface",0x10a48,48465,"Starfire",0x40,15783,0,64,3945,0,0,1,nil,nil
+
+Same seed and options give the same file byte for byte.
+Auras are removed when they run out, when shield is used up and on death,
+killing blows have overkill, some players are resurrected during the pull.
+Raid nights repeat every 7 days with the same roster until --size is reached,
+so 1-10 GB inputs split into many reports in logs_upload.LogsSeparator.
+
+python tools/synthetic_log.py --raid icc --raid-size 25 --size 2G --7z
+'''
+
+import argparse
+import heapq
+import itertools
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from c_bosses import BOSSES_GUIDS, BOSSES_ICC, MULTIBOSSES
+
+DEFAULT_PATH = BASE_DIR / "LogsRaw" / "WoWCombatLog.txt"
+DEFAULT_START = "2024-05-10 23:20"
+
+RAIDS = {
+    "icc": BOSSES_ICC,
+    "rs": ["Baltharus the Warborn", "Saviana Ragefire", "General Zarithrian", "Halion"],
+    "toc": ["Northrend Beasts", "Lord Jaraxxus", "Twin Val'kyr", "Anub'arak"],
+}
+# npcs of multibosses, that aren't in BOSSES_GUIDS
+NPC_NAMES = {
+    "0087EC": "Gormok the Impaler",
+    "008948": "Acidmaw",
+    "0087EF": "Dreadscale",
+}
+BOSS_NPC_IDS = {name: npc_id for npc_id, name in BOSSES_GUIDS.items()}
+
+NIL_UNIT = '0x0000000000000000,nil,0x80000000'
+PLAYER_FLAGS = "0x514"
+PET_FLAGS = "0x1114"
+NPC_FLAGS = "0x10a48"
+
+SWING = ("1", "Melee", 0x1)
+POWER_WORD_SHIELD = ("48066", "Power Word: Shield", 0x2)
+BLOODLUST = ("2825", "Bloodlust", 0x8)
+KINGS = ("25898", "Greater Blessing of Kings", 0x2)
+REBIRTH = ("48477", "Rebirth", 0x8)
+REINCARNATION = ("21169", "Reincarnation", 0x8)
+# spell id: ms
+AURA_DURATION = {
+    POWER_WORD_SHIELD[0]: 30_000,
+    BLOODLUST[0]: 40_000,
+    KINGS[0]: 30 * 60_000,
+}
+BOSS_SPELLS = [
+    ("69146", "Coldflame", 0x10),
+    ("69057", "Bone Spike Graveyard", 0x1),
+    ("71204", "Touch of Insignificance", 0x20),
+    ("72410", "Rune of Blood", 0x1),
+    ("69240", "Vile Gas", 0x8),
+]
+
+# class: (role, direct spells, periodic spells, heals, pet (summon spell, pet spell, pet name) or None)
+# every class has at least one spell from c_player_classes.SPELL_BOOK, so class is detected
+CLASSES = {
+    "Death Knight": ("tank", [("49909", "Icy Touch", 0x10), ("49924", "Death Strike", 0x1)], [("55095", "Frost Fever", 0x10)], [], None),
+    "Warrior": ("tank", [("23881", "Bloodthirst", 0x1), ("47450", "Heroic Strike", 0x1), ("1680", "Whirlwind", 0x1)], [("12721", "Deep Wounds", 0x1)], [], None),
+    "Paladin": ("heal", [("35395", "Crusader Strike", 0x1)], [], [("48823", "Holy Shock", 0x2), ("66922", "Flash of Light", 0x2)], None),
+    "Priest": ("heal", [("58381", "Mind Flay", 0x20)], [("48125", "Shadow Word: Pain", 0x20)], [("48089", "Circle of Healing", 0x2), ("48068", "Renew", 0x2)], None),
+    "Shaman": ("heal", [("49238", "Lightning Bolt", 0x8), ("60043", "Lava Burst", 0x4)], [], [("55459", "Chain Heal", 0x8), ("61301", "Riptide", 0x8)], None),
+    "Druid": ("heal", [("48465", "Starfire", 0x40), ("48461", "Wrath", 0x8)], [("48468", "Insect Swarm", 0x8)], [("48441", "Rejuvenation", 0x8), ("48438", "Wild Growth", 0x8)], None),
+    "Mage": ("dps", [("42833", "Fireball", 0x4), ("42873", "Fire Blast", 0x4)], [("12654", "Ignite", 0x4)], [], None),
+    "Warlock": ("dps", [("47809", "Shadow Bolt", 0x20)], [("47813", "Corruption", 0x20), ("47843", "Unstable Affliction", 0x20)], [], (("691", "Summon Felhunter", 0x20), ("54053", "Shadow Bite", 0x20), "Felhunter")),
+    "Hunter": ("dps", [("49050", "Aimed Shot", 0x1), ("53209", "Chimera Shot", 0x40)], [("49001", "Serpent Sting", 0x8)], [], (("883", "Call Pet", 0x1), ("17253", "Bite", 0x1), "Wolf")),
+    "Rogue": ("dps", [("48638", "Sinister Strike", 0x1), ("48668", "Eviscerate", 0x1)], [], [], None),
+}
+TANK_CLASSES = [name for name, (role, *_) in CLASSES.items() if role == "tank"]
+HEAL_CLASSES = [name for name, (role, *_) in CLASSES.items() if role == "heal"]
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "zu", "the", "dor", "an", "el", "gar", "vin", "sha", "tor", "ny", "bel", "qu"]
+
+# event kind: weight
+EVENTS = {
+    "damage": 40,
+    "swing": 14,
+    "periodic": 12,
+    "pet": 6,
+    "boss": 12,
+    "heal": 10,
+    "periodic_heal": 4,
+    "cast": 1,
+}
+EVENT_KINDS = list(EVENTS)
+EVENT_WEIGHTS = list(EVENTS.values())
+SHIELD_CHANCE = 0.01
+DEATH_CHANCE = 0.00005
+RESURRECT_CHANCE = 0.6
+
+
+def parse_size(size: str):
+    '''"500M", "2G", "1024" -> bytes'''
+    if not size:
+        return None
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    size = size.strip().upper()
+    if size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+class Unit:
+    __slots__ = "guid", "name", "flags", "unit", "class_name", "pet", "shield", "auras"
+
+    def __init__(self, guid: str, name: str, flags: str, class_name: str=None) -> None:
+        self.guid = guid
+        self.name = name
+        self.flags = flags
+        self.unit = f'{guid},"{name}",{flags}'
+        self.class_name = class_name
+        self.pet: Unit = None
+        # amount left of Power Word: Shield
+        self.shield = 0
+        # spell id: (expires at ms, source, spell)
+        self.auras: dict[str, tuple[int, Unit, tuple]] = {}
+
+
+class Clock:
+    '''now in ms from start, timestamp string is rebuilt once per second'''
+    def __init__(self, start: datetime) -> None:
+        self.start = start
+        self.ms = 0
+        self._second = -1
+        self._prefix = ""
+
+    def add(self, ms: int):
+        self.ms += ms
+
+    def stamp(self):
+        second, ms = divmod(self.ms, 1000)
+        if second != self._second:
+            self._second = second
+            dt = self.start + timedelta(seconds=second)
+            self._prefix = f"{dt.month}/{dt.day} {dt:%H:%M:%S}"
+        return f"{self._prefix}.{ms:03}  "
+
+
+class CombatLogGenerator:
+    def __init__(
+        self,
+        raid: str="icc",
+        raid_size: int=25,
+        wipes: int=1,
+        seed: int=0,
+        start: datetime=None,
+    ) -> None:
+        if raid not in RAIDS:
+            raise ValueError(f"raid must be one of {list(RAIDS)}")
+        self.bosses = RAIDS[raid]
+        self.wipes = wipes
+        self.random = random.Random(seed)
+        self.clock = Clock(start or datetime.strptime(DEFAULT_START, "%Y-%m-%d %H:%M"))
+        self.players = self._new_raid(raid_size)
+        self.npc_spawn = 0x100
+        # (expires at ms, order, target, spell id), entries of refreshed auras are skipped
+        self.expirations: list[tuple[int, int, Unit, str]] = []
+        self.order = itertools.count()
+        # lines made by events, that follow the event line
+        self.queued: list[str] = []
+
+    def _new_name(self, taken: set[str]):
+        while True:
+            parts = self.random.randint(2, 3)
+            name = "".join(self.random.choice(SYLLABLES) for _ in range(parts)).capitalize()
+            if name not in taken and len(name) <= 12:
+                taken.add(name)
+                return name
+
+    def _new_raid(self, raid_size: int):
+        healers = max(2, raid_size // 5)
+        classes = [TANK_CLASSES[i % len(TANK_CLASSES)] for i in range(2)]
+        classes += [HEAL_CLASSES[i % len(HEAL_CLASSES)] for i in range(healers)]
+        classes += [self.random.choice(list(CLASSES)) for _ in range(raid_size - len(classes))]
+
+        names = set()
+        players = []
+        for i, class_name in enumerate(classes):
+            guid = f"0x06000000{0x400000 + i * 7919:08X}"
+            player = Unit(guid, self._new_name(names), PLAYER_FLAGS, class_name)
+            pet = CLASSES[class_name][4]
+            if pet is not None:
+                *_, pet_name = pet
+                pet_guid = f"0xF140{0x10000 + i:06X}{0x1000 + i:06X}"
+                player.pet = Unit(pet_guid, pet_name, PET_FLAGS)
+            players.append(player)
+        return players
+
+    def _new_npc(self, npc_id: str, name: str):
+        self.npc_spawn += 1
+        return Unit(f"0xF130{npc_id}{self.npc_spawn:06X}", name, NPC_FLAGS)
+
+    def _boss_units(self, boss_name: str):
+        npc_ids = MULTIBOSSES.get(boss_name) or [BOSS_NPC_IDS[boss_name]]
+        return [
+            self._new_npc(npc_id, BOSSES_GUIDS.get(npc_id) or NPC_NAMES.get(npc_id, boss_name))
+            for npc_id in npc_ids
+        ]
+
+    def line(self, flag: str, source: str, target: str, *other):
+        rest = ",".join(map(str, other))
+        if rest:
+            return f"{self.clock.stamp()}{flag},{source},{target},{rest}\n"
+        return f"{self.clock.stamp()}{flag},{source},{target}\n"
+
+    def _spell(self, spell: tuple):
+        spell_id, name, school = spell
+        return f'{spell_id},"{name}",{school:#x}'
+
+    def _aura(self, flag: str, source: Unit, target: Unit, spell: tuple, aura_type: str="BUFF"):
+        return self.line(flag, source.unit, target.unit, self._spell(spell), aura_type)
+
+    def _apply(self, source: Unit, target: Unit, spell: tuple):
+        '''applied or refreshed aura, removal is scheduled when it runs out'''
+        spell_id = spell[0]
+        flag = "SPELL_AURA_REFRESH" if spell_id in target.auras else "SPELL_AURA_APPLIED"
+        expires = self.clock.ms + AURA_DURATION[spell_id]
+        target.auras[spell_id] = (expires, source, spell)
+        heapq.heappush(self.expirations, (expires, next(self.order), target, spell_id))
+        return self._aura(flag, source, target, spell)
+
+    def _remove(self, target: Unit, spell_id: str):
+        _, source, spell = target.auras.pop(spell_id)
+        if spell_id == POWER_WORD_SHIELD[0]:
+            target.shield = 0
+        return self._aura("SPELL_AURA_REMOVED", source, target, spell)
+
+    def expire_auras(self):
+        '''removals of auras that ran out since the last line, clock stays at now'''
+        now = self.clock.ms
+        while self.expirations and self.expirations[0][0] <= now:
+            expires, _, target, spell_id = heapq.heappop(self.expirations)
+            aura = target.auras.get(spell_id)
+            if aura is None or aura[0] != expires:
+                continue
+            # nothing was written since the aura ran out
+            self.clock.ms = expires
+            yield self._remove(target, spell_id)
+        self.clock.ms = now
+
+    def _damage(self, flag: str, source: Unit, target: Unit, spell: tuple, amount: int):
+        '''absorbs amount with targets shield, shield is removed when it's used up'''
+        crit = self.random.random() < 0.25
+        if crit:
+            amount *= 2
+        absorbed = min(target.shield, amount)
+        target.shield -= absorbed
+        amount -= absorbed
+        if absorbed and not target.shield and POWER_WORD_SHIELD[0] in target.auras:
+            self.queued.append(self._remove(target, POWER_WORD_SHIELD[0]))
+        # amount, overkill, school, resisted, blocked, absorbed, critical, glancing, crushing
+        values = (amount, 0, spell[2], 0, 0, absorbed, int(crit), "nil", "nil")
+        if flag == "SWING_DAMAGE":
+            return self.line(flag, source.unit, target.unit, *values)
+        return self.line(flag, source.unit, target.unit, self._spell(spell), *values)
+
+    def _heal(self, flag: str, source: Unit, target: Unit, spell: tuple):
+        amount = self.random.randint(2000, 12000)
+        overheal = self.random.choice((0, 0, 0, amount // 3, amount))
+        crit = int(self.random.random() < 0.2)
+        return self.line(flag, source.unit, target.unit, self._spell(spell), amount, overheal, 0, crit)
+
+    def _event(self, kind: str, bosses: list[Unit], alive: list[Unit]):
+        rnd = self.random
+        player = rnd.choice(alive)
+        role, direct, periodic, heals, _ = CLASSES[player.class_name]
+        boss = rnd.choice(bosses)
+
+        if kind == "damage" and direct:
+            return self._damage("SPELL_DAMAGE", player, boss, rnd.choice(direct), rnd.randint(3000, 15000))
+        if kind == "periodic" and periodic:
+            return self._damage("SPELL_PERIODIC_DAMAGE", player, boss, rnd.choice(periodic), rnd.randint(1500, 6000))
+        if kind == "pet" and player.pet is not None:
+            if rnd.random() < 0.5:
+                pet_spell = CLASSES[player.class_name][4][1]
+                return self._damage("SPELL_DAMAGE", player.pet, boss, pet_spell, rnd.randint(1000, 4000))
+            return self._damage("SWING_DAMAGE", player.pet, boss, SWING, rnd.randint(800, 3000))
+        if kind == "boss":
+            target = alive[0] if rnd.random() < 0.6 else player
+            if rnd.random() < 0.5:
+                return self._damage("SWING_DAMAGE", boss, target, SWING, rnd.randint(5000, 20000))
+            return self._damage("SPELL_DAMAGE", boss, target, rnd.choice(BOSS_SPELLS), rnd.randint(4000, 15000))
+        if kind in ("heal", "periodic_heal"):
+            healers = [unit for unit in alive if CLASSES[unit.class_name][3]]
+            if not healers:
+                return None
+            healer = rnd.choice(healers)
+            flag = "SPELL_HEAL" if kind == "heal" else "SPELL_PERIODIC_HEAL"
+            return self._heal(flag, healer, rnd.choice(alive), rnd.choice(CLASSES[healer.class_name][3]))
+        if kind == "cast" and direct:
+            return self.line("SPELL_CAST_SUCCESS", player.unit, boss.unit, self._spell(rnd.choice(direct)))
+        return self._damage("SWING_DAMAGE", player, boss, SWING, rnd.randint(1500, 5000))
+
+    def _shields(self, alive: list[Unit]):
+        priests = [unit for unit in alive if unit.class_name == "Priest"]
+        if not priests:
+            return
+        priest = self.random.choice(priests)
+        target = self.random.choice(alive)
+        yield self._apply(priest, target, POWER_WORD_SHIELD)
+        target.shield = self.random.randint(8000, 12000)
+
+    def _killing_blow(self, source: Unit, target: Unit, spell: tuple):
+        amount = self.random.randint(5000, 20000)
+        overkill = self.random.randint(1, amount)
+        values = (amount, overkill, spell[2], 0, 0, 0, 0, "nil", "nil")
+        if spell is SWING:
+            return self.line("SWING_DAMAGE", source.unit, target.unit, *values)
+        return self.line("SPELL_DAMAGE", source.unit, target.unit, self._spell(spell), *values)
+
+    def _death(self, unit: Unit, killer: Unit, spell: tuple, alive: list[Unit]=None):
+        yield self._killing_blow(killer, unit, spell)
+        if alive is not None:
+            alive.remove(unit)
+        yield self.line("UNIT_DIED", NIL_UNIT, unit.unit)
+        for spell_id in list(unit.auras):
+            yield self._remove(unit, spell_id)
+        unit.shield = 0
+
+    def _schedule_resurrect(self, unit: Unit, alive: list[Unit], resurrects: list):
+        '''shamans reincarnate, others can get Rebirth from a druid'''
+        rnd = self.random
+        if rnd.random() >= RESURRECT_CHANCE:
+            return
+        at = self.clock.ms + rnd.randint(3_000, 15_000)
+        if unit.class_name == "Shaman":
+            resurrects.append((at, unit, None))
+            return
+        druids = [player for player in alive if player.class_name == "Druid"]
+        if druids:
+            resurrects.append((at, unit, rnd.choice(druids)))
+
+    def _resurrects(self, alive: list[Unit], resurrects: list):
+        for resurrect in list(resurrects):
+            at, unit, source = resurrect
+            if at > self.clock.ms:
+                continue
+            resurrects.remove(resurrect)
+            if source is None:
+                yield self.line("SPELL_CAST_SUCCESS", unit.unit, NIL_UNIT, self._spell(REINCARNATION))
+            elif source in alive:
+                yield self.line("SPELL_RESURRECT", source.unit, unit.unit, self._spell(REBIRTH))
+            else:
+                continue
+            alive.append(unit)
+
+    def pull(self, boss_name: str, kill: bool):
+        '''lines of 1 attempt, clock is moved to the end of it'''
+        rnd = self.random
+        clock = self.clock
+        bosses = self._boss_units(boss_name)
+        paladin = next(unit for unit in self.players if unit.class_name == "Paladin")
+        yield from self.expire_auras()
+        for player in self.players:
+            yield self._apply(paladin, player, KINGS)
+            if player.pet is not None:
+                summon = CLASSES[player.class_name][4][0]
+                yield self.line("SPELL_SUMMON", player.unit, player.pet.unit, self._spell(summon))
+
+        duration = rnd.randint(120_000, 360_000) if kill else rnd.randint(40_000, 200_000)
+        end = clock.ms + duration
+        bloodlust_at = clock.ms + rnd.randint(5_000, 20_000)
+        shaman = next((unit for unit in self.players if unit.class_name == "Shaman"), None)
+
+        alive = list(self.players)
+        resurrects = []
+        while clock.ms < end and len(alive) > 2:
+            clock.add(rnd.randint(1, 40))
+            yield from self.expire_auras()
+            yield from self._resurrects(alive, resurrects)
+
+            if shaman in alive and clock.ms >= bloodlust_at:
+                bloodlust_at = end
+                for player in alive:
+                    yield self._apply(shaman, player, BLOODLUST)
+
+            roll = rnd.random()
+            if roll < SHIELD_CHANCE:
+                yield from self._shields(alive)
+                continue
+            if roll < SHIELD_CHANCE + DEATH_CHANCE:
+                # tanks die last
+                victim = rnd.choice(alive[2:])
+                yield from self._death(victim, rnd.choice(bosses), rnd.choice(BOSS_SPELLS), alive)
+                self._schedule_resurrect(victim, alive, resurrects)
+                continue
+
+            line = self._event(rnd.choices(EVENT_KINDS, EVENT_WEIGHTS)[0], bosses, alive)
+            if line is not None:
+                yield line
+            yield from self.queued
+            self.queued.clear()
+
+        clock.add(rnd.randint(10, 400))
+        if kill:
+            for boss in bosses:
+                yield from self._death(boss, rnd.choice(alive), SWING)
+        else:
+            for player in list(alive):
+                clock.add(rnd.randint(50, 1500))
+                yield from self.expire_auras()
+                yield from self._death(player, rnd.choice(bosses), SWING, alive)
+
+    def night(self):
+        for boss_name in self.bosses:
+            for _ in range(self.wipes):
+                yield from self.pull(boss_name, kill=False)
+                # run back
+                self.clock.add(self.random.randint(60_000, 150_000))
+            yield from self.pull(boss_name, kill=True)
+            # trash and loot
+            self.clock.add(self.random.randint(120_000, 170_000))
+
+    def nights(self):
+        while True:
+            night_start = self.clock.ms
+            yield from self.night()
+            self.clock.ms = night_start + 7 * 24 * 3600 * 1000
+
+
+def write_log(
+    path: Path,
+    generator: CombatLogGenerator,
+    max_bytes: int=None,
+    nights: int=1,
+):
+    '''writes whole nights, stops after nights or when max_bytes is reached, returns bytes written'''
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    chunk = []
+    chunk_size = 0
+    lines = generator.nights() if max_bytes else (
+        line
+        for _ in range(nights)
+        for line in generator.night()
+    )
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for line in lines:
+            chunk.append(line)
+            chunk_size += len(line)
+            if chunk_size < 1 << 20:
+                continue
+            f.write("".join(chunk))
+            written += chunk_size
+            chunk.clear()
+            chunk_size = 0
+            if max_bytes and written >= max_bytes:
+                break
+        f.write("".join(chunk))
+        written += chunk_size
+    return written
+
+def archive_7z(path: Path):
+    from api_7z import SevenZip
+
+    archive_path = path.with_suffix(".7z")
+    archive_path.unlink(missing_ok=True)
+    cmd = [SevenZip().path, "a", "-t7z", "-mx=1", archive_path, path]
+    return_code = subprocess.call(cmd, stdout=subprocess.DEVNULL)
+    if return_code != 0:
+        raise RuntimeError(f"7z failed | {cmd}")
+    return archive_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes deterministic synthetic WoWCombatLog.txt")
+    parser.add_argument("--out", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--raid", choices=list(RAIDS), default="icc")
+    parser.add_argument("--raid-size", type=int, choices=(10, 25), default=25)
+    parser.add_argument("--wipes", type=int, default=1, help="wipes before every kill")
+    parser.add_argument("--nights", type=int, default=1, help="raid nights, ignored if --size is set")
+    parser.add_argument("--size", help="approximate file size: 500M, 2G, 10G")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default=DEFAULT_START, help="YYYY-MM-DD HH:MM, default crosses midnight")
+    parser.add_argument("--7z", dest="archive", action="store_true", help="also pack into .7z next to the log")
+    args = parser.parse_args()
+
+    generator = CombatLogGenerator(
+        raid=args.raid,
+        raid_size=args.raid_size,
+        wipes=args.wipes,
+        seed=args.seed,
+        start=datetime.strptime(args.start, "%Y-%m-%d %H:%M"),
+    )
+    written = write_log(args.out, generator, parse_size(args.size), args.nights)
+    print(f"{args.out} | {written:,} bytes")
+    if args.archive:
+        archive_path = archive_7z(args.out)
+        print(f"{archive_path} | {archive_path.stat().st_size:,} bytes")
+
+
+if __name__ == "__main__":
+    main()